@@ -8,17 +8,67 @@ Profesor: Douglas Venegas González
 douglas.venegas@ucr.ac.cr
 
 INSTALACIÓN:
-pip install streamlit numpy pandas plotly
+pip install -r requirements.txt
 
 EJECUCIÓN:
 streamlit run Laboratorio_virtual.py
+
+PANEL DEL PROFESOR:
+?profesor=1 en la URL agrega la página, protegida con LABVIRTUAL_CLAVE_PROFESOR.
+Sin esa variable el panel queda cerrado.
+
+MÉTRICAS DE RENDIMIENTO:
+?debug=1 en la URL muestra el panel en la barra lateral, de solo lectura; sus
+controles (tracemalloc, reiniciar) piden la clave del profesor. Con
+LABVIRTUAL_DEBUG=1 el panel aparece siempre, con todos los controles.
+LABVIRTUAL_METRICAS_ARCHIVO=/ruta/metricas.prom (o .json) las escribe en disco.
+LABVIRTUAL_TRACEMALLOC=1 activa el pico de memoria desde el arranque.
 """
 
+import functools
+import html
+import os
+
 import streamlit as st
 import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+
+from labvirtual import (
+    CACHE_AJUSTES,
+    CACHE_FIGURAS,
+    INDICE_DILUCIONES,
+    MAX_MUESTRAS_LOTE,
+    METRICAS,
+    MM_FE,
+    MM_SAL_MOHR,
+    EjecucionLab,
+    a_json,
+    a_parquet,
+    ajuste_cacheado,
+    calcular_concentracion_muestra,
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    calcular_error_relativo,
+    calcular_fd_muestra,
+    clave_arreglos,
+    evaluar_lote,
+    grabacion_json,
+    instrumentar,
+    medir_lote,
+    medir_muestra,
+    medir_patrones,
+    obtener_almacen,
+    obtener_catalogo,
+    planes_dilucion,
+    propagar_incertidumbre,
+    registro_sesion,
+    verificar_rango_optimo,
+)
+from labvirtual.analitica import clase_r2
+from labvirtual.diluciones import AFOROS_MUESTRA
+from labvirtual.estado import EstadoLaboratorio
+from labvirtual.instrumento import BLANCO, CONTROL, MUESTRA, SenalEnVivo
+from labvirtual.recursos import ARCHIVO_LOGO, html_simulador_pesado, obtener_imagenes
+from labvirtual.reproduccion import FLUJO_INCERTIDUMBRE
 
 # ============================================================================
 # CONFIGURACIÓN DE LA PÁGINA
@@ -31,139 +81,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ============================================================================
-# DATOS DE LOS VINOS (con concentraciones reales de Fe)
-# ============================================================================
-
-VINOS_DATABASE = {
-    "Vino Tinto Reserva": {
-        "imagen": "🍷",
-        "color": "#8B0000",
-        "concentracion_fe": 8.5,  # mg/L real en el vino
-        "descripcion": "Vino tinto con cuerpo, crianza en barrica",
-        "fd_sugerido": 2
-    },
-    "Vino Blanco Seco": {
-        "imagen": "🥂",
-        "color": "#FFD700",
-        "concentracion_fe": 2.8,  # mg/L
-        "descripcion": "Vino blanco ligero, afrutado",
-        "fd_sugerido": 1
-    },
-    "Vino Rosado": {
-        "imagen": "🌸",
-        "color": "#FF69B4",
-        "concentracion_fe": 4.2,  # mg/L
-        "descripcion": "Vino rosado fresco y aromático",
-        "fd_sugerido": 1
-    },
-    "Vino Tinto Joven": {
-        "imagen": "🍇",
-        "color": "#DC143C",
-        "concentracion_fe": 12.3,  # mg/L
-        "descripcion": "Vino tinto joven, intenso",
-        "fd_sugerido": 3
-    }
-}
-
 # ============================================================================
 # INICIALIZACIÓN DE SESSION STATE
 # ============================================================================
 
-if 'masa_sal_mohr' not in st.session_state:
-    st.session_state.masa_sal_mohr = None
-
-if 'volumen_aforo_patron' not in st.session_state:
-    st.session_state.volumen_aforo_patron = None
-
-if 'conc_patron_madre' not in st.session_state:
-    st.session_state.conc_patron_madre = None
-
-if 'patrones_preparados' not in st.session_state:
-    st.session_state.patrones_preparados = []
-
-if 'vino_seleccionado' not in st.session_state:
-    st.session_state.vino_seleccionado = None
-
-if 'alicuota_vino' not in st.session_state:
-    st.session_state.alicuota_vino = None
-
-if 'volumen_aforo_muestra' not in st.session_state:
-    st.session_state.volumen_aforo_muestra = None
-
-if 'conc_muestra_diluida' not in st.session_state:
-    st.session_state.conc_muestra_diluida = None
-
-if 'mediciones_aa' not in st.session_state:
-    st.session_state.mediciones_aa = {}
-
-# ============================================================================
-# FUNCIONES DE CÁLCULO
-# ============================================================================
-
-def calcular_concentracion_patron_madre(masa_sal, volumen_aforo):
-    """
-    Calcula la concentración de Fe en la solución patrón madre
-    Sal de Mohr: (NH4)2Fe(SO4)2·6H2O
-    MM = 392.14 g/mol
-    MM Fe = 55.845 g/mol
-    """
-    if masa_sal is None or volumen_aforo is None:
-        return None
-    
-    mm_sal = 392.14  # g/mol
-    mm_fe = 55.845   # g/mol
-    
-    # Moles de sal
-    moles_sal = masa_sal / mm_sal
-    
-    # Moles de Fe (1:1)
-    moles_fe = moles_sal
-    
-    # Masa de Fe
-    masa_fe = moles_fe * mm_fe  # g
-    masa_fe_mg = masa_fe * 1000  # mg
-    
-    # Concentración en mg/L
-    conc_mg_L = masa_fe_mg / (volumen_aforo / 1000)
-    
-    return conc_mg_L
-
-def calcular_concentracion_patron(conc_madre, alicuota, volumen_aforo):
-    """Calcula la concentración de un patrón por dilución"""
-    if conc_madre is None:
-        return None
-    return (conc_madre * alicuota) / volumen_aforo
-
-def generar_absorbancia(concentracion, curva_lineal=True):
-    """
-    Genera absorbancia basada en Ley de Beer
-    Si curva_lineal=False, añade desviaciones
-    """
-    # Coeficiente de absorción típico para Fe a 248.3 nm
-    k = 0.082  # L/(mg·cm)
-    
-    if curva_lineal:
-        # Ley de Beer perfecta con pequeño ruido
-        abs_teorica = k * concentracion
-        ruido = np.random.normal(0, 0.002)
-        return abs_teorica + ruido
-    else:
-        # Con desviaciones (concentraciones fuera de rango óptimo)
-        abs_teorica = k * concentracion
-        # Añadir desviaciones no lineales
-        desviacion = np.random.normal(0, 0.02) + 0.01 * (concentracion - 3)**2
-        return abs_teorica + desviacion
-
-def calcular_fd_muestra(alicuota, volumen_aforo):
-    """Calcula el factor de dilución de la muestra"""
-    if alicuota is None or volumen_aforo is None:
-        return None
-    return volumen_aforo / alicuota
-
-def verificar_rango_optimo(concentracion):
-    """Verifica si la concentración está en rango óptimo (1-5 mg/L)"""
-    return 1.0 <= concentracion <= 5.0
+# Todo el estado de la práctica vive en un solo objeto compacto
+# (ver labvirtual.estado); los widgets mantienen sus propias claves.
+if 'lab' not in st.session_state:
+    st.session_state.lab = EstadoLaboratorio()
 
 # ============================================================================
 # ESTILOS CSS
@@ -225,6 +150,11 @@ st.markdown("""
 # PÁGINAS DE LA APLICACIÓN
 # ============================================================================
 
+# Ancho pedido a labvirtual.recursos (se sirve la variante WebP más cercana)
+ANCHO_TARJETA = 160  # px, miniatura de la tarjeta de cada vino
+ANCHO_LOGO = 150     # px en pantalla; se pide el doble para pantallas de alta densidad
+
+@instrumentar(tipo="etapa")
 def mostrar_inicio():
     st.markdown("## 🎯 Objetivo de la Práctica")
     st.markdown("""
@@ -281,21 +211,78 @@ def mostrar_inicio():
 
     st.markdown("### 🍷 Muestras de Vino Disponibles")
     
+    catalogo = obtener_catalogo()
     cols = st.columns(4)
     
-    for i, (nombre, datos) in enumerate(VINOS_DATABASE.items()):
+    imagenes = obtener_imagenes()
+    for i in range(min(len(catalogo), 4)):
+        nombre, datos = catalogo.nombre(i), catalogo.fila(i)
+        # Miniatura pre-generada si el vino tiene imagen; si no, el emoji
+        url = imagenes.url(os.path.basename(datos.get('ruta_imagen') or ""), ANCHO_TARJETA)
+        figura = (f'<img src="{url}" alt="" style="height: 96px; max-width: 100%; object-fit: contain;">'
+                  if url else datos['imagen'])
         with cols[i]:
             st.markdown(f"""
             <div class="wine-card">
-                <div style="font-size: 48px;">{datos['imagen']}</div>
+                <div style="font-size: 48px;">{figura}</div>
                 <h4>{nombre}</h4>
                 <p style="color: {datos['color']}; font-weight: bold;">
                     {datos['descripcion']}
                 </p>
             </div>
             """, unsafe_allow_html=True)
+    
+    if len(catalogo) > 4:
+        st.caption(f"... y {len(catalogo) - 4:,} vinos más en el catálogo (Etapa 3)")
 
+# ============================================================================
+# SIMULADOR DE PESADO EMBEBIDO
+# ============================================================================
+
+ALTO_SIMULADOR = 780  # px
+
+# Reenvía a Streamlit el mensaje PESADO_COMPLETADO que publica confirmarMasa()
+JS_SIMULADOR_PESADO = """
+export default function ({ parentElement, setTriggerValue }) {
+    const marco = parentElement.querySelector("iframe");
+    const recibir = (evento) => {
+        if (evento.source !== marco.contentWindow) return;
+        if (evento.data && evento.data.type === "PESADO_COMPLETADO") {
+            setTriggerValue("masa", evento.data.masa);
+        }
+    };
+    window.addEventListener("message", recibir);
+    return () => window.removeEventListener("message", recibir);
+}
+"""
+
+
+@functools.cache
+def marco_simulador_pesado():
+    """iframe con el simulador, armado una sola vez por proceso"""
+    return (
+        f'<iframe srcdoc="{html.escape(html_simulador_pesado(), quote=True)}" '
+        f'title="Simulador de pesado" style="width: 100%; height: {ALTO_SIMULADOR}px; border: 0;"></iframe>'
+    )
+
+
+def componente_simulador_pesado():
+    """
+    Componente del simulador
+
+    El registro de componentes es de cada runtime de Streamlit, así que se
+    registra en cada ejecución (volver a registrar la misma definición no
+    cuesta nada); solo el HTML se arma una vez.
+    """
+    return st.components.v2.component("simulador_pesado", html=marco_simulador_pesado(),
+                                      js=JS_SIMULADOR_PESADO)
+
+
+@st.fragment
+@instrumentar(tipo="etapa")
 def mostrar_patron_madre():
+    lab = st.session_state.lab
+    
     st.markdown("## 1️⃣ Preparación de Solución Patrón Madre de Fe")
     
     st.markdown("""
@@ -308,24 +295,14 @@ def mostrar_patron_madre():
     
     st.markdown("### 🎮 Simulador Avanzado de Pesado")
     
-    # URL del simulador externo - ¡CAMBIAR POR TU URL REAL!
-    URL_SIMULADOR = "https://github.com/DouglasVenegas/simulador-pesado/blob/main/index.html"  # ← CAMBIA ESTO
+    # Simulador embebido: al confirmar el pesado, la masa llega directo al registro
+    resultado = componente_simulador_pesado()(key="simulador_pesado", on_masa_change=lambda: None)
+    if resultado.masa is not None:
+        st.session_state.masa_simulador_externo = round(float(resultado.masa), 4)
     
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        st.markdown("#### 🌐 Simulador Externo")
-        st.markdown(f"""
-        <a href="{URL_SIMULADOR}" target="_blank">
-            <button style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                          color: white; padding: 20px 30px; border: none; 
-                          border-radius: 15px; font-size: 18px; cursor: pointer;
-                          width: 100%; margin: 10px 0;">
-                🎮 ABRIR SIMULADOR AVANZADO
-            </button>
-        </a>
-        """, unsafe_allow_html=True)
-        
         st.info("""
         **Características del simulador:**
         - ⚖️ Balanza analítica realista
@@ -339,24 +316,22 @@ def mostrar_patron_madre():
         st.markdown("#### 📋 Instrucciones")
         st.success("""
         **Pasos a seguir:**
-        1. **Haz clic en "Abrir Simulador Avanzado"**
-        2. **El simulador se abrirá en nueva pestaña**
-        3. **Pesa entre 0.2g y 5.0g de Sal de Mohr**
-        4. **Confirma tu pesado en el simulador**
-        5. **Regresa aquí e ingresa la masa obtenida**
-        6. **Continúa con el aforo del patrón madre**
+        1. **Pesa entre 0.2g y 5.0g de Sal de Mohr en el simulador**
+        2. **Confirma tu pesado en el simulador**
+        3. **La masa se registra automáticamente abajo**
+        4. **Continúa con el aforo del patrón madre**
         """)
         
         st.warning("""
         **💡 Recomendaciones:**
         - Busca una masa estable antes de confirmar
         - Considera el volumen de balón que usarás
-        - Anota tu masa para no olvidarla
+        - Si hace falta, puedes corregir la masa a mano
         """)
     
     st.markdown("---")
     
-    # Input para registrar la masa del simulador externo
+    # Registro de la masa: lo llena el simulador, pero se puede editar a mano
     st.markdown("### 📝 Registro de Masa Obtenida")
     
     col1, col2 = st.columns(2)
@@ -366,29 +341,29 @@ def mostrar_patron_madre():
             "Masa obtenida en el simulador (g):",
             min_value=0.20,
             max_value=5.00,
-            value=st.session_state.masa_sal_mohr if st.session_state.masa_sal_mohr else None,
+            value=lab.masa_sal_mohr if lab.masa_sal_mohr else None,
             step=0.0001,
             format="%.4f",
-            help="Ingresa exactamente la masa que obtuviste en el simulador externo",
+            help="Se llena al confirmar el pesado en el simulador; también se puede ingresar a mano",
             key="masa_simulador_externo"
         )
         
         if masa_simulador:
-            st.session_state.masa_sal_mohr = masa_simulador
+            lab.fijar(masa_sal_mohr=masa_simulador)
             st.success(f"✅ Masa registrada: {masa_simulador:.4f} g")
     
     with col2:
-        if st.session_state.masa_sal_mohr:
+        if lab.masa_sal_mohr:
             st.metric(
                 "Masa Confirmada",
-                f"{st.session_state.masa_sal_mohr:.4f} g",
+                f"{lab.masa_sal_mohr:.4f} g",
                 help="Esta masa se usará para los cálculos del patrón madre"
             )
             
             # Validación de rango
-            if st.session_state.masa_sal_mohr < 0.2:
+            if lab.masa_sal_mohr < 0.2:
                 st.error("❌ Masa muy baja (< 0.2 g)")
-            elif st.session_state.masa_sal_mohr > 5.0:
+            elif lab.masa_sal_mohr > 5.0:
                 st.error("❌ Masa excede el máximo (> 5.0 g)")
             else:
                 st.success("✅ Masa en rango válido")
@@ -411,11 +386,11 @@ def mostrar_patron_madre():
         )
         
         if volumen_balon:
-            st.session_state.volumen_aforo_patron = volumen_balon
+            lab.fijar(volumen_aforo_patron=volumen_balon)
             st.success(f"✅ Balón de {volumen_balon} mL seleccionado")
     
     with col2:
-        if st.session_state.volumen_aforo_patron:
+        if lab.volumen_aforo_patron:
             st.markdown("#### Aforar hasta la marca")
             st.info("Completa con agua destilada hasta la marca de aforo, usando una piseta")
             
@@ -430,22 +405,22 @@ def mostrar_patron_madre():
             """, unsafe_allow_html=True)
     
     # Cálculos
-    if st.session_state.masa_sal_mohr and st.session_state.volumen_aforo_patron:
+    if lab.masa_sal_mohr and lab.volumen_aforo_patron:
         st.markdown("---")
         st.markdown("### 🧮 Cálculos Automáticos")
         
         conc_patron_madre = calcular_concentracion_patron_madre(
-            st.session_state.masa_sal_mohr,
-            st.session_state.volumen_aforo_patron
+            lab.masa_sal_mohr,
+            lab.volumen_aforo_patron
         )
         
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Masa Sal de Mohr", f"{st.session_state.masa_sal_mohr:.4f} g")
+            st.metric("Masa Sal de Mohr", f"{lab.masa_sal_mohr:.4f} g")
         
         with col2:
-            st.metric("Volumen Aforo", f"{st.session_state.volumen_aforo_patron} mL")
+            st.metric("Volumen Aforo", f"{lab.volumen_aforo_patron} mL")
         
         with col3:
             st.metric(
@@ -456,17 +431,15 @@ def mostrar_patron_madre():
         
         # Mostrar cálculos detallados
         with st.expander("📐 Ver cálculos detallados"):
-            mm_sal = 392.14
-            mm_fe = 55.845
-            moles_sal = st.session_state.masa_sal_mohr / mm_sal
-            masa_fe_mg = moles_sal * mm_fe * 1000
+            moles_sal = lab.masa_sal_mohr / MM_SAL_MOHR
+            masa_fe_mg = moles_sal * MM_FE * 1000
             
             st.markdown(f"""
             **Paso 1: Cálculo de moles de Sal de Mohr**
             
             MM (NH₄)₂Fe(SO₄)₂·6H₂O = 392.14 g/mol
             
-            n(Sal) = {st.session_state.masa_sal_mohr:.4f} g ÷ 392.14 g/mol = **{moles_sal:.6f} mol**
+            n(Sal) = {lab.masa_sal_mohr:.4f} g ÷ 392.14 g/mol = **{moles_sal:.6f} mol**
             
             ---
             
@@ -480,7 +453,7 @@ def mostrar_patron_madre():
             
             MM Fe = 55.845 g/mol
             
-            masa(Fe) = {moles_sal:.6f} mol × 55.845 g/mol = {moles_sal * mm_fe:.6f} g
+            masa(Fe) = {moles_sal:.6f} mol × 55.845 g/mol = {moles_sal * MM_FE:.6f} g
             
             masa(Fe) = **{masa_fe_mg:.4f} mg**
             
@@ -490,7 +463,7 @@ def mostrar_patron_madre():
             
             C = masa(Fe) / Volumen(L)
             
-            C = {masa_fe_mg:.4f} mg ÷ {st.session_state.volumen_aforo_patron/1000:.3f} L
+            C = {masa_fe_mg:.4f} mg ÷ {lab.volumen_aforo_patron/1000:.3f} L
             
             C = **{conc_patron_madre:.2f} mg/L**
             """)
@@ -531,7 +504,7 @@ def mostrar_patron_madre():
             🎯 Puedes continuar con la preparación de la curva de calibración
             """)
         
-        st.session_state.conc_patron_madre = conc_patron_madre
+        lab.fijar(conc_patron_madre=conc_patron_madre)
         
         # Botón para continuar
         st.markdown("---")
@@ -544,10 +517,14 @@ def mostrar_patron_madre():
                 st.info("👉 Ve a la **Etapa 2: Curva de Calibración** en el menú lateral")
                 st.balloons()
 
+@st.fragment
+@instrumentar(tipo="etapa")
 def mostrar_curva_calibracion():
+    lab = st.session_state.lab
+    
     st.markdown("## 2️⃣ Preparación de Curva de Calibración")
     
-    if st.session_state.masa_sal_mohr is None:
+    if lab.masa_sal_mohr is None:
         st.warning("⚠️ Primero debes preparar el patrón madre en la Etapa 1")
         return
     
@@ -559,7 +536,7 @@ def mostrar_curva_calibracion():
     </div>
     """, unsafe_allow_html=True)
     
-    conc_madre = st.session_state.conc_patron_madre
+    conc_madre = lab.conc_patron_madre
     
     st.info(f"💡 Concentración del patrón madre: **{conc_madre:.2f} mg/L**")
     
@@ -571,77 +548,145 @@ def mostrar_curva_calibracion():
         key="num_patrones_select"
     )
     
-    st.markdown("### 🧪 Preparación de Patrones")
+    mostrar_planes_dilucion(conc_madre, num_patrones)
     
-    patrones_data = []
+    st.markdown("### 🧪 Preparación de Patrones")
     
+    # Cada fila es un fragmento: editar un patrón solo vuelve a ejecutar esa
+    # fila y el resumen, no la página completa
     for i in range(num_patrones):
-        st.markdown(f"#### Patrón {i+1}")
-        
-        col1, col2, col3, col4 = st.columns(4)
+        st.fragment(fila_patron, key=f"fila_patron_{i}")(i, conc_madre)
+    
+    resumen_patrones(num_patrones, conc_madre)
+
+def _aplicar_plan(plan):
+    """Callback: copia un plan sugerido a los widgets de las filas"""
+    for i, (alicuota, aforo) in enumerate(zip(plan.alicuotas, plan.aforos)):
+        st.session_state[f"alicuota_{i}"] = float(alicuota)
+        st.session_state[f"aforo_{i}"] = int(aforo)
+
+def mostrar_planes_dilucion(conc_madre, num_patrones):
+    """Sugerencias del planificador (se recalculan con cada patrón madre)"""
+    with st.expander("🧮 Sugerencias de dilución"):
+        planes = planes_dilucion(conc_madre, num_patrones)
         
-        with col1:
-            alicuota = st.number_input(
-                f"Alícuota patrón madre (mL):",
-                min_value=0.1,
-                max_value=50.0,
-                value=None,
-                step=0.1,
-                key=f"alicuota_{i}"
+        if not planes:
+            st.warning(
+                f"⚠️ Con {conc_madre:.2f} mg/L no es posible preparar {num_patrones} "
+                "patrones distintos en el rango 1-5 mg/L. Revisa el patrón madre."
             )
+            return
         
-        with col2:
-            vol_aforo = st.selectbox(
-                f"Volumen aforo (mL):",
-                [None, 10, 25, 50, 100],
-                format_func=lambda x: "Seleccione..." if x is None else f"{x} mL",
-                key=f"aforo_{i}"
-            )
+        st.caption("Conjuntos repartidos en 1-5 mg/L con el menor número de pasos de pipeteo")
         
-        if alicuota and vol_aforo:
-            conc_patron = calcular_concentracion_patron(conc_madre, alicuota, vol_aforo)
-            
-            with col3:
-                st.metric("Concentración", f"{conc_patron:.3f} mg/L")
-            
-            with col4:
-                if verificar_rango_optimo(conc_patron):
-                    st.success("✅ En rango")
-                else:
-                    st.error("❌ Fuera de rango")
-            
-            patrones_data.append({
-                'patron': i+1,
-                'alicuota': alicuota,
-                'volumen': vol_aforo,
-                'concentracion': conc_patron,
-                'en_rango': verificar_rango_optimo(conc_patron)
-            })
-    
-    if len(patrones_data) == num_patrones:
-        st.session_state.patrones_preparados = patrones_data
-        
-        # Resumen
-        st.markdown("---")
-        st.markdown("### 📊 Resumen de Patrones Preparados")
+        for j, plan in enumerate(planes):
+            filas = "\n".join(
+                f"| {i + 1} | {a:.1f} | {v} | {c:.3f} |"
+                for i, (a, v, c) in enumerate(zip(plan.alicuotas, plan.aforos, plan.concentraciones))
+            )
+            st.markdown(f"""
+**Plan {j + 1}** — {plan.pasos} pasos de pipeteo, cubre {plan.cobertura:.0%} del rango
+
+| Patrón | Alícuota (mL) | Aforo (mL) | Concentración (mg/L) |
+|---|---|---|---|
+{filas}
+            """)
+            st.button(f"Usar plan {j + 1}", key=f"aplicar_plan_{j}", on_click=_aplicar_plan, args=(plan,))
+
+def _actualizar_patron(i):
+    """Callback de los widgets de una fila: rerun de la fila y del resumen"""
+    st.rerun([f"fila_patron_{i}", "resumen_patrones"])
+
+@instrumentar(tipo="fragmento")
+def fila_patron(i, conc_madre):
+    st.markdown(f"#### Patrón {i+1}")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        alicuota = st.number_input(
+            f"Alícuota patrón madre (mL):",
+            min_value=0.1,
+            max_value=50.0,
+            value=None,
+            step=0.1,
+            key=f"alicuota_{i}",
+            on_change=_actualizar_patron,
+            args=(i,)
+        )
+    
+    with col2:
+        vol_aforo = st.selectbox(
+            f"Volumen aforo (mL):",
+            [None, 10, 25, 50, 100],
+            format_func=lambda x: "Seleccione..." if x is None else f"{x} mL",
+            key=f"aforo_{i}",
+            on_change=_actualizar_patron,
+            args=(i,)
+        )
+    
+    if alicuota and vol_aforo:
+        conc_patron = calcular_concentracion_patron(conc_madre, alicuota, vol_aforo)
         
-        df = pd.DataFrame(patrones_data)
-        st.dataframe(df, use_container_width=True)
+        with col3:
+            st.metric("Concentración", f"{conc_patron:.3f} mg/L")
         
-        # Verificar cuántos están en rango
-        en_rango = sum([p['en_rango'] for p in patrones_data])
+        with col4:
+            if verificar_rango_optimo(conc_patron):
+                st.success("✅ En rango")
+            else:
+                st.error("❌ Fuera de rango")
+
+@st.fragment(key="resumen_patrones")
+@instrumentar(tipo="fragmento")
+def resumen_patrones(num_patrones, conc_madre):
+    lab = st.session_state.lab
+    
+    # Valores de todas las filas, leídos de los widgets
+    alicuotas = [st.session_state.get(f"alicuota_{i}") for i in range(num_patrones)]
+    aforos = [st.session_state.get(f"aforo_{i}") for i in range(num_patrones)]
+    
+    if not all(alicuotas) or not all(aforos):
+        return
+    
+    concentraciones = calcular_concentracion_patron(conc_madre, np.array(alicuotas), np.array(aforos))
+    lab.fijar_patrones(alicuotas, aforos, concentraciones)
+    
+    # Resumen
+    st.markdown("---")
+    st.markdown("### 📊 Resumen de Patrones Preparados")
+    
+    import pandas as pd  # importación diferida: solo se necesita al completar la tabla
+    
+    df = pd.DataFrame(lab.patrones[['patron', 'alicuota', 'volumen', 'concentracion', 'en_rango']])
+    st.dataframe(df, use_container_width=True)
+    
+    # Verificar cuántos están en rango
+    en_rango = int(lab.patrones['en_rango'].sum())
+    
+    if en_rango == num_patrones:
+        st.success(f"✅ Todos los patrones ({en_rango}/{num_patrones}) están en el rango óptimo (1-5 mg/L)")
+    else:
+        st.warning(f"⚠️ Solo {en_rango}/{num_patrones} patrones están en el rango óptimo")
         
-        if en_rango == num_patrones:
-            st.success(f"✅ Todos los patrones ({en_rango}/{num_patrones}) están en el rango óptimo (1-5 mg/L)")
-        else:
-            st.warning(f"⚠️ Solo {en_rango}/{num_patrones} patrones están en el rango óptimo")
-            
-        # Botón para continuar
-        if st.button("➡️ Continuar a Preparación de Muestra", type="primary"):
-            st.success("✅ Curva de calibración preparada")
-            st.info("👉 Ve a la **Etapa 3: Preparación de Muestra** en el menú lateral")
+    # Botón para continuar
+    if st.button("➡️ Continuar a Preparación de Muestra", type="primary"):
+        st.success("✅ Curva de calibración preparada")
+        st.info("👉 Ve a la **Etapa 3: Preparación de Muestra** en el menú lateral")
+
+VINOS_POR_PAGINA = 8
+
+def _reiniciar_pagina_vinos():
+    st.session_state.pagina_vinos = 1
+
+def _seleccionar_vino(nombre):
+    st.session_state.lab.fijar(vino_seleccionado=nombre)
 
+@st.fragment
+@instrumentar(tipo="etapa")
 def mostrar_preparacion_muestra():
+    lab = st.session_state.lab
+    
     st.markdown("## 3️⃣ Preparación de Muestra de Vino")
     
     st.markdown("""
@@ -654,23 +699,54 @@ def mostrar_preparacion_muestra():
     
     st.markdown("### 🍷 Selección de Muestra")
     
-    # Mostrar vinos disponibles
+    catalogo = obtener_catalogo()
+    indices = np.arange(len(catalogo))
+    
+    # Con un catálogo grande se busca y se pagina en lugar de mostrarlo completo
+    if len(catalogo) > VINOS_POR_PAGINA:
+        busqueda = st.text_input(
+            "🔎 Buscar vino:",
+            key="buscar_vino",
+            placeholder="Nombre o descripción: tinto, blanco, afrutado...",
+            on_change=_reiniciar_pagina_vinos
+        )
+        indices = catalogo.buscar(busqueda)
+        st.caption(f"{len(indices):,} de {len(catalogo):,} vinos")
+    
+    paginas = max(1, -(-len(indices) // VINOS_POR_PAGINA))
+    pagina = 1
+    if paginas > 1:
+        pagina = st.number_input("Página:", min_value=1, max_value=paginas, step=1, key="pagina_vinos")
+    indices_pagina, _ = catalogo.paginar(indices, pagina, VINOS_POR_PAGINA)
+    
     cols = st.columns(4)
     
-    for i, (nombre, datos) in enumerate(VINOS_DATABASE.items()):
-        with cols[i]:
-            if st.button(
+    for k, i in enumerate(indices_pagina):
+        nombre, datos = catalogo.nombre(i), catalogo.fila(i)
+        with cols[k % 4]:
+            # El callback corre antes del rerun: no hace falta un st.rerun() extra
+            st.button(
                 f"{datos['imagen']}\n\n**{nombre}**\n\n{datos['descripcion']}",
                 key=f"vino_{i}",
-                use_container_width=True
-            ):
-                st.session_state.vino_seleccionado = nombre
-                st.rerun()
+                use_container_width=True,
+                on_click=_seleccionar_vino,
+                args=(nombre,)
+            )
     
-    if st.session_state.vino_seleccionado:
-        vino = VINOS_DATABASE[st.session_state.vino_seleccionado]
+    if lab.vino_seleccionado:
+        vino = catalogo[lab.vino_seleccionado]
         
-        st.success(f"✅ Vino seleccionado: **{st.session_state.vino_seleccionado}**")
+        st.success(f"✅ Vino seleccionado: **{lab.vino_seleccionado}**")
+        
+        # Diluciones factibles desde el índice precalculado del proceso
+        diluciones = INDICE_DILUCIONES.obtener(lab.vino_seleccionado, vino['concentracion_fe'])
+        with st.expander("💡 Pistas del profesor: diluciones que funcionan"):
+            st.caption(f"{diluciones.n_factibles} combinaciones de alícuota y aforo dejan la muestra en 1-5 mg/L")
+            for aforo, rango in diluciones.rangos.items():
+                if rango is None:
+                    st.markdown(f"- Balón de **{aforo} mL**: ninguna alícuota de 0.1 a 50 mL")
+                else:
+                    st.markdown(f"- Balón de **{aforo} mL**: alícuotas de {rango[0]:.1f} a {rango[1]:.1f} mL")
         
         # Simulador de dilución
         st.markdown("### 🧪 Preparación de Dilución")
@@ -682,7 +758,7 @@ def mostrar_preparacion_muestra():
                 "Alícuota de vino (mL):",
                 min_value=0.1,
                 max_value=50.0,
-                value=st.session_state.alicuota_vino if st.session_state.alicuota_vino else None,
+                value=lab.alicuota_vino if lab.alicuota_vino else None,
                 step=0.1,
                 help="Volumen de vino a tomar",
                 key="alicuota_vino_input"
@@ -697,8 +773,7 @@ def mostrar_preparacion_muestra():
             )
         
         if alicuota_vino and volumen_aforo_muestra:
-            st.session_state.alicuota_vino = alicuota_vino
-            st.session_state.volumen_aforo_muestra = volumen_aforo_muestra
+            lab.fijar(alicuota_vino=alicuota_vino, volumen_aforo_muestra=volumen_aforo_muestra)
             
             # Calcular factor de dilución y concentración esperada
             fd = calcular_fd_muestra(alicuota_vino, volumen_aforo_muestra)
@@ -725,17 +800,31 @@ def mostrar_preparacion_muestra():
                     else:
                         st.error("❌ Muy concentrado (> 5 mg/L)")
             
-            st.session_state.conc_muestra_diluida = conc_diluida
+            # Sugerencia desde el índice de diluciones factibles del vino
+            rango = diluciones.rangos.get(volumen_aforo_muestra)
+            if not verificar_rango_optimo(conc_diluida):
+                if rango is None:
+                    st.info(f"💡 Con el balón de {volumen_aforo_muestra} mL ninguna alícuota de 0.1 a 50 mL "
+                            f"deja este vino en rango: prueba otro balón")
+                else:
+                    st.info(f"💡 Con el balón de {volumen_aforo_muestra} mL usa una alícuota "
+                            f"de {rango[0]:.1f} a {rango[1]:.1f} mL")
+            
+            lab.fijar(conc_muestra_diluida=conc_diluida)
             
             # Botón para continuar
             if st.button("➡️ Continuar a Medición AA", type="primary"):
                 st.success("✅ Muestra preparada correctamente")
                 st.info("👉 Ve a la **Etapa 4: Medición AA** en el menú lateral")
 
+@st.fragment
+@instrumentar(tipo="etapa")
 def mostrar_medicion_aa():
+    lab = st.session_state.lab
+    
     st.markdown("## 4️⃣ Medición por Absorción Atómica")
     
-    if not st.session_state.patrones_preparados:
+    if lab.patrones.size == 0:
         st.warning("⚠️ Primero debes preparar la curva de calibración en la Etapa 2")
         return
     
@@ -749,159 +838,440 @@ def mostrar_medicion_aa():
     
     st.markdown("### 🔬 Simulador de Espectrómetro AA")
     
-    tab1, tab2 = st.tabs(["📊 Medición de Patrones", "🍷 Medición de Muestra"])
+    en_vivo = st.toggle(
+        "📈 Señal en vivo", key="senal_en_vivo",
+        help="Muestra la señal del detector mientras se aspiran las soluciones"
+    )
+    
+    tab1, tab2, tab3 = st.tabs(["📊 Medición de Patrones", "🍷 Medición de Muestra", "🍾 Lote de Muestras"])
     
     with tab1:
         st.markdown("#### Medición de Patrones para Curva de Calibración")
         
-        patrones = st.session_state.patrones_preparados
+        patrones = lab.patrones
+        todos_en_rango = bool(patrones['en_rango'].all())
         
         if st.button("🔥 Medir Todos los Patrones", key="medir_patrones"):
-            # Verificar si los patrones están en rango
-            todos_en_rango = all([p['en_rango'] for p in patrones])
-            
-            resultados_patrones = []
-            
-            for patron in patrones:
-                conc = patron['concentracion']
-                # Generar absorbancia basado en si están en rango
-                abs_val = generar_absorbancia(conc, curva_lineal=todos_en_rango)
-                
-                resultados_patrones.append({
-                    'Patrón': patron['patron'],
-                    'Concentración (mg/L)': conc,
-                    'Absorbancia': abs_val
-                })
-            
-            st.session_state.mediciones_aa['patrones'] = resultados_patrones
-            
-            df_resultados = pd.DataFrame(resultados_patrones)
-            st.dataframe(df_resultados, use_container_width=True)
-            
-            # Gráfico
-            fig = px.scatter(
-                df_resultados,
-                x='Concentración (mg/L)',
-                y='Absorbancia',
-                title='Curva de Calibración',
-                trendline='ols'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            # Secuencia completa (blanco + patrones) en una sola llamada vectorizada
+            corrida = medir_patrones(lab)
             
-            if todos_en_rango:
-                st.success("✅ Curva de calibración lineal - Patrones en rango óptimo")
+            if en_vivo:
+                etiquetas = [BLANCO] + [f"Patrón {p}" for p in patrones['patron']]
+                st.session_state.senal_patrones = SenalEnVivo(corrida, etiquetas)
             else:
-                st.warning("⚠️ Curva con desviaciones - Algunos patrones fuera de rango")
+                st.session_state.pop("senal_patrones", None)
+                mostrar_lecturas_patrones(corrida, todos_en_rango)
+        
+        # Una señal de patrones que ya no existen se descarta
+        senal = st.session_state.get("senal_patrones")
+        if senal is not None and not np.array_equal(senal.corrida.concentraciones[1:], patrones['concentracion']):
+            del st.session_state.senal_patrones
+            senal = None
+        if senal is not None:
+            mostrar_senal_en_vivo("senal_patrones")
+            if senal.terminada:
+                mostrar_lecturas_patrones(senal.corrida, todos_en_rango)
     
     with tab2:
         st.markdown("#### Medición de Muestra de Vino")
         
-        if st.session_state.vino_seleccionado and hasattr(st.session_state, 'conc_muestra_diluida'):
+        if lab.vino_seleccionado and lab.conc_muestra_diluida is not None:
             if st.button("🔥 Medir Muestra", key="medir_muestra"):
-                conc_diluida = st.session_state.conc_muestra_diluida
-                en_rango = verificar_rango_optimo(conc_diluida)
-                
-                # Generar absorbancia
-                abs_muestra = generar_absorbancia(conc_diluida, curva_lineal=en_rango)
-                
-                st.session_state.mediciones_aa['muestra'] = {
-                    'vino': st.session_state.vino_seleccionado,
-                    'absorbancia': abs_muestra,
-                    'concentracion_diluida': conc_diluida
-                }
+                # Blanco, muestra y el patrón central como control de deriva
+                corrida = medir_muestra(lab)
                 
-                st.metric("Absorbancia de la Muestra", f"{abs_muestra:.4f}")
-                
-                if en_rango:
-                    st.success("✅ Absorbancia dentro del rango de la curva")
+                if en_vivo:
+                    st.session_state.senal_muestra = SenalEnVivo(corrida, [BLANCO, MUESTRA, CONTROL])
                 else:
-                    if conc_diluida < 1.0:
-                        st.error("❌ Absorbancia muy baja - Muestra muy diluida")
-                    else:
-                        st.error("❌ Absorbancia muy alta - Muestra muy concentrada")
-                        
-                # Botón para continuar
-                if st.button("➡️ Ver Resultados Finales", type="primary"):
-                    st.success("✅ Todas las mediciones completadas")
-                    st.info("👉 Ve a la **Etapa 5: Resultados** en el menú lateral")
+                    st.session_state.pop("senal_muestra", None)
+                    mostrar_lectura_muestra(corrida)
+            
+            senal = st.session_state.get("senal_muestra")
+            if senal is not None and senal.corrida.concentraciones[1] != lab.conc_muestra_diluida:
+                del st.session_state.senal_muestra
+                senal = None
+            if senal is not None:
+                mostrar_senal_en_vivo("senal_muestra")
+                if senal.terminada:
+                    mostrar_lectura_muestra(senal.corrida)
         else:
             st.info("Primero prepara la muestra en la Etapa 3")
+    
+    with tab3:
+        mostrar_lote_muestras(en_vivo)
 
+
+def mostrar_lecturas_patrones(corrida, todos_en_rango):
+    """Tabla de réplicas y curva de los patrones de una corrida"""
+    import pandas as pd
+    from labvirtual.graficos import figura_resultados_cacheada
+    
+    patrones = st.session_state.lab.patrones
+    concentraciones = patrones['concentracion']
+    absorbancias = corrida.media[1:]
+    
+    df_resultados = pd.DataFrame({
+        'Patrón': patrones['patron'],
+        'Concentración (mg/L)': concentraciones,
+        **{f'Réplica {r + 1}': corrida.lecturas[1:, r] for r in range(corrida.lecturas.shape[1])},
+        'Absorbancia': absorbancias,
+        'RSD (%)': corrida.rsd[1:],
+    })
+    st.dataframe(df_resultados, use_container_width=True)
+    
+    # Gráfico con la recta de nuestro ajuste (el mismo que usa la Etapa 5)
+    curva = ajuste_cacheado(concentraciones, absorbancias)
+    fig = figura_resultados_cacheada(concentraciones, absorbancias, curva)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    if todos_en_rango:
+        st.success("✅ Curva de calibración lineal - Patrones en rango óptimo")
+    else:
+        st.warning("⚠️ Curva con desviaciones - Algunos patrones fuera de rango")
+
+
+def mostrar_lectura_muestra(corrida):
+    """Absorbancia de la muestra y recuperación del patrón de control"""
+    lab = st.session_state.lab
+    conc_diluida = corrida.concentraciones[1]
+    conc_control = corrida.concentraciones[2]
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Absorbancia de la Muestra", f"{corrida.media[1]:.4f}")
+        st.caption(f"{corrida.lecturas.shape[1]} réplicas, RSD = {corrida.rsd[1]:.2f}%")
+    
+    # El patrón de control detecta la deriva del instrumento
+    if lab.patrones_medidos:
+        curva = ajuste_cacheado(lab.patrones['concentracion'], lab.patrones['absorbancia'])
+        recuperacion = 100 * curva.predecir(corrida.media[2]) / conc_control
+        with col2:
+            st.metric("Recuperación del control", f"{recuperacion:.1f}%",
+                      help=f"Patrón de {conc_control:.2f} mg/L leído después de la muestra")
+    
+    if verificar_rango_optimo(conc_diluida):
+        st.success("✅ Absorbancia dentro del rango de la curva")
+    elif conc_diluida < 1.0:
+        st.error("❌ Absorbancia muy baja - Muestra muy diluida")
+    else:
+        st.error("❌ Absorbancia muy alta - Muestra muy concentrada")
+    
+    # Botón para continuar
+    if st.button("➡️ Ver Resultados Finales", type="primary"):
+        st.success("✅ Todas las mediciones completadas")
+        st.info("👉 Ve a la **Etapa 5: Resultados** en el menú lateral")
+
+
+# ============================================================================
+# LOTE DE MUESTRAS
+# ============================================================================
+
+MAX_OPCIONES_LOTE = 50  # vinos ofrecidos por búsqueda en catálogos grandes
+
+
+def mostrar_lote_muestras(en_vivo):
+    """Varios vinos, cada uno con su dilución, leídos en una sola secuencia"""
+    lab = st.session_state.lab
+    catalogo = obtener_catalogo()
+    
+    st.markdown("#### Medición de Varias Muestras con la Misma Curva")
+    
+    if not lab.patrones_medidos:
+        st.info("Primero mide los patrones: todas las muestras del lote usan esa curva")
+        return
+    
+    if len(catalogo) > MAX_OPCIONES_LOTE:
+        texto = st.text_input("🔎 Buscar vinos", key="buscar_lote",
+                              placeholder="Nombre o descripción")
+        opciones = [catalogo.nombre(i) for i in catalogo.buscar(texto)[:MAX_OPCIONES_LOTE]]
+    else:
+        opciones = list(catalogo)
+    # Los vinos ya elegidos siguen disponibles aunque cambie la búsqueda
+    opciones += [v for v in st.session_state.get("lote_vinos", []) if v not in opciones]
+    
+    vinos = st.multiselect(
+        f"Vinos del lote (hasta {MAX_MUESTRAS_LOTE}):",
+        opciones,
+        key="lote_vinos",
+        max_selections=MAX_MUESTRAS_LOTE
+    )
+    if not vinos:
+        st.info("Selecciona los vinos que quieres medir con la curva actual")
+        return
+    
+    st.markdown("##### 🧪 Dilución de cada muestra")
+    alicuotas, volumenes = [], []
+    for vino in vinos:
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            st.markdown(f"{catalogo[vino]['imagen']} **{vino}**")
+        with col2:
+            alicuotas.append(st.number_input(
+                "Alícuota (mL)", min_value=0.1, max_value=50.0, value=10.0, step=0.1,
+                key=f"lote_alicuota_{vino}"
+            ))
+        with col3:
+            volumenes.append(st.selectbox(
+                "Aforo (mL)", AFOROS_MUESTRA, index=AFOROS_MUESTRA.index(25),
+                key=f"lote_aforo_{vino}"
+            ))
+    
+    if st.button("🔥 Medir Lote", key="medir_lote"):
+        # Una sola secuencia: blanco, todas las muestras y el patrón de control
+        conc_fe = [catalogo[v]['concentracion_fe'] for v in vinos]
+        corrida = medir_lote(lab, vinos, alicuotas, volumenes, conc_fe)
+        
+        if en_vivo:
+            st.session_state.senal_lote = SenalEnVivo(corrida, [BLANCO, *vinos, CONTROL])
+        else:
+            st.session_state.pop("senal_lote", None)
+            mostrar_lecturas_lote(corrida)
+    
+    senal = st.session_state.get("senal_lote")
+    if senal is not None and not np.array_equal(senal.corrida.concentraciones[1:-1],
+                                                lab.lote['concentracion_diluida']):
+        del st.session_state.senal_lote
+        senal = None
+    if senal is not None:
+        mostrar_senal_en_vivo("senal_lote")
+        if senal.terminada:
+            mostrar_lecturas_lote(senal.corrida)
+
+
+def mostrar_lecturas_lote(corrida):
+    """Réplicas y absorbancia de cada vino del lote"""
+    import pandas as pd
+    
+    lote = st.session_state.lab.lote
+    st.dataframe(pd.DataFrame({
+        'Vino': obtener_catalogo().nombres(lote['vino']),
+        'Factor de Dilución': lote['fd'],
+        **{f'Réplica {r + 1}': corrida.lecturas[1:-1, r] for r in range(corrida.lecturas.shape[1])},
+        'Absorbancia': corrida.media[1:-1],
+        'RSD (%)': corrida.rsd[1:-1],
+    }), hide_index=True, use_container_width=True)
+    st.info("👉 Las concentraciones del lote están en la **Etapa 5: Resultados**")
+
+
+def mostrar_resultados_lote(x, y, curva):
+    """Concentración de todos los vinos del lote con una sola interpolación vectorizada"""
+    import pandas as pd
+    from labvirtual.graficos import figura_lote_cacheada
+    
+    lab = st.session_state.lab
+    catalogo = obtener_catalogo()
+    
+    st.markdown("---")
+    st.markdown("### 🍾 Resultados del Lote")
+    st.markdown("C = (A - b) / m × FD, para cada vino con su propia dilución")
+    
+    resultado = evaluar_lote(curva, lab.lote, np.asarray(catalogo.columnas['concentracion_fe'])[lab.lote['vino']],
+                             n_replicas=lab.replicas("lote"))
+    
+    st.dataframe(pd.DataFrame({
+        'Vino': resultado.vinos,
+        'Absorbancia': resultado.absorbancias,
+        'Factor de Dilución': resultado.fd,
+        'Conc. en Dilución (mg/L)': resultado.conc_diluida,
+        'Conc. Calculada (mg/L)': resultado.conc_calculada,
+        '± s (mg/L)': resultado.incertidumbre,
+        'Conc. Real (mg/L)': resultado.conc_real,
+        'Error Relativo (%)': resultado.error_relativo,
+        'En rango': resultado.en_rango,
+    }), hide_index=True, use_container_width=True)
+    
+    st.plotly_chart(figura_lote_cacheada(x, y, curva, resultado), use_container_width=True)
+    
+    fuera = int((~resultado.en_rango).sum())
+    if fuera:
+        st.warning(f"⚠️ {fuera} muestra(s) fuera del rango de la curva - ajusta su dilución")
+    else:
+        st.success(f"✅ Todas las muestras en rango - error relativo medio {resultado.error_relativo.mean():.2f}%")
+
+
+# ============================================================================
+# SEÑAL EN VIVO DEL DETECTOR
+# ============================================================================
+
+INTERVALO_SENAL = 0.2  # s entre actualizaciones de la señal en vivo
+
+
+def mostrar_senal_en_vivo(clave):
+    """
+    Grafica la señal guardada en ``st.session_state[clave]``
+    
+    Mientras la corrida no termina, el fragmento se vuelve a ejecutar cada
+    ``INTERVALO_SENAL`` segundos y agrega un bloque de puntos. Se grafica la
+    envolvente de tamaño fijo, así que cada actualización cuesta y envía lo
+    mismo sin importar el largo de la señal.
+    """
+    senal = st.session_state[clave]
+    intervalo = None if senal.terminada else INTERVALO_SENAL
+    st.fragment(senal_en_vivo, run_every=intervalo)(clave)
+
+
+@instrumentar(tipo="fragmento")
+def senal_en_vivo(clave):
+    senal = st.session_state[clave]
+    leyo = senal.avanzar()
+    
+    tiempos, valores = senal.envolvente.serie()
+    st.line_chart(
+        {"Tiempo (s)": tiempos, "Absorbancia": valores},
+        x="Tiempo (s)", y="Absorbancia", height=260
+    )
+    if senal.terminada:
+        st.caption("✅ Secuencia completa")
+    else:
+        st.progress(senal.progreso, text=f"Aspirando: {senal.etiqueta}")
+    
+    # Al leer el último bloque, rerun completo para dejar de refrescar y mostrar las lecturas
+    if leyo and senal.terminada:
+        st.rerun()
+
+
+@st.fragment
+@instrumentar(tipo="etapa")
+def mostrar_incertidumbre(vino_nombre, conc_vino_original):
+    """Propaga por Monte Carlo la incertidumbre de toda la cadena analítica"""
+    import plotly.graph_objects as go
+    
+    lab = st.session_state.lab
+    
+    st.markdown("### 🎲 Incertidumbre por Monte Carlo")
+    
+    with st.expander("Propagar incertidumbre del procedimiento"):
+        st.markdown("""
+        Se repite la práctica completa miles de veces variando la masa pesada 
+        (balanza analítica), los volúmenes de balones y pipetas (tolerancias 
+        Clase A) y el ruido del espectrómetro.
+        """)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            n_simulaciones = st.selectbox(
+                "Número de simulaciones:",
+                [10_000, 100_000, 1_000_000],
+                index=1,
+                format_func=lambda x: f"{x:,}",
+                key="mc_n_simulaciones"
+            )
+        
+        with col2:
+            cobertura = st.selectbox(
+                "Nivel de cobertura:",
+                [0.90, 0.95, 0.99],
+                index=1,
+                format_func=lambda x: f"{x:.0%}",
+                key="mc_cobertura"
+            )
+        
+        if st.button("🎲 Simular", key="mc_simular"):
+            patrones = lab.patrones
+            
+            resultado = propagar_incertidumbre(
+                masa_sal=lab.masa_sal_mohr,
+                volumen_madre=lab.volumen_aforo_patron,
+                alicuotas_patrones=patrones['alicuota'],
+                volumenes_patrones=patrones['volumen'],
+                concentracion_vino=obtener_catalogo()[vino_nombre]['concentracion_fe'],
+                alicuota_vino=lab.alicuota_vino,
+                volumen_aforo_muestra=lab.volumen_aforo_muestra,
+                n_simulaciones=n_simulaciones,
+                cobertura=cobertura,
+                rng=lab.generador(FLUJO_INCERTIDUMBRE)
+            )
+            
+            inferior, superior = resultado.intervalo
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("Media simulada", f"{resultado.media:.2f} mg/L")
+            
+            with col2:
+                st.metric("Desviación estándar", f"{resultado.desviacion:.3f} mg/L")
+            
+            with col3:
+                st.metric(f"Intervalo {cobertura:.0%}", f"{inferior:.2f} – {superior:.2f} mg/L")
+            
+            # Histograma agregado en el servidor (no se envían todas las muestras)
+            conteos, bordes = np.histogram(resultado.muestras, bins=60)
+            centros = (bordes[:-1] + bordes[1:]) / 2
+            
+            fig = go.Figure()
+            fig.add_trace(go.Bar(x=centros, y=conteos, name='Simulaciones', marker_color='#DC143C'))
+            fig.add_vline(x=conc_vino_original, line_dash='dash', line_color='blue',
+                          annotation_text='Tu resultado')
+            fig.add_vline(x=resultado.valor_nominal, line_color='green',
+                          annotation_text='Valor real')
+            fig.update_layout(
+                title='Distribución de la concentración en el vino original',
+                xaxis_title='Concentración (mg/L)',
+                yaxis_title='Frecuencia',
+                bargap=0
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            
+            if inferior <= conc_vino_original <= superior:
+                st.success("✅ Tu resultado está dentro del intervalo esperado por el procedimiento")
+            else:
+                st.warning("⚠️ Tu resultado está fuera del intervalo esperado - revisa las mediciones")
+
+@st.fragment
+@instrumentar(tipo="etapa")
 def mostrar_resultados():
+    import pandas as pd
+    from labvirtual.graficos import figura_resultados_cacheada
+    
+    lab = st.session_state.lab
+    
     st.markdown("## 5️⃣ Resultados y Cálculos")
     
-    if 'patrones' not in st.session_state.mediciones_aa:
+    if not lab.patrones_medidos:
         st.warning("⚠️ Primero debes realizar las mediciones en la Etapa 4")
         return
     
     st.markdown("### 📊 Curva de Calibración Final")
     
-    df_patrones = pd.DataFrame(st.session_state.mediciones_aa['patrones'])
-    
     # Regresión lineal
-    x = df_patrones['Concentración (mg/L)'].values
-    y = df_patrones['Absorbancia'].values
-    
-    # Calcular pendiente e intercepto
-    z = np.polyfit(x, y, 1)
-    p = np.poly1d(z)
-    
-    # Coeficiente de determinación R²
-    yhat = p(x)
-    ybar = np.mean(y)
-    ssreg = np.sum((yhat - ybar)**2)
-    sstot = np.sum((y - ybar)**2)
-    r2 = ssreg / sstot
+    x = lab.patrones['concentracion']
+    y = lab.patrones['absorbancia']
+    
+    # Curva por estadísticos suficientes: pendiente, intercepto y R² en forma cerrada
+    curva = ajuste_cacheado(x, y)
+    if not curva.con_pendiente:
+        st.warning("⚠️ Todos los patrones tienen la misma concentración: la curva no define una recta. "
+                   "Prepara patrones con alícuotas distintas en la Etapa 2 y vuelve a medirlos")
+        return
+    pendiente, intercepto, r2 = curva.pendiente, curva.intercepto, curva.r2
     
     # Mostrar ecuación (CORREGIDO - sin f-string multilínea problemático)
     st.markdown("**Ecuación de la recta:**")
-    st.markdown(f"**A = {z[0]:.4f} × C + {z[1]:.4f}**")
+    st.markdown(f"**A = {pendiente:.4f} × C + {intercepto:.4f}**")
     st.markdown(f"**Coeficiente de determinación:** R² = {r2:.4f}")
     
-    # Gráfico mejorado
-    fig = go.Figure()
-    
-    # Puntos experimentales
-    fig.add_trace(go.Scatter(
-        x=x,
-        y=y,
-        mode='markers',
-        name='Patrones',
-        marker=dict(size=10, color='red')
-    ))
-    
-    # Línea de regresión
-    x_line = np.linspace(min(x), max(x), 100)
-    y_line = p(x_line)
-    
-    fig.add_trace(go.Scatter(
-        x=x_line,
-        y=y_line,
-        mode='lines',
-        name='Regresión lineal',
-        line=dict(color='blue', dash='dash')
-    ))
-    
-    # Muestra (si existe)
-    if 'muestra' in st.session_state.mediciones_aa:
-        abs_muestra = st.session_state.mediciones_aa['muestra']['absorbancia']
-        conc_muestra = st.session_state.mediciones_aa['muestra']['concentracion_diluida']
-        
-        fig.add_trace(go.Scatter(
-            x=[conc_muestra],
-            y=[abs_muestra],
-            mode='markers',
-            name='Muestra',
-            marker=dict(size=15, color='green', symbol='star')
-        ))
-    
-    fig.update_layout(
-        title='Curva de Calibración para Fe por AA',
-        xaxis_title='Concentración (mg/L)',
-        yaxis_title='Absorbancia',
-        hovermode='closest'
-    )
+    with st.expander("📐 Estadísticos de la regresión"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("s(pendiente)", f"{curva.s_pendiente:.5f}")
+            st.metric("s(intercepto)", f"{curva.s_intercepto:.5f}")
+        
+        with col2:
+            st.metric("s_y/x", f"{curva.s_yx:.5f}", help="Desviación estándar de los residuos")
+        
+        with col3:
+            st.metric("LOD", f"{curva.lod:.3f} mg/L", help="Límite de detección (3.3·s_y/x / m)")
+            st.metric("LOQ", f"{curva.loq:.3f} mg/L", help="Límite de cuantificación (10·s_y/x / m)")
+    
+    # Gráfico (compartido entre sesiones con los mismos datos)
+    muestra = None
+    if lab.muestra is not None:
+        muestra = (lab.muestra.concentracion_diluida, lab.muestra.absorbancia)
     
+    fig = figura_resultados_cacheada(x, y, curva, muestra)
     st.plotly_chart(fig, use_container_width=True)
     
     # Evaluación de la curva
@@ -913,27 +1283,40 @@ def mostrar_resultados():
         st.warning(f"⚠️ Linealidad aceptable (R² = {r2:.4f}) - Revisa los patrones")
     
     # Cálculo de concentración de la muestra
-    if 'muestra' in st.session_state.mediciones_aa:
+    if lab.muestra is not None:
         st.markdown("---")
         st.markdown("### 🧮 Cálculo de Concentración en la Muestra")
         
-        abs_muestra = st.session_state.mediciones_aa['muestra']['absorbancia']
-        vino_nombre = st.session_state.mediciones_aa['muestra']['vino']
+        abs_muestra = lab.muestra.absorbancia
+        vino_nombre = lab.muestra.vino
         
         # Calcular concentración a partir de la curva
-        conc_calculada_diluida = (abs_muestra - z[1]) / z[0]
+        conc_calculada_diluida = calcular_concentracion_muestra(abs_muestra, pendiente, intercepto)
         
         # Factor de dilución
-        fd = st.session_state.volumen_aforo_muestra / st.session_state.alicuota_vino
+        fd = calcular_fd_muestra(lab.alicuota_vino, lab.volumen_aforo_muestra)
         
         # Concentración en el vino original
         conc_vino_original = conc_calculada_diluida * fd
         
+        # Incertidumbre de la interpolación en la curva (A es el promedio de las réplicas)
+        s_vino_original = float(curva.incertidumbre_prediccion(abs_muestra, lab.replicas("muestra"))) * fd
+        
         # Concentración real del vino
-        conc_real = VINOS_DATABASE[vino_nombre]['concentracion_fe']
+        conc_real = obtener_catalogo()[vino_nombre]['concentracion_fe']
         
         # Error relativo
-        error_relativo = abs((conc_vino_original - conc_real) / conc_real) * 100
+        error_relativo = calcular_error_relativo(conc_vino_original, conc_real)
+        
+        # Guardar la práctica (una vez por medición; la escritura es en segundo plano)
+        estudiante = st.session_state.get("estudiante") or None
+        clave = clave_arreglos(x, y, extra=(vino_nombre, abs_muestra, fd, estudiante))
+        if lab.ejecucion_guardada != clave:
+            obtener_almacen().registrar(EjecucionLab.desde_estado(
+                lab, curva, conc_vino_original, conc_real, error_relativo,
+                estudiante=estudiante, sesion=lab.sesion,
+            ))
+            lab.ejecucion_guardada = clave
         
         col1, col2, col3 = st.columns(3)
         
@@ -956,6 +1339,7 @@ def mostrar_resultados():
                 f"{conc_vino_original:.2f} mg/L",
                 help="Concentración de Fe calculada en el vino sin diluir"
             )
+            st.caption(f"± {s_vino_original:.2f} mg/L (s de la interpolación en la curva)")
         
         with col2:
             st.metric(
@@ -987,7 +1371,7 @@ Usando la ecuación de la recta:
 
 C = (A - b) / m
 
-C = ({abs_muestra:.4f} - {z[1]:.4f}) / {z[0]:.4f} = {conc_calculada_diluida:.3f} mg/L
+C = ({abs_muestra:.4f} - {intercepto:.4f}) / {pendiente:.4f} = {conc_calculada_diluida:.3f} mg/L
 
 ---
 
@@ -1002,7 +1386,7 @@ C_original = {conc_calculada_diluida:.3f} × {fd:.2f} = {conc_vino_original:.2f}
 **Paso 3: Evaluación del resultado**
 
 - Vino analizado: **{vino_nombre}**
-- Concentración calculada: **{conc_vino_original:.2f} mg/L**
+- Concentración calculada: **{conc_vino_original:.2f} ± {s_vino_original:.2f} mg/L**
 - Concentración real: **{conc_real:.2f} mg/L**
 - Error relativo: **{error_relativo:.2f}%**
             """)
@@ -1011,7 +1395,7 @@ C_original = {conc_calculada_diluida:.3f} × {fd:.2f} = {conc_vino_original:.2f}
         if error_relativo > 10:
             st.markdown("#### 💡 Posibles causas del error elevado:")
             
-            conc_diluida = st.session_state.mediciones_aa['muestra']['concentracion_diluida']
+            conc_diluida = lab.muestra.concentracion_diluida
             
             if not verificar_rango_optimo(conc_diluida):
                 if conc_diluida < 1.0:
@@ -1033,6 +1417,14 @@ C_original = {conc_calculada_diluida:.3f} × {fd:.2f} = {conc_vino_original:.2f}
 - 💡 Recomendación: Asegurar que todos los patrones estén en rango 1-5 mg/L
 - 📊 Algunos patrones pueden estar fuera del rango óptimo
                 """)
+        
+        # Incertidumbre del procedimiento
+        st.markdown("---")
+        mostrar_incertidumbre(vino_nombre, conc_vino_original)
+    
+    # Lote de muestras medido con la misma curva
+    if lab.lote_medido:
+        mostrar_resultados_lote(x, y, curva)
     
     # Tabla resumen final
     st.markdown("---")
@@ -1049,17 +1441,17 @@ C_original = {conc_calculada_diluida:.3f} × {fd:.2f} = {conc_vino_original:.2f}
             "Intercepto (b)",
         ],
         "Valor": [
-            f"{st.session_state.masa_sal_mohr:.4f} g" if st.session_state.masa_sal_mohr else "No registrado",
-            f"{st.session_state.volumen_aforo_patron} mL" if st.session_state.volumen_aforo_patron else "No seleccionado",
-            f"{st.session_state.conc_patron_madre:.2f} mg/L" if st.session_state.conc_patron_madre else "No calculado",
-            f"{len(st.session_state.patrones_preparados)}",
+            f"{lab.masa_sal_mohr:.4f} g" if lab.masa_sal_mohr else "No registrado",
+            f"{lab.volumen_aforo_patron} mL" if lab.volumen_aforo_patron else "No seleccionado",
+            f"{lab.conc_patron_madre:.2f} mg/L" if lab.conc_patron_madre else "No calculado",
+            f"{lab.patrones.size}",
             f"{r2:.4f}",
-            f"{z[0]:.4f}",
-            f"{z[1]:.4f}",
+            f"{pendiente:.4f}",
+            f"{intercepto:.4f}",
         ]
     }
     
-    if 'muestra' in st.session_state.mediciones_aa:
+    if lab.muestra is not None:
         resumen_data["Parámetro"].extend([
             "Vino Analizado",
             "Alícuota Vino",
@@ -1071,7 +1463,7 @@ C_original = {conc_calculada_diluida:.3f} × {fd:.2f} = {conc_vino_original:.2f}
         ])
         resumen_data["Valor"].extend([
             vino_nombre,
-            f"{st.session_state.alicuota_vino} mL",
+            f"{lab.alicuota_vino} mL",
             f"{fd:.2f}x",
             f"{abs_muestra:.4f}",
             f"{conc_vino_original:.2f} mg/L",
@@ -1090,6 +1482,180 @@ C_original = {conc_calculada_diluida:.3f} × {fd:.2f} = {conc_vino_original:.2f}
         file_name="resultados_fe_vinos_aa.csv",
         mime="text/csv"
     )
+    
+    # Sesión completa con tipos (patrones, réplicas y ajuste) para procesarla en lote
+    registro = registro_sesion(
+        lab, curva,
+        conc_calculada=conc_vino_original if lab.muestra is not None else None,
+        conc_real=conc_real if lab.muestra is not None else None,
+        error_relativo=error_relativo if lab.muestra is not None else None,
+        estudiante=st.session_state.get("estudiante") or None,
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="📥 Sesión completa (Parquet)",
+            data=lambda: a_parquet([registro]),
+            file_name=f"sesion_{lab.sesion}.parquet",
+            mime="application/vnd.apache.parquet",
+            key="exportar_parquet"
+        )
+    with col2:
+        st.download_button(
+            label="📥 Sesión completa (JSON)",
+            data=lambda: a_json(registro),
+            file_name=f"sesion_{lab.sesion}.json",
+            mime="application/json",
+            key="exportar_json"
+        )
+    st.download_button(
+        label="🎬 Grabación de la sesión",
+        data=lambda: grabacion_json(lab),
+        file_name=f"grabacion_{lab.sesion}.json",
+        mime="application/json",
+        help="Entradas y semilla de la práctica: python -m labvirtual.reproduccion la repite exactamente",
+        key="exportar_grabacion"
+    )
+    
+    if lab.ejecucion_guardada is not None:
+        st.caption("💾 La práctica quedó guardada en el registro del curso")
+# ============================================================================
+# PANEL DEL PROFESOR
+# ============================================================================
+
+@st.fragment
+@instrumentar(tipo="etapa")
+def mostrar_panel_profesor():
+    from labvirtual import graficos
+    
+    st.markdown("## 📊 Panel del Profesor")
+    
+    clave = os.environ.get("LABVIRTUAL_CLAVE_PROFESOR")
+    if not clave:
+        # Cerrado por defecto: sin clave configurada nadie ve los resultados
+        st.warning("El panel está deshabilitado: configure LABVIRTUAL_CLAVE_PROFESOR en el servidor")
+        return
+    if st.text_input("Clave de acceso", type="password", key="clave_profesor") != clave:
+        st.info("Ingrese la clave del profesor para ver los resultados del curso")
+        return
+    
+    almacen = obtener_almacen()
+    semestres = st.multiselect(
+        "Semestres:",
+        almacen.semestres(),
+        key="profesor_semestres",
+        placeholder="Todos"
+    )
+    agregados = almacen.agregados(semestres or None)
+    
+    if agregados.total == 0:
+        st.info("Todavía no hay prácticas guardadas")
+        return
+    
+    # Resumen general (los agregados se mantienen al guardar cada práctica)
+    n = agregados.total
+    error_medio = sum(v["media_error"] * v["n"] for v in agregados.por_vino.values()) / n
+    fuera = sum(v["dilucion_baja"] + v["dilucion_alta"] for v in agregados.por_vino.values())
+    r2_bueno = agregados.hist_r2[clase_r2(0.995):].sum()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Prácticas", f"{n:,}")
+    with col2:
+        st.metric("Error relativo medio", f"{error_medio:.2f}%")
+    with col3:
+        st.metric("Diluciones fuera de rango", f"{100 * fuera / n:.1f}%")
+    with col4:
+        st.metric("Curvas con R² ≥ 0.995", f"{100 * r2_bueno / n:.1f}%")
+    
+    st.markdown("### 🍷 Error relativo por vino")
+    st.plotly_chart(graficos.figura_error_por_vino(agregados), use_container_width=True)
+    st.table({
+        "Vino": list(agregados.por_vino),
+        "Prácticas": [v["n"] for v in agregados.por_vino.values()],
+        "Error medio (%)": [f"{v['media_error']:.2f}" for v in agregados.por_vino.values()],
+        "s (%)": [f"{v['desv_error']:.2f}" for v in agregados.por_vino.values()],
+        "Fuera de rango (%)": [
+            f"{100 * (v['dilucion_baja'] + v['dilucion_alta']) / v['n']:.1f}"
+            for v in agregados.por_vino.values()
+        ],
+    })
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(graficos.figura_histograma_r2(agregados), use_container_width=True)
+    with col2:
+        st.plotly_chart(graficos.figura_diluciones(agregados), use_container_width=True)
+    
+    if agregados.etapa1:
+        st.plotly_chart(graficos.figura_etapa1(agregados), use_container_width=True)
+    
+    # Dispersión: submuestra acotada y WebGL para no cargar el navegador
+    puntos, total = almacen.muestra_dispersion(semestres=semestres or None)
+    st.plotly_chart(graficos.figura_dispersion(puntos), use_container_width=True)
+    if len(puntos["vino"]) < total:
+        st.caption(f"Se muestran {len(puntos['vino']):,} de {total:,} prácticas (submuestra uniforme)")
+
+# ============================================================================
+# PANEL DE DEPURACIÓN
+# ============================================================================
+
+def mostrar_panel_metricas(controles=False):
+    """
+    Tiempos y memoria por etapa y por cálculo (acumulados del proceso)
+
+    Se muestra con ``?debug=1`` en la URL o ``LABVIRTUAL_DEBUG=1``. Los
+    controles que afectan a todo el servidor (tracemalloc y reiniciar las
+    métricas) solo aparecen con ``controles=True`` (``LABVIRTUAL_DEBUG=1``)
+    o con la clave del profesor.
+    """
+    with st.expander("🛠️ Métricas de rendimiento"):
+        clave = os.environ.get("LABVIRTUAL_CLAVE_PROFESOR")
+        if not controles and clave:
+            controles = st.text_input("Clave del profesor", type="password", key="debug_clave") == clave
+        if controles:
+            memoria = st.checkbox(
+                "Rastrear memoria (tracemalloc)",
+                value=METRICAS.memoria_activa,
+                help="Afecta a todo el servidor y lo hace más lento",
+                key="debug_tracemalloc",
+            )
+            if memoria != METRICAS.memoria_activa:
+                METRICAS.rastrear_memoria(memoria)
+        else:
+            st.caption(f"Rastreo de memoria {'activo' if METRICAS.memoria_activa else 'inactivo'}")
+
+        filas = [
+            {
+                "Nombre": nombre,
+                "Tipo": m["tipo"],
+                "Llamadas": m["llamadas"],
+                "Media (ms)": round(m["pared_media_s"] * 1000, 2),
+                "p95 (ms)": round(m["pared_p95_s"] * 1000, 2),
+                "CPU total (s)": round(m["cpu_total_s"], 3),
+                "Pico mem (KB)": round(m["memoria_pico_bytes"] / 1024, 1),
+            }
+            for nombre, m in METRICAS.resumen().items()
+        ]
+        if filas:
+            st.dataframe(filas, hide_index=True)
+        else:
+            st.caption("Sin llamadas registradas todavía")
+
+        for nombre, cache in (("Ajustes", CACHE_AJUSTES), ("Figuras", CACHE_FIGURAS)):
+            e = cache.estadisticas()
+            st.caption(f"Caché {nombre}: {e['entradas']} entradas, "
+                       f"{e['bytes'] / 1024:.0f} KB, aciertos {e['tasa_aciertos']:.0%}")
+
+        st.download_button("📥 Métricas (JSON)", METRICAS.exportar_json(),
+                           file_name="metricas_labvirtual.json", mime="application/json",
+                           key="debug_descargar_json")
+        st.download_button("📥 Métricas (Prometheus)", METRICAS.exportar_prometheus(),
+                           file_name="metricas_labvirtual.prom", mime="text/plain",
+                           key="debug_descargar_prom")
+        if controles and st.button("Reiniciar métricas", key="debug_reiniciar"):
+            METRICAS.limpiar()
+
 # ============================================================================
 # APLICACIÓN PRINCIPAL
 # ============================================================================
@@ -1106,7 +1672,13 @@ def main():
 
     # Sidebar
     with st.sidebar:
-        st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/1/17/Escudo_UCR.svg/1200px-Escudo_UCR.svg.png", width=150)
+        imagenes = obtener_imagenes()
+        logo = imagenes.url(ARCHIVO_LOGO, 2 * ANCHO_LOGO)
+        if logo:
+            st.image(f"/{logo}", width=ANCHO_LOGO)
+        elif imagenes.original(ARCHIVO_LOGO):
+            # Sin variantes generadas (static/img de solo lectura): el original
+            st.image(str(imagenes.original(ARCHIVO_LOGO)), width=ANCHO_LOGO)
         st.markdown("### 👨‍🏫 Información del Curso")
         st.info("""
         **Profesor:**  
@@ -1117,17 +1689,32 @@ def main():
         QU-0301 Análisis Cuantitativo
         """)
         
+        st.text_input(
+            "🎓 Carné del estudiante",
+            key="estudiante",
+            placeholder="B12345",
+            help="Se guarda junto con los resultados de la práctica"
+        )
+        # El ruido de las mediciones queda ligado al carné y a la sesión
+        if st.session_state.get("estudiante"):
+            st.session_state.lab.fijar_semilla(st.session_state.estudiante)
+        
         st.markdown("### 📚 Navegación")
+        etapas = [
+            "🏠 Inicio",
+            "1️⃣ Preparación Patrón Madre",
+            "2️⃣ Curva de Calibración", 
+            "3️⃣ Preparación de Muestra",
+            "4️⃣ Medición AA",
+            "5️⃣ Resultados"
+        ]
+        # El panel del profesor se habilita con ?profesor=1 en la URL, solo si
+        # el servidor tiene configurada la clave
+        if st.query_params.get("profesor") == "1" and os.environ.get("LABVIRTUAL_CLAVE_PROFESOR"):
+            etapas.append("📊 Panel del Profesor")
         pagina = st.radio(
             "Seleccione una etapa:",
-            [
-                "🏠 Inicio",
-                "1️⃣ Preparación Patrón Madre",
-                "2️⃣ Curva de Calibración", 
-                "3️⃣ Preparación de Muestra",
-                "4️⃣ Medición AA",
-                "5️⃣ Resultados"
-            ],
+            etapas,
             key="navegacion"
         )
 
@@ -1144,6 +1731,18 @@ def main():
         mostrar_medicion_aa()
     elif pagina == "5️⃣ Resultados":
         mostrar_resultados()
+    elif pagina == "📊 Panel del Profesor":
+        mostrar_panel_profesor()
+
+    # Métricas de rendimiento (después de la página, para incluir esta ejecución)
+    depuracion = os.environ.get("LABVIRTUAL_DEBUG") == "1"
+    if depuracion or st.query_params.get("debug") == "1":
+        with st.sidebar:
+            mostrar_panel_metricas(controles=depuracion)
+
+    ruta_metricas = os.environ.get("LABVIRTUAL_METRICAS_ARCHIVO")
+    if ruta_metricas:
+        METRICAS.escribir_periodico(ruta_metricas)
 
 # ============================================================================
 # EJECUTAR APLICACIÓN
@@ -0,0 +1,137 @@
+"""
+Benchmark de arranque en frío del Laboratorio Virtual.
+
+Mide, cada vez en un proceso nuevo de Python:
+
+1. ``arranque_importacion_ms``: tiempo acumulado de importar lo que
+   ``Lab_virtual.py`` importa a nivel de módulo (``python -X importtime``).
+2. ``importacion_labvirtual_ms``: lo mismo solo para el núcleo ``labvirtual``.
+3. ``primera_pagina_ms``: ejecución completa del script hasta renderizar
+   "🏠 Inicio" con el arnés AppTest de Streamlit.
+
+Además verifica que renderizar la primera página no cargue ninguno de los
+``modulos_prohibidos``. Compara la mediana de varias repeticiones con
+``presupuesto_arranque.json`` y termina con código 1 si se excede algún
+presupuesto, para que falle la integración continua.
+
+USO:
+python benchmarks/arranque.py [--repeticiones 5] [--presupuesto archivo.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+APP = RAIZ / "Lab_virtual.py"
+PRESUPUESTO = Path(__file__).resolve().parent / "presupuesto_arranque.json"
+
+IMPORTS_APP = "import streamlit, numpy, labvirtual"
+
+SCRIPT_PRIMERA_PAGINA = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+inicio = time.perf_counter()
+at.run()
+fin = time.perf_counter()
+if at.exception:
+    raise SystemExit(str(at.exception))
+print(json.dumps({{
+    "primera_pagina_ms": (fin - inicio) * 1000,
+    "modulos": sorted(sys.modules),
+}}))
+"""
+
+
+def medir_importacion(codigo):
+    """
+    Ejecuta ``codigo`` con ``-X importtime`` en un proceso nuevo
+
+    Devuelve (total_ms, lista de (módulo, acumulado_ms)) usando solo las
+    importaciones de primer nivel para no contar dos veces.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    modulos = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        acumulado_us = int(acumulado)
+        modulos.append((nombre.strip(), acumulado_us / 1000))
+        if not nombre.startswith("  "):
+            total_us += acumulado_us
+    return total_us / 1000, modulos
+
+
+def medir_primera_pagina():
+    """Renderiza "🏠 Inicio" en un proceso nuevo con AppTest"""
+    proceso = subprocess.run(
+        [sys.executable, "-c", SCRIPT_PRIMERA_PAGINA.format(app=str(APP))],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto", type=Path, default=PRESUPUESTO)
+    parser.add_argument("--mostrar", type=int, default=10,
+                        help="Módulos más lentos a listar")
+    args = parser.parse_args(argv)
+
+    presupuesto = json.loads(args.presupuesto.read_text(encoding="utf-8"))
+
+    arranque, nucleo, pagina = [], [], []
+    modulos_lentos = []
+    modulos_cargados = set()
+
+    for _ in range(args.repeticiones):
+        total, modulos_lentos = medir_importacion(IMPORTS_APP)
+        arranque.append(total)
+        nucleo.append(medir_importacion("import labvirtual")[0])
+        resultado = medir_primera_pagina()
+        pagina.append(resultado["primera_pagina_ms"])
+        modulos_cargados.update(resultado["modulos"])
+
+    medidas = {
+        "arranque_importacion_ms": statistics.median(arranque),
+        "importacion_labvirtual_ms": statistics.median(nucleo),
+        "primera_pagina_ms": statistics.median(pagina),
+    }
+
+    print(f"Mediana de {args.repeticiones} repeticiones:")
+    fallos = []
+    for nombre, valor in medidas.items():
+        limite = presupuesto[nombre]
+        estado = "OK" if valor <= limite else "EXCEDIDO"
+        print(f"  {nombre:<28} {valor:8.1f} ms  (presupuesto {limite} ms)  {estado}")
+        if valor > limite:
+            fallos.append(nombre)
+
+    prohibidos = sorted(m for m in presupuesto["modulos_prohibidos"] if m in modulos_cargados)
+    if prohibidos:
+        print(f"  Módulos prohibidos cargados en la primera página: {', '.join(prohibidos)}")
+        fallos.append("modulos_prohibidos")
+
+    print(f"\nImportaciones más lentas ({IMPORTS_APP}):")
+    for nombre, ms in sorted(modulos_lentos, key=lambda m: -m[1])[:args.mostrar]:
+        print(f"  {ms:8.1f} ms  {nombre.strip()}")
+
+    if fallos:
+        print(f"\n❌ Presupuesto de arranque excedido: {', '.join(fallos)}")
+        return 1
+    print("\n✅ Arranque dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Rendimiento de la calificación por lotes (``python -m labvirtual calificar``).
+
+Genera un archivo de N entregas simuladas (3, 5 o 7 patrones, vinos del
+catálogo, absorbancias con el ruido del instrumento y un 1 % de entregas
+con errores de captura), lo califica con 1 proceso y con el pool completo
+y reporta las entregas por segundo. Comprueba además que ambos resultados
+sean idénticos y que el error relativo de las entregas válidas sea
+razonable.
+
+USO:
+python benchmarks/calificacion.py [--entregas 200000] [--formato csv|jsonl] [--procesos N]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from labvirtual import VINOS_DATABASE, simular_absorbancias  # noqa: E402
+from labvirtual.calificacion import calificar_archivo  # noqa: E402
+
+
+def generar_entregas(ruta, n, formato="csv", semilla=0):
+    """Escribe ``n`` entregas simuladas en CSV o JSONL"""
+    rng = np.random.default_rng(semilla)
+    vinos = list(VINOS_DATABASE)
+    masas = rng.uniform(0.05, 0.15, n)
+    aforos_madre = rng.choice([100, 250, 500], n)
+    n_patrones = rng.choice([3, 5, 7], n)
+    errores = rng.random(n) < 0.01
+
+    with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo) if formato == "csv" else None
+        columnas = ["estudiante", "vino", "masa_sal_mohr", "volumen_aforo_patron", "alicuotas_patron",
+                    "aforos_patron", "absorbancias_patron", "alicuota_vino", "volumen_aforo_muestra",
+                    "absorbancia_muestra", "conc_reportada"]
+        if escritor:
+            escritor.writerow(columnas)
+        for i in range(n):
+            vino = vinos[i % len(vinos)]
+            conc_madre = masas[i] / 392.14 * 55.845 * 1e6 / aforos_madre[i]
+            concentraciones = np.linspace(1.2, 4.8, n_patrones[i])
+            alicuotas = np.round(concentraciones * 50 / conc_madre, 2)
+            concentraciones = conc_madre * alicuotas / 50
+            absorbancias = simular_absorbancias(concentraciones, rng=rng)[:, 0]
+            fd = 5 if VINOS_DATABASE[vino]["concentracion_fe"] > 5 else 2
+            diluida = VINOS_DATABASE[vino]["concentracion_fe"] / fd
+            absorbancia_muestra = simular_absorbancias(diluida, rng=rng)[0]
+            valores = [f"E{i:07d}", vino, round(masas[i], 4), int(aforos_madre[i]),
+                       [float(a) for a in alicuotas], 50,
+                       [round(float(a), 4) for a in absorbancias],
+                       round(25 / fd, 2), 25, round(float(absorbancia_muestra), 4),
+                       round(VINOS_DATABASE[vino]["concentracion_fe"], 2)]
+            if errores[i]:
+                # Errores de captura: vino inexistente o absorbancia vacía
+                valores[1 if i % 2 else 9] = "Vino Desconocido" if i % 2 else ""
+            if escritor:
+                escritor.writerow([";".join(map(str, v)) if isinstance(v, list) else v for v in valores])
+            else:
+                archivo.write(json.dumps(dict(zip(columnas, valores)), ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entregas", type=int, default=200_000)
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        origen = directorio / f"entregas.{args.formato}"
+        inicio = time.perf_counter()
+        generar_entregas(origen, args.entregas, args.formato)
+        print(f"{args.entregas:,} entregas generadas en {time.perf_counter() - inicio:.1f} s "
+              f"({origen.stat().st_size / 2**20:.1f} MiB)")
+
+        tablas = {}
+        for procesos in sorted({1, args.procesos}):
+            destino = directorio / f"calificado_{procesos}.parquet"
+            inicio = time.perf_counter()
+            entregas, validas = calificar_archivo(origen, destino, procesos)
+            duracion = time.perf_counter() - inicio
+            print(f"  {procesos:>2} proceso(s): {duracion:6.2f} s  "
+                  f"{entregas / duracion:>10,.0f} entregas/s  ({validas:,} válidas)")
+            tablas[procesos] = pq.read_table(destino)
+
+    referencia = tablas[1]
+    assert all(t.equals(referencia) for t in tablas.values()), "Los resultados dependen del pool"
+    errores = referencia.filter(referencia["valida"])["error_relativo"].to_numpy()
+    print(f"Error relativo de las válidas: mediana {np.median(errores):.2f} %, "
+          f"p95 {np.percentile(errores, 95):.2f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Prueba de carga sin interfaz del Laboratorio Virtual.
+
+Conduce N estudiantes simulados por las cinco etapas de ``main()`` con el
+arnés AppTest de Streamlit: pesado, elección del balón, patrones, vino y
+dilución, mediciones y resultados. Para cada etapa reporta la latencia de
+rerun (p50/p95/p99) y la memoria que retiene la sesión al terminarla, y la
+compara con ``linea_base_carga.json``: termina con código 1 si alguna etapa
+empeora más allá de la tolerancia. La línea base depende de la máquina;
+regénerela con ``--guardar-linea-base`` en el equipo donde se compare.
+
+Los estudiantes comparten el proceso (y por lo tanto las cachés de
+``labvirtual``), igual que en el servidor. Con ``--procesos`` se reparten
+entre varios procesos para simular más carga.
+
+USO:
+python benchmarks/carga.py [--estudiantes 20] [--procesos 1] [--semilla 0]
+python benchmarks/carga.py --guardar-linea-base
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+APP = RAIZ / "Lab_virtual.py"
+LINEA_BASE = Path(__file__).resolve().parent / "linea_base_carga.json"
+
+sys.path.insert(0, str(RAIZ))
+
+# Las prácticas simuladas no deben llegar al registro real del curso
+os.environ.setdefault("LABVIRTUAL_DB", str(Path(tempfile.gettempdir()) / "labvirtual_carga.sqlite3"))
+
+ETAPAS = [
+    "🏠 Inicio",
+    "1️⃣ Preparación Patrón Madre",
+    "2️⃣ Curva de Calibración",
+    "3️⃣ Preparación de Muestra",
+    "4️⃣ Medición AA",
+    "5️⃣ Resultados",
+]
+
+
+# ============================================================================
+# EMULACIÓN DEL NAVEGADOR
+# ============================================================================
+
+class Navegador:
+    """
+    Sesión de un estudiante sobre AppTest
+
+    El navegador real conserva en pantalla todo lo que queda fuera de un
+    fragmento y envía los valores de todos los widgets montados. AppTest, en
+    cambio, solo devuelve los elementos del último rerun. Esta clase guarda
+    los estados de los widgets entre reruns y, tras un rerun parcial, hace
+    una sincronización completa (no cronometrada) para poder seguir
+    interactuando con widgets fuera del fragmento.
+    """
+
+    def __init__(self, ruta=APP, timeout=60):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(ruta), default_timeout=timeout)
+        self.estados = {}
+        self.latencias = []  # (etapa, segundos)
+        self.etapa = ETAPAS[0]
+        inicio = time.perf_counter()
+        self.at.run()
+        self._verificar()
+        self.latencias.append((self.etapa, time.perf_counter() - inicio))
+        self._recordar(completo=True)
+
+    def _verificar(self):
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def _recordar(self, completo):
+        if completo:
+            self.estados = {}
+        for w in self.at._tree.get_widget_states().widgets:
+            if w.WhichOneof("value") != "trigger_value":
+                self.estados[w.id] = w
+
+    def _estados(self, extra=()):
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+        ws = WidgetStates()
+        ws.widgets.extend(self.estados.values())
+        ws.widgets.extend(extra)
+        return ws
+
+    def _ejecutar(self):
+        actuales = self.at._tree.get_widget_states().widgets
+        disparos = []
+        for w in actuales:
+            if w.WhichOneof("value") == "trigger_value":
+                if w.trigger_value:
+                    disparos.append(w)
+            else:
+                self.estados[w.id] = w
+
+        inicio = time.perf_counter()
+        self.at._run(self._estados(disparos))
+        self.latencias.append((self.etapa, time.perf_counter() - inicio))
+        self._verificar()
+
+        # Sin la barra lateral en el árbol, el rerun fue de un fragmento
+        parcial = not self.at.sidebar.radio
+        self._recordar(completo=not parcial)
+        if parcial:
+            self.at._run(self._estados())
+            self._verificar()
+            self._recordar(completo=True)
+
+    def ir(self, etapa):
+        self.etapa = etapa
+        self.at.sidebar.radio(key="navegacion").set_value(etapa)
+        self._ejecutar()
+
+    def fijar(self, tipo, key, valor):
+        getattr(self.at, tipo)(key=key).set_value(valor)
+        self._ejecutar()
+
+    def clic(self, key):
+        self.at.button(key=key).click()
+        self._ejecutar()
+
+    def memoria_sesion(self):
+        """Bytes retenidos por el session_state de este estudiante"""
+        return sum(tamano_profundo(v) + sys.getsizeof(k)
+                   for k, v in self.at.session_state.to_dict().items())
+
+
+def tamano_profundo(valor, vistos=None):
+    """sys.getsizeof recursivo sobre contenedores y objetos con slots"""
+    if vistos is None:
+        vistos = set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    # Los resultados de componentes responden a cualquier atributo (con None)
+    if callable(getattr(valor, "tamano_bytes", None)):
+        return valor.tamano_bytes()
+    total = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        total += sum(tamano_profundo(k, vistos) + tamano_profundo(v, vistos)
+                     for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        total += sum(tamano_profundo(v, vistos) for v in valor)
+    return total
+
+
+# ============================================================================
+# ESTUDIANTE SIMULADO
+# ============================================================================
+
+def simular_estudiante(semilla):
+    """Recorre las cinco etapas con entradas aleatorias pero razonables"""
+    from labvirtual import VINOS_DATABASE, calcular_concentracion_patron_madre
+
+    rng = np.random.default_rng(semilla)
+    nav = Navegador()
+    memoria = {ETAPAS[0]: nav.memoria_sesion()}
+
+    # Etapa 1: pesado y balón
+    nav.ir(ETAPAS[1])
+    masa = round(float(rng.uniform(0.3, 1.5)), 4)
+    balon = int(rng.choice([100, 250, 500, 1000]))
+    nav.fijar("number_input", "masa_simulador_externo", masa)
+    nav.fijar("selectbox", "volumen_balon_aforo", balon)
+    memoria[ETAPAS[1]] = nav.memoria_sesion()
+
+    # Etapa 2: patrones repartidos en 1.2-4.8 mg/L con aforo de 100 mL
+    nav.ir(ETAPAS[2])
+    conc_madre = calcular_concentracion_patron_madre(masa, balon)
+    num_patrones = int(rng.choice([3, 5, 7]))
+    nav.fijar("selectbox", "num_patrones_select", num_patrones)
+    for i, objetivo in enumerate(np.linspace(1.2, 4.8, num_patrones)):
+        alicuota = float(np.clip(round(objetivo * 100 / conc_madre, 1), 0.1, 50.0))
+        nav.fijar("number_input", f"alicuota_{i}", alicuota)
+        nav.fijar("selectbox", f"aforo_{i}", 100)
+    memoria[ETAPAS[2]] = nav.memoria_sesion()
+
+    # Etapa 3: vino y dilución
+    nav.ir(ETAPAS[3])
+    indice = int(rng.integers(len(VINOS_DATABASE)))
+    conc_vino = list(VINOS_DATABASE.values())[indice]["concentracion_fe"]
+    aforos = np.array([10, 25, 50, 100, 250])
+    aforo = int(aforos[np.argmin(np.abs(aforos - 10.0 * conc_vino / 3.0))])
+    nav.clic(f"vino_{indice}")
+    nav.fijar("number_input", "alicuota_vino_input", 10.0)
+    nav.fijar("selectbox", "volumen_aforo_muestra_select", aforo)
+    memoria[ETAPAS[3]] = nav.memoria_sesion()
+
+    # Etapa 4: mediciones
+    nav.ir(ETAPAS[4])
+    nav.clic("medir_patrones")
+    nav.clic("medir_muestra")
+    memoria[ETAPAS[4]] = nav.memoria_sesion()
+
+    # Etapa 5: resultados
+    nav.ir(ETAPAS[5])
+    memoria[ETAPAS[5]] = nav.memoria_sesion()
+
+    return nav.latencias, memoria
+
+
+def _simular_lote(semillas):
+    # Calentamiento: la primera ejecución del proceso paga las importaciones
+    Navegador()
+    return [simular_estudiante(s) for s in semillas]
+
+
+# ============================================================================
+# REPORTE
+# ============================================================================
+
+def resumir(resultados):
+    """Percentiles de latencia y memoria media por etapa"""
+    resumen = {}
+    for etapa in ETAPAS:
+        latencias = np.array([dt for lat, _ in resultados for e, dt in lat if e == etapa]) * 1000
+        memorias = np.array([mem[etapa] for _, mem in resultados])
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+        resumen[etapa] = {
+            "reruns": int(latencias.size),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "memoria_sesion_bytes": float(memorias.mean()),
+        }
+    return resumen
+
+
+def comparar(resumen, linea_base, tolerancia):
+    """Lista de regresiones respecto a la línea base"""
+    regresiones = []
+    for etapa, medidas in resumen.items():
+        base = linea_base.get(etapa)
+        if base is None:
+            continue
+        for metrica in ("p95_ms", "memoria_sesion_bytes"):
+            if medidas[metrica] > base[metrica] * (1 + tolerancia):
+                regresiones.append(
+                    f"{etapa}: {metrica} {medidas[metrica]:.1f} > {base[metrica]:.1f} "
+                    f"(+{tolerancia:.0%})"
+                )
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--estudiantes", type=int, default=20)
+    parser.add_argument("--procesos", type=int, default=1)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--tolerancia", type=float, default=0.5,
+                        help="Aumento relativo permitido sobre la línea base")
+    parser.add_argument("--linea-base", type=Path, default=LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true")
+    parser.add_argument("--json", type=Path, help="Guardar el resumen en este archivo")
+    args = parser.parse_args(argv)
+
+    semillas = [args.semilla + i for i in range(args.estudiantes)]
+    inicio = time.perf_counter()
+    if args.procesos > 1:
+        lotes = [semillas[i::args.procesos] for i in range(args.procesos)]
+        with ProcessPoolExecutor(args.procesos) as ejecutor:
+            resultados = [r for lote in ejecutor.map(_simular_lote, lotes) for r in lote]
+    else:
+        resultados = _simular_lote(semillas)
+    duracion = time.perf_counter() - inicio
+
+    resumen = resumir(resultados)
+
+    print(f"{args.estudiantes} estudiantes en {duracion:.1f} s ({args.procesos} proceso(s))\n")
+    print(f"{'Etapa':<30} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sesión KB':>10}")
+    for etapa, m in resumen.items():
+        print(f"{etapa:<30} {m['reruns']:>7} {m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} "
+              f"{m['p99_ms']:>8.1f} {m['memoria_sesion_bytes'] / 1024:>10.1f}")
+
+    if args.json:
+        args.json.write_text(json.dumps(resumen, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.guardar_linea_base:
+        args.linea_base.write_text(json.dumps(resumen, indent=2, ensure_ascii=False) + "\n",
+                                   encoding="utf-8")
+        print(f"\nLínea base guardada en {args.linea_base}")
+        return 0
+
+    if not args.linea_base.exists():
+        print("\nSin línea base; use --guardar-linea-base para crearla")
+        return 0
+
+    regresiones = comparar(resumen, json.loads(args.linea_base.read_text(encoding="utf-8")),
+                           args.tolerancia)
+    if regresiones:
+        print("\n❌ Regresiones respecto a la línea base:")
+        for r in regresiones:
+            print(f"  {r}")
+        return 1
+    print("\n✅ Sin regresiones respecto a la línea base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Prueba de carga de la API HTTP/JSON (``python -m labvirtual api``).
+
+Levanta la API en un subproceso (o usa ``--url`` si ya está corriendo) y
+abre C conexiones persistentes desde un cliente asyncio. Cada conexión
+envía solicitudes seguidas durante ``--duracion`` segundos, alternando los
+endpoints de cálculo con lotes de ``--lote`` elementos (el lote de curvas
+y de entregas es diez veces menor). Reporta solicitudes y validaciones por
+segundo y la latencia p50/p95/p99 por endpoint; termina con código 1 si
+alguna respuesta no fue 200.
+
+USO:
+python benchmarks/carga_api.py [--conexiones 16] [--duracion 5] [--lote 100]
+python benchmarks/carga_api.py --url http://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+PUERTO = 8799
+
+
+# ============================================================================
+# SOLICITUDES
+# ============================================================================
+
+def cuerpos(lote, semilla=0):
+    """Un cuerpo JSON por endpoint, con ``lote`` validaciones cada uno"""
+    rng = np.random.default_rng(semilla)
+    n_curvas = max(lote // 10, 1)
+    concentraciones = np.linspace(1, 5, 5)
+    curvas = [{"concentraciones": concentraciones.tolist(),
+               "absorbancias": (0.082 * concentraciones + rng.normal(0, 0.002, 5)).round(4).tolist(),
+               "absorbancia_muestra": round(float(rng.uniform(0.1, 0.4)), 4),
+               "fd": 2.5, "vino": "Vino Rosado"} for _ in range(n_curvas)]
+    entregas = [{"estudiante": f"E{i}", "vino": "Vino Rosado", "masa_sal_mohr": 0.0702,
+                 "volumen_aforo_patron": 100, "alicuotas_patron": [1, 2, 3, 4, 5], "aforos_patron": 100,
+                 "absorbancias_patron": curva["absorbancias"], "alicuota_vino": 10,
+                 "volumen_aforo_muestra": 25, "absorbancia_muestra": curva["absorbancia_muestra"]}
+                for i, curva in enumerate(curvas)]
+    return {
+        "/v1/patron-madre": ({"masa_sal": rng.uniform(0.05, 0.15, lote).round(4).tolist(),
+                              "volumen_aforo": 100}, lote),
+        "/v1/patrones": ({"conc_madre": 100, "alicuota": rng.uniform(0.5, 6, lote).round(2).tolist(),
+                          "volumen_aforo": 100}, lote),
+        "/v1/factor-dilucion": ({"alicuota": rng.choice([5, 10, 25], lote).tolist(),
+                                 "volumen_aforo": 25}, lote),
+        "/v1/curvas": ({"curvas": curvas}, n_curvas),
+        "/v1/calificar": ({"entregas": entregas}, n_curvas),
+    }
+
+
+def solicitud_http(host, ruta, cuerpo):
+    datos = json.dumps(cuerpo).encode()
+    return (f"POST {ruta} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(datos)}\r\n\r\n").encode() + datos
+
+
+async def leer_respuesta(lector):
+    estado = int((await lector.readline()).split()[1])
+    largo = 0
+    while (linea := await lector.readline()) not in (b"\r\n", b""):
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        if nombre.lower() == "content-length":
+            largo = int(valor)
+    await lector.readexactly(largo)
+    return estado
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+async def conexion(host, puerto, solicitudes, fin, latencias, fallas, desfase):
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    rutas = list(solicitudes)
+    i = desfase
+    try:
+        while time.perf_counter() < fin:
+            ruta = rutas[i % len(rutas)]
+            i += 1
+            inicio = time.perf_counter()
+            escritor.write(solicitudes[ruta])
+            await escritor.drain()
+            estado = await leer_respuesta(lector)
+            latencias[ruta].append(time.perf_counter() - inicio)
+            if estado != 200:
+                fallas[ruta] += 1
+    finally:
+        escritor.close()
+
+
+async def carga(host, puerto, conexiones, duracion, lote):
+    bloques = cuerpos(lote)
+    solicitudes = {ruta: solicitud_http(host, ruta, cuerpo) for ruta, (cuerpo, _) in bloques.items()}
+    latencias = defaultdict(list)
+    fallas = defaultdict(int)
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*(conexion(host, puerto, solicitudes, fin, latencias, fallas, i)
+                           for i in range(conexiones)))
+    transcurrido = time.perf_counter() - inicio
+
+    total = sum(len(v) for v in latencias.values())
+    validaciones = sum(len(latencias[ruta]) * n for ruta, (_, n) in bloques.items())
+    print(f"{conexiones} conexiones, {duracion:.0f} s, lotes de {lote}")
+    print(f"{'endpoint':<22}{'solicitudes':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'fallas':>8}")
+    for ruta in solicitudes:
+        p50, p95, p99 = np.percentile(latencias[ruta], [50, 95, 99]) * 1e3
+        print(f"{ruta:<22}{len(latencias[ruta]):>12,}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}{fallas[ruta]:>8}")
+    print(f"Total: {total / transcurrido:,.0f} solicitudes/s, {validaciones / transcurrido:,.0f} validaciones/s")
+    return sum(fallas.values())
+
+
+async def esperar_api(host, puerto, limite=20.0):
+    fin = time.perf_counter() + limite
+    while True:
+        try:
+            _, escritor = await asyncio.open_connection(host, puerto)
+            escritor.close()
+            return
+        except OSError:
+            if time.perf_counter() > fin:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="API ya levantada (por defecto se levanta una en un subproceso)")
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--duracion", type=float, default=5.0)
+    parser.add_argument("--lote", type=int, default=100)
+    args = parser.parse_args()
+
+    servidor = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, puerto = url.hostname, url.port or 80
+    else:
+        host, puerto = "127.0.0.1", PUERTO
+        servidor = subprocess.Popen([sys.executable, "-m", "labvirtual", "api", "--puerto", str(puerto)],
+                                    cwd=RAIZ, env={**os.environ, "PYTHONPATH": str(RAIZ)},
+                                    stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(esperar_api(host, puerto))
+        fallas = asyncio.run(carga(host, puerto, args.conexiones, args.duracion, args.lote))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
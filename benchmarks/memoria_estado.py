@@ -0,0 +1,135 @@
+"""
+Huella de memoria por sesión del estado de la práctica.
+
+Construye N estados completos (7 patrones medidos y una muestra) con la
+representación original de ``st.session_state`` (lista de diccionarios y
+diccionarios anidados) y con ``EstadoLaboratorio``, mide con tracemalloc
+cuánta memoria retiene cada uno y la extrapola al tamaño de la clase.
+
+USO:
+python benchmarks/memoria_estado.py [--sesiones 2000] [--estudiantes 500]
+"""
+
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from labvirtual import (  # noqa: E402
+    EstadoLaboratorio,
+    MedicionMuestra,
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    simular_absorbancias,
+    verificar_rango_optimo,
+)
+
+N_PATRONES = 7
+VINO = "Vino Tinto Reserva"
+
+
+def _datos_sesion(rng):
+    masa = round(float(rng.uniform(0.2, 5.0)), 4)
+    volumen = int(rng.choice([50, 100, 250, 500, 1000]))
+    conc_madre = calcular_concentracion_patron_madre(masa, volumen)
+    alicuotas = np.round(rng.uniform(0.1, 50.0, N_PATRONES), 1)
+    aforos = rng.choice([10, 25, 50, 100], N_PATRONES)
+    conc = calcular_concentracion_patron(conc_madre, alicuotas, aforos)
+    absorbancias = simular_absorbancias(conc, rng=rng)[:, 0]
+    return masa, volumen, conc_madre, alicuotas, aforos, conc, absorbancias
+
+
+def estado_original(rng):
+    """Estado tal como lo guardaba la versión original en st.session_state"""
+    masa, volumen, conc_madre, alicuotas, aforos, conc, absorbancias = _datos_sesion(rng)
+    patrones = [
+        {
+            'patron': i + 1,
+            'alicuota': float(alicuotas[i]),
+            'volumen': int(aforos[i]),
+            'concentracion': float(conc[i]),
+            'en_rango': bool(verificar_rango_optimo(conc[i])),
+        }
+        for i in range(N_PATRONES)
+    ]
+    return {
+        'masa_sal_mohr': masa,
+        'volumen_aforo_patron': volumen,
+        'conc_patron_madre': conc_madre,
+        'patrones_preparados': patrones,
+        'vino_seleccionado': VINO,
+        'alicuota_vino': 10.0,
+        'volumen_aforo_muestra': 25,
+        'conc_muestra_diluida': 3.4,
+        'mediciones_aa': {
+            'patrones': [
+                {
+                    'Patrón': i + 1,
+                    'Concentración (mg/L)': float(conc[i]),
+                    'Absorbancia': float(absorbancias[i]),
+                }
+                for i in range(N_PATRONES)
+            ],
+            'muestra': {
+                'vino': VINO,
+                'absorbancia': 0.2788,
+                'concentracion_diluida': 3.4,
+            },
+        },
+    }
+
+
+def estado_compacto(rng):
+    """El mismo estado con EstadoLaboratorio"""
+    masa, volumen, conc_madre, alicuotas, aforos, conc, absorbancias = _datos_sesion(rng)
+    lab = EstadoLaboratorio(
+        masa_sal_mohr=masa,
+        volumen_aforo_patron=volumen,
+        conc_patron_madre=conc_madre,
+        vino_seleccionado=VINO,
+        alicuota_vino=10.0,
+        volumen_aforo_muestra=25,
+        conc_muestra_diluida=3.4,
+    )
+    lab.fijar_patrones(alicuotas, aforos, conc)
+    lab.registrar_absorbancias(absorbancias)
+    lab.muestra = MedicionMuestra(vino=VINO, absorbancia=0.2788, concentracion_diluida=3.4)
+    return lab
+
+
+def medir(constructor, n_sesiones):
+    """Bytes retenidos por sesión (medidos con tracemalloc)"""
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    inicio = tracemalloc.take_snapshot()
+    sesiones = [constructor(rng) for _ in range(n_sesiones)]
+    fin = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retenido = sum(d.size_diff for d in fin.compare_to(inicio, "filename"))
+    return retenido / len(sesiones)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sesiones", type=int, default=2000)
+    parser.add_argument("--estudiantes", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    original = medir(estado_original, args.sesiones)
+    compacto = medir(estado_compacto, args.sesiones)
+
+    print(f"Memoria por sesión ({N_PATRONES} patrones medidos + muestra, {args.sesiones} sesiones):")
+    print(f"  original (dicts en session_state):   {original:8.0f} bytes")
+    print(f"  EstadoLaboratorio (slots + ndarray): {compacto:8.0f} bytes  ({original / compacto:.1f}x menos)")
+    print(f"\nPara {args.estudiantes} estudiantes simultáneos:")
+    print(f"  original:          {original * args.estudiantes / 2**20:8.2f} MiB")
+    print(f"  EstadoLaboratorio: {compacto * args.estudiantes / 2**20:8.2f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Núcleo de cálculo del Laboratorio Virtual de Fe en vinos por AA.
+
+Este paquete no importa Streamlit: puede usarse desde scripts de
+calificación, workers o notebooks. ``Lab_virtual.py`` es la capa de
+interfaz que se apoya en él.
+"""
+
+from labvirtual.calculos import (
+    K_ABSORCION,
+    MM_FE,
+    MM_SAL_MOHR,
+    RANGO_OPTIMO,
+    ajustar_recta,
+    calcular_concentracion_muestra,
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    calcular_error_relativo,
+    calcular_fd_muestra,
+    verificar_rango_optimo,
+)
+from labvirtual.almacen import (
+    AlmacenEjecuciones,
+    EjecucionLab,
+    obtener_almacen,
+)
+from labvirtual.analitica import AgregadosClase
+from labvirtual.cache import (
+    CACHE_AJUSTES,
+    CACHE_FIGURAS,
+    CacheLRU,
+    ajuste_cacheado,
+    clave_arreglos,
+)
+from labvirtual.calibracion import CurvaCalibracion
+from labvirtual.calificacion import (
+    calificar_archivo,
+    calificar_bloque,
+)
+from labvirtual.catalogo import (
+    CatalogoVinos,
+    obtener_catalogo,
+)
+from labvirtual.diluciones import (
+    INDICE_DILUCIONES,
+    DilucionesVino,
+    IndiceDiluciones,
+    PlanDilucion,
+    planes_dilucion,
+)
+from labvirtual.estado import (
+    DTYPE_LECTURA,
+    DTYPE_LOTE,
+    DTYPE_PATRON,
+    EstadoLaboratorio,
+    MedicionMuestra,
+)
+from labvirtual.exportacion import (
+    VERSION_EXPORTACION,
+    a_json,
+    a_parquet,
+    registro_sesion,
+)
+from labvirtual.incertidumbre import (
+    ResultadoMonteCarlo,
+    propagar_incertidumbre,
+)
+from labvirtual.instrumento import (
+    MODELO_DEFECTO,
+    N_REPLICAS,
+    CorridaAA,
+    ModeloEspectrometro,
+    secuencia,
+    simular_corrida,
+)
+from labvirtual.lote import (
+    MAX_MUESTRAS_LOTE,
+    ResultadoLote,
+    evaluar_lote,
+)
+from labvirtual.metricas import (
+    METRICAS,
+    RegistroMetricas,
+    instrumentar,
+)
+from labvirtual.reproduccion import (
+    VERSION_GRABACION,
+    grabacion,
+    grabacion_json,
+    medir_lote,
+    medir_muestra,
+    medir_patrones,
+    reproducir,
+)
+from labvirtual.simulacion import (
+    generar_absorbancia,
+    obtener_rng,
+    simular_absorbancias,
+)
+from labvirtual.vinos import VINOS_DATABASE
@@ -0,0 +1,28 @@
+"""
+Herramientas de línea de comandos del Laboratorio Virtual.
+
+python -m labvirtual calificar entregas.csv [-o calificaciones.parquet]
+python -m labvirtual api [--host 127.0.0.1] [--puerto 8765]
+"""
+
+import importlib
+import sys
+
+# comando -> módulo con main(argv); se importa solo el que se usa
+COMANDOS = {
+    "calificar": "labvirtual.calificacion",
+    "grade": "labvirtual.calificacion",
+    "api": "labvirtual.api",
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMANDOS:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    return importlib.import_module(COMANDOS[argv[0]]).main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""
+Almacén persistente de las prácticas completadas (SQLite en modo WAL).
+
+Cada vez que un estudiante llega a los resultados con la muestra medida se
+guarda una ejecución: datos de entrada, patrones con sus absorbancias,
+ajuste, resultado y error. Las escrituras se encolan y un hilo en segundo
+plano las confirma por lotes en una sola transacción, de modo que un rerun
+de Streamlit nunca espera al disco.
+
+Las tablas están indexadas por estudiante, vino y marca de tiempo para que
+las consultas de los profesores sobre miles de ejecuciones sean inmediatas.
+En la misma transacción se actualizan los agregados de clase (ver
+``labvirtual.analitica``) que usa el panel del profesor.
+La ruta se toma de ``LABVIRTUAL_DB`` (por defecto ``datos/ejecuciones.sqlite3``).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from labvirtual.analitica import (
+    COLUMNAS_AGREGADO,
+    ETIQUETAS_R2,
+    N_CLASES_ERROR,
+    N_CLASES_MASA,
+    AgregadosClase,
+    agregar_lote,
+    rango_semestre,
+)
+from labvirtual.estado import DTYPE_PATRON
+
+logger = logging.getLogger(__name__)
+
+RUTA_DEFECTO = Path(__file__).resolve().parent.parent / "datos" / "ejecuciones.sqlite3"
+VERSION_ESQUEMA = 2
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    id INTEGER PRIMARY KEY,
+    marca_tiempo REAL NOT NULL,
+    estudiante TEXT,
+    sesion TEXT,
+    vino TEXT NOT NULL,
+    masa_sal_mohr REAL,
+    volumen_aforo_patron INTEGER,
+    conc_patron_madre REAL,
+    n_patrones INTEGER NOT NULL,
+    alicuota_vino REAL,
+    volumen_aforo_muestra INTEGER,
+    conc_muestra_diluida REAL,
+    absorbancia_muestra REAL NOT NULL,
+    pendiente REAL NOT NULL,
+    intercepto REAL NOT NULL,
+    r2 REAL NOT NULL,
+    conc_calculada REAL NOT NULL,
+    conc_real REAL NOT NULL,
+    error_relativo REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ejecuciones_estudiante ON ejecuciones (estudiante, marca_tiempo);
+CREATE INDEX IF NOT EXISTS idx_ejecuciones_vino ON ejecuciones (vino, marca_tiempo);
+CREATE INDEX IF NOT EXISTS idx_ejecuciones_marca_tiempo ON ejecuciones (marca_tiempo);
+
+CREATE TABLE IF NOT EXISTS patrones (
+    ejecucion_id INTEGER NOT NULL REFERENCES ejecuciones (id) ON DELETE CASCADE,
+    patron INTEGER NOT NULL,
+    alicuota REAL NOT NULL,
+    volumen INTEGER NOT NULL,
+    concentracion REAL NOT NULL,
+    en_rango INTEGER NOT NULL,
+    absorbancia REAL,
+    PRIMARY KEY (ejecucion_id, patron)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS agregados_vino (
+    semestre TEXT NOT NULL,
+    vino TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    suma_error REAL NOT NULL,
+    suma_error2 REAL NOT NULL,
+    dilucion_baja INTEGER NOT NULL,
+    dilucion_alta INTEGER NOT NULL,
+    PRIMARY KEY (semestre, vino)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS histogramas (
+    semestre TEXT NOT NULL,
+    variable TEXT NOT NULL,
+    grupo TEXT NOT NULL,
+    clase INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (semestre, variable, grupo, clase)
+) WITHOUT ROWID;
+"""
+
+COLUMNAS_EJECUCION = (
+    "marca_tiempo", "estudiante", "sesion", "vino", "masa_sal_mohr",
+    "volumen_aforo_patron", "conc_patron_madre", "n_patrones", "alicuota_vino",
+    "volumen_aforo_muestra", "conc_muestra_diluida", "absorbancia_muestra",
+    "pendiente", "intercepto", "r2", "conc_calculada", "conc_real", "error_relativo",
+)
+
+_INSERTAR_EJECUCION = (
+    f"INSERT INTO ejecuciones ({', '.join(COLUMNAS_EJECUCION)}) "
+    f"VALUES ({', '.join('?' * len(COLUMNAS_EJECUCION))})"
+)
+_INSERTAR_PATRON = (
+    "INSERT INTO patrones (ejecucion_id, patron, alicuota, volumen, concentracion, "
+    "en_rango, absorbancia) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_SUMAR_VINO = (
+    "INSERT INTO agregados_vino VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (semestre, vino) DO UPDATE SET "
+    "n = n + excluded.n, suma_error = suma_error + excluded.suma_error, "
+    "suma_error2 = suma_error2 + excluded.suma_error2, "
+    "dilucion_baja = dilucion_baja + excluded.dilucion_baja, "
+    "dilucion_alta = dilucion_alta + excluded.dilucion_alta"
+)
+_SUMAR_HISTOGRAMA = (
+    "INSERT INTO histogramas VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (semestre, variable, grupo, clase) DO UPDATE SET n = n + excluded.n"
+)
+
+
+@dataclass(slots=True)
+class EjecucionLab:
+    """Una práctica completada, lista para guardarse"""
+    vino: str
+    absorbancia_muestra: float
+    pendiente: float
+    intercepto: float
+    r2: float
+    conc_calculada: float
+    conc_real: float
+    error_relativo: float
+    patrones: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=DTYPE_PATRON))
+    estudiante: str | None = None
+    sesion: str | None = None
+    masa_sal_mohr: float | None = None
+    volumen_aforo_patron: int | None = None
+    conc_patron_madre: float | None = None
+    alicuota_vino: float | None = None
+    volumen_aforo_muestra: int | None = None
+    conc_muestra_diluida: float | None = None
+    marca_tiempo: float = field(default_factory=time.time)
+
+    @classmethod
+    def desde_estado(cls, lab, curva, conc_calculada, conc_real, error_relativo,
+                     estudiante=None, sesion=None):
+        """Construye la ejecución a partir de ``EstadoLaboratorio`` y su ajuste"""
+        return cls(
+            vino=lab.muestra.vino,
+            absorbancia_muestra=float(lab.muestra.absorbancia),
+            pendiente=float(curva.pendiente),
+            intercepto=float(curva.intercepto),
+            r2=float(curva.r2),
+            conc_calculada=float(conc_calculada),
+            conc_real=float(conc_real),
+            error_relativo=float(error_relativo),
+            patrones=lab.patrones.copy(),
+            estudiante=estudiante,
+            sesion=sesion,
+            masa_sal_mohr=lab.masa_sal_mohr,
+            volumen_aforo_patron=lab.volumen_aforo_patron,
+            conc_patron_madre=lab.conc_patron_madre,
+            alicuota_vino=lab.alicuota_vino,
+            volumen_aforo_muestra=lab.volumen_aforo_muestra,
+            conc_muestra_diluida=lab.muestra.concentracion_diluida,
+        )
+
+    def fila(self):
+        """Valores en el orden de ``COLUMNAS_EJECUCION``"""
+        return tuple(
+            self.patrones.size if c == "n_patrones" else getattr(self, c)
+            for c in COLUMNAS_EJECUCION
+        )
+
+
+_FIN = object()
+
+
+class AlmacenEjecuciones:
+    """
+    Almacén SQLite con escritor en segundo plano
+
+    ``registrar`` solo encola; el hilo escritor agrupa hasta ``tamano_lote``
+    ejecuciones (o lo que llegue en ``intervalo`` segundos) por transacción.
+    Las lecturas abren su propia conexión: en modo WAL no bloquean al
+    escritor ni son bloqueadas por él.
+    """
+
+    def __init__(self, ruta=RUTA_DEFECTO, tamano_lote=64, intervalo=0.5):
+        self.ruta = Path(ruta)
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.escritas = 0
+        self.fallidas = 0
+        self._cola = queue.Queue()
+        self._cerrado = False
+
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        conexion = self._conectar()
+        try:
+            version = conexion.execute("PRAGMA user_version").fetchone()[0]
+            conexion.executescript(ESQUEMA)
+            if version < 2:
+                # Las ejecuciones guardadas antes de los agregados
+                self._reconstruir_agregados(conexion)
+            conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+        finally:
+            conexion.close()
+
+        self._hilo = threading.Thread(target=self._escritor, name="labvirtual-almacen", daemon=True)
+        self._hilo.start()
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=30.0, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode = WAL")
+        conexion.execute("PRAGMA synchronous = NORMAL")
+        conexion.execute("PRAGMA foreign_keys = ON")
+        return conexion
+
+    # ------------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------------
+
+    def registrar(self, ejecucion):
+        """Encola una ejecución sin esperar al disco"""
+        if self._cerrado:
+            raise RuntimeError("El almacén está cerrado")
+        self._cola.put(ejecucion)
+
+    def _siguiente_lote(self):
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote and lote[-1] is not _FIN:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    @staticmethod
+    def _insertar(cursor, ejecucion):
+        cursor.execute(_INSERTAR_EJECUCION, ejecucion.fila())
+        ejecucion_id = cursor.lastrowid
+        p = ejecucion.patrones
+        cursor.executemany(_INSERTAR_PATRON, zip(
+            [ejecucion_id] * p.size,
+            p["patron"].tolist(),
+            p["alicuota"].tolist(),
+            p["volumen"].tolist(),
+            p["concentracion"].tolist(),
+            p["en_rango"].tolist(),
+            [None if np.isnan(a) else a for a in p["absorbancia"].tolist()],
+        ))
+
+    def _escribir_lote(self, conexion, ejecuciones):
+        """
+        Escribe el lote en una transacción; devuelve cuántas se guardaron
+
+        Cada ejecución va en su propio SAVEPOINT: una que no se puede guardar
+        (NaN en una columna NOT NULL, por ejemplo) se descarta sola, sin
+        deshacer las de otros estudiantes.
+        """
+        guardadas = []
+        with conexion:
+            cursor = conexion.cursor()
+            cursor.execute("BEGIN")
+            for ejecucion in ejecuciones:
+                cursor.execute("SAVEPOINT ejecucion")
+                try:
+                    self._insertar(cursor, ejecucion)
+                except Exception:
+                    cursor.execute("ROLLBACK TO ejecucion")
+                    logger.exception("Se descartó la ejecución de %s", ejecucion.estudiante)
+                else:
+                    guardadas.append(ejecucion)
+                cursor.execute("RELEASE ejecucion")
+            self._sumar_agregados(cursor, [
+                tuple(getattr(e, c) for c in COLUMNAS_AGREGADO) for e in guardadas
+            ])
+        return len(guardadas)
+
+    @staticmethod
+    def _sumar_agregados(cursor, filas):
+        por_vino, histogramas = agregar_lote(filas)
+        cursor.executemany(_SUMAR_VINO, [clave + tuple(v) for clave, v in por_vino.items()])
+        cursor.executemany(_SUMAR_HISTOGRAMA, [clave + (n,) for clave, n in histogramas.items()])
+
+    def _reconstruir_agregados(self, conexion, bloque=10_000):
+        """Recalcula los agregados desde ``ejecuciones`` por bloques"""
+        with conexion:
+            conexion.execute("DELETE FROM agregados_vino")
+            conexion.execute("DELETE FROM histogramas")
+            cursor = conexion.execute(f"SELECT {', '.join(COLUMNAS_AGREGADO)} FROM ejecuciones")
+            while filas := cursor.fetchmany(bloque):
+                self._sumar_agregados(conexion.cursor(), filas)
+
+    def _escritor(self):
+        conexion = self._conectar()
+        try:
+            while True:
+                lote = self._siguiente_lote()
+                ejecuciones = [e for e in lote if e is not _FIN]
+                try:
+                    if ejecuciones:
+                        guardadas = self._escribir_lote(conexion, ejecuciones)
+                        self.escritas += guardadas
+                        self.fallidas += len(ejecuciones) - guardadas
+                except Exception:
+                    # Cualquier error descarta solo este lote: el hilo sigue
+                    # vivo y ``esperar`` no se queda bloqueado
+                    self.fallidas += len(ejecuciones)
+                    logger.exception("No se pudieron guardar %d ejecuciones", len(ejecuciones))
+                finally:
+                    for _ in lote:
+                        self._cola.task_done()
+                if len(ejecuciones) < len(lote):
+                    return
+        finally:
+            conexion.close()
+
+    def esperar(self):
+        """Bloquea hasta que todo lo encolado esté en disco"""
+        self._cola.join()
+
+    def cerrar(self):
+        """Vacía la cola y detiene el escritor"""
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self._cola.put(_FIN)
+        self._hilo.join()
+
+    # ------------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------------
+
+    def consultar(self, estudiante=None, vino=None, desde=None, hasta=None, limite=None):
+        """
+        Ejecuciones que cumplen los filtros, de la más reciente a la más antigua
+
+        desde / hasta: marcas de tiempo (segundos desde la época)
+        Devuelve una lista de diccionarios con las columnas de ``ejecuciones``.
+        """
+        condiciones, parametros = [], []
+        for columna, operador, valor in (
+            ("estudiante", "=", estudiante),
+            ("vino", "=", vino),
+            ("marca_tiempo", ">=", desde),
+            ("marca_tiempo", "<", hasta),
+        ):
+            if valor is not None:
+                condiciones.append(f"{columna} {operador} ?")
+                parametros.append(valor)
+
+        sql = "SELECT * FROM ejecuciones"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " ORDER BY marca_tiempo DESC"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(int(limite))
+
+        conexion = self._conectar()
+        try:
+            conexion.row_factory = sqlite3.Row
+            return [dict(fila) for fila in conexion.execute(sql, parametros)]
+        finally:
+            conexion.close()
+
+    def patrones(self, ejecucion_id):
+        """Patrones de una ejecución como arreglo ``DTYPE_PATRON``"""
+        conexion = self._conectar()
+        try:
+            filas = conexion.execute(
+                "SELECT patron, alicuota, volumen, concentracion, en_rango, absorbancia "
+                "FROM patrones WHERE ejecucion_id = ? ORDER BY patron",
+                (ejecucion_id,),
+            ).fetchall()
+        finally:
+            conexion.close()
+        filas = [f[:5] + (np.nan if f[5] is None else f[5],) for f in filas]
+        return np.array(filas, dtype=DTYPE_PATRON)
+
+    def semestres(self):
+        """Semestres con ejecuciones, del más reciente al más antiguo"""
+        conexion = self._conectar()
+        try:
+            filas = conexion.execute("SELECT DISTINCT semestre FROM agregados_vino").fetchall()
+        finally:
+            conexion.close()
+        return sorted((f[0] for f in filas), key=lambda s: (s.split("-")[0], len(s)), reverse=True)
+
+    def agregados(self, semestres=None):
+        """
+        ``AgregadosClase`` de los semestres indicados (todos si es None)
+
+        Solo lee las tablas de agregados, cuyo tamaño no depende del número
+        de ejecuciones guardadas.
+        """
+        filtro, parametros = "", []
+        if semestres is not None:
+            filtro = f" WHERE semestre IN ({', '.join('?' * len(semestres))})"
+            parametros = list(semestres)
+
+        conexion = self._conectar()
+        try:
+            vinos = conexion.execute(
+                "SELECT vino, SUM(n), SUM(suma_error), SUM(suma_error2), SUM(dilucion_baja), "
+                f"SUM(dilucion_alta) FROM agregados_vino{filtro} GROUP BY vino", parametros
+            ).fetchall()
+            clases = conexion.execute(
+                f"SELECT variable, grupo, clase, SUM(n) FROM histogramas{filtro} "
+                "GROUP BY variable, grupo, clase", parametros
+            ).fetchall()
+        finally:
+            conexion.close()
+
+        resultado = AgregadosClase(semestres=list(semestres) if semestres is not None else self.semestres())
+        for vino, n, suma, suma2, baja, alta in vinos:
+            media = suma / n
+            resultado.por_vino[vino] = {
+                "n": n,
+                "media_error": media,
+                "desv_error": float(np.sqrt(max(suma2 / n - media ** 2, 0.0) * n / max(n - 1, 1))),
+                "dilucion_baja": baja,
+                "dilucion_alta": alta,
+            }
+        tamanos = {"error": N_CLASES_ERROR, "r2": len(ETIQUETAS_R2), "etapa1": N_CLASES_MASA}
+        for variable, grupo, clase, n in clases:
+            if not 0 <= clase < tamanos[variable]:
+                continue  # clases inválidas guardadas antes de filtrar los valores no finitos
+            if variable == "r2":
+                resultado.hist_r2[clase] += n
+                continue
+            destino = resultado.hist_error if variable == "error" else resultado.etapa1
+            if variable == "etapa1":
+                grupo = int(grupo)
+            if grupo not in destino:
+                destino[grupo] = np.zeros(tamanos[variable], dtype=int)
+            destino[grupo][clase] += n
+        return resultado
+
+    def muestra_dispersion(self, columnas=("conc_muestra_diluida", "error_relativo", "vino"),
+                           max_puntos=20_000, semestres=None):
+        """
+        Submuestra uniforme de ejecuciones para gráficos de dispersión
+
+        Toma una de cada ``paso`` ejecuciones por id, de modo que el costo
+        y el tamaño del gráfico quedan acotados por ``max_puntos``.
+        """
+        condiciones, parametros = [], []
+        if semestres is not None:
+            for nombre in semestres:
+                condiciones.append("(marca_tiempo >= ? AND marca_tiempo < ?)")
+                parametros.extend(rango_semestre(nombre))
+        filtro = f" WHERE ({' OR '.join(condiciones)})" if condiciones else ""
+
+        conexion = self._conectar()
+        try:
+            total = conexion.execute(f"SELECT COUNT(*) FROM ejecuciones{filtro}", parametros).fetchone()[0]
+            paso = max(1, -(-total // max_puntos))
+            filtro_paso = (" AND" if filtro else " WHERE") + " id % ? = 0"
+            filas = conexion.execute(
+                f"SELECT {', '.join(columnas)} FROM ejecuciones{filtro}{filtro_paso} LIMIT ?",
+                parametros + [paso, max_puntos],
+            ).fetchall()
+        finally:
+            conexion.close()
+        return {c: [f[i] for f in filas] for i, c in enumerate(columnas)}, total
+
+    def contar(self):
+        conexion = self._conectar()
+        try:
+            return conexion.execute("SELECT COUNT(*) FROM ejecuciones").fetchone()[0]
+        finally:
+            conexion.close()
+
+
+# ============================================================================
+# ALMACÉN COMPARTIDO DEL PROCESO
+# ============================================================================
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+
+def obtener_almacen():
+    """Almacén del proceso, creado en el primer uso en ``LABVIRTUAL_DB``"""
+    global _almacen
+    with _almacen_lock:
+        if _almacen is None:
+            _almacen = AlmacenEjecuciones(os.environ.get("LABVIRTUAL_DB") or RUTA_DEFECTO)
+            atexit.register(_almacen.cerrar)
+        return _almacen
@@ -0,0 +1,147 @@
+"""
+Agregados de clase sobre las prácticas guardadas.
+
+El almacén (``labvirtual.almacen``) mantiene estos agregados de forma
+incremental: cada lote que escribe el hilo escritor actualiza, en la misma
+transacción, los conteos por semestre de las tablas ``agregados_vino`` e
+``histogramas``. El panel del profesor lee solo esas tablas pequeñas, sin
+recorrer el historial completo.
+
+Los histogramas usan anchos de clase fijos; los cuantiles se estiman
+interpolando dentro de la clase.
+"""
+
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from labvirtual.calculos import RANGO_OPTIMO
+
+# Error relativo: clases de 1 %, la última acumula todo lo >= 50 %
+ANCHO_ERROR = 1.0
+N_CLASES_ERROR = 51
+
+# R²: clases de ancho variable (casi todas las curvas están cerca de 1)
+BORDES_R2 = np.array([0.9, 0.95, 0.98, 0.99, 0.995, 0.998, 0.999])
+ETIQUETAS_R2 = ["< 0.9", "0.9–0.95", "0.95–0.98", "0.98–0.99", "0.99–0.995",
+                "0.995–0.998", "0.998–0.999", "≥ 0.999"]
+
+# Masa de sal de Mohr en la Etapa 1: clases de 0.1 g, la última >= 5 g
+ANCHO_MASA = 0.1
+N_CLASES_MASA = 51
+
+# Columnas de ``ejecuciones`` que alimentan los agregados, en este orden
+COLUMNAS_AGREGADO = ("marca_tiempo", "vino", "error_relativo", "r2",
+                     "conc_muestra_diluida", "masa_sal_mohr", "volumen_aforo_patron")
+
+
+def semestre(marca_tiempo):
+    """
+    Ciclo lectivo de una marca de tiempo: ``"2026-I"`` o ``"2026-II"``
+
+    Enero a julio cuenta como I ciclo y agosto a diciembre como II ciclo.
+    """
+    t = time.localtime(marca_tiempo)
+    return f"{t.tm_year}-{'I' if t.tm_mon <= 7 else 'II'}"
+
+
+def rango_semestre(nombre):
+    """Marcas de tiempo (desde, hasta) que cubre un semestre"""
+    anio, ciclo = nombre.split("-")
+    anio = int(anio)
+    if ciclo == "I":
+        inicio, fin = (anio, 1, 1), (anio, 8, 1)
+    else:
+        inicio, fin = (anio, 8, 1), (anio + 1, 1, 1)
+    return (time.mktime(inicio + (0, 0, 0, 0, 0, -1)),
+            time.mktime(fin + (0, 0, 0, 0, 0, -1)))
+
+
+def clase_error(error_relativo):
+    return np.minimum(np.asarray(error_relativo) // ANCHO_ERROR, N_CLASES_ERROR - 1).astype(int)
+
+
+def clase_r2(r2):
+    return np.searchsorted(BORDES_R2, r2, side="right")
+
+
+def clase_masa(masa):
+    return np.minimum(np.asarray(masa) // ANCHO_MASA, N_CLASES_MASA - 1).astype(int)
+
+
+def agregar_lote(filas):
+    """
+    Incrementos de agregados para un lote de ejecuciones
+
+    filas: tuplas con los valores de ``COLUMNAS_AGREGADO``
+    Devuelve (por_vino, histogramas):
+    - por_vino: {(semestre, vino): [n, suma_error, suma_error², baja, alta]}
+    - histogramas: Counter {(semestre, variable, grupo, clase): n}
+
+    Un error relativo, R² o masa no finitos (curva sin pendiente, por
+    ejemplo) no tienen clase: esa ejecución no entra en ese agregado.
+    """
+    por_vino = defaultdict(lambda: [0, 0.0, 0.0, 0, 0])
+    histogramas = Counter()
+    if not filas:
+        return por_vino, histogramas
+
+    marcas, vinos, errores, r2, diluidas, masas, volumenes = zip(*filas)
+    semestres = [semestre(m) for m in marcas]
+    errores = np.asarray([np.nan if e is None else e for e in errores], dtype=float)
+    r2 = np.asarray([np.nan if r is None else r for r in r2], dtype=float)
+    diluidas = np.asarray([np.nan if d is None else d for d in diluidas], dtype=float)
+    masas = np.asarray([np.nan if m is None else m for m in masas], dtype=float)
+    error_finito = np.isfinite(errores)
+    r2_finito = np.isfinite(r2)
+    masa_finita = np.isfinite(masas)
+    # NaN no tiene clase entera (astype(int) daría un índice enorme)
+    clases_error = clase_error(np.where(error_finito, errores, 0.0))
+    clases_r2 = clase_r2(r2)
+    clases_masa = clase_masa(np.where(masa_finita, masas, 0.0))
+
+    for i, (sem, vino) in enumerate(zip(semestres, vinos)):
+        if error_finito[i]:
+            acumulado = por_vino[(sem, vino)]
+            acumulado[0] += 1
+            acumulado[1] += errores[i]
+            acumulado[2] += errores[i] ** 2
+            acumulado[3] += int(diluidas[i] < RANGO_OPTIMO[0])
+            acumulado[4] += int(diluidas[i] > RANGO_OPTIMO[1])
+            histogramas[(sem, "error", vino, int(clases_error[i]))] += 1
+        if r2_finito[i]:
+            histogramas[(sem, "r2", "", int(clases_r2[i]))] += 1
+        if masa_finita[i] and volumenes[i] is not None:
+            histogramas[(sem, "etapa1", str(volumenes[i]), int(clases_masa[i]))] += 1
+
+    return por_vino, histogramas
+
+
+def cuantiles_histograma(conteos, ancho, cuantiles):
+    """Cuantiles aproximados a partir de conteos en clases de ancho fijo"""
+    conteos = np.asarray(conteos, dtype=float)
+    total = conteos.sum()
+    if total == 0:
+        return np.full(len(cuantiles), np.nan)
+    acumulado = np.concatenate([[0.0], np.cumsum(conteos)]) / total
+    bordes = np.arange(conteos.size + 1) * ancho
+    return np.interp(cuantiles, acumulado, bordes)
+
+
+@dataclass
+class AgregadosClase:
+    """Lo que muestra el panel del profesor, leído de las tablas de agregados"""
+    semestres: list = field(default_factory=list)
+    # vino -> {"n", "media_error", "desv_error", "dilucion_baja", "dilucion_alta"}
+    por_vino: dict = field(default_factory=dict)
+    # vino -> conteos por clase de error
+    hist_error: dict = field(default_factory=dict)
+    hist_r2: np.ndarray = field(default_factory=lambda: np.zeros(len(ETIQUETAS_R2), dtype=int))
+    # volumen del balón (mL) -> conteos por clase de masa
+    etapa1: dict = field(default_factory=dict)
+
+    @property
+    def total(self):
+        return sum(v["n"] for v in self.por_vino.values())
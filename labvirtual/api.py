@@ -0,0 +1,296 @@
+"""
+API HTTP/JSON del motor de cálculo, para validar resultados desde el LMS.
+
+Servidor asyncio sin dependencias externas (biblioteca estándar y NumPy)
+que puede correr junto a la aplicación de Streamlit. Habla HTTP/1.1 con
+conexiones persistentes; cuerpos y respuestas son JSON.
+
+Todos los endpoints de cálculo trabajan por lotes: cada campo es un
+número o una lista de números (los escalares se repiten para todo el
+lote) y la respuesta tiene una lista por campo, calculada con una sola
+operación vectorizada de ``labvirtual.calculos``. Lo que no se puede
+calcular (división entre cero, vino desconocido) vuelve como null.
+
+POST /v1/patron-madre     {"masa_sal": [...], "volumen_aforo": [...]}
+POST /v1/patrones         {"conc_madre": [...], "alicuota": [...], "volumen_aforo": [...]}
+POST /v1/factor-dilucion  {"alicuota": [...], "volumen_aforo": [...]}
+POST /v1/curvas           {"curvas": [{"concentraciones": [...], "absorbancias": [...],
+                                       "absorbancia_muestra": 0.25, "fd": 2.5, "vino": "..."}]}
+POST /v1/calificar        {"entregas": [{...}]}  (columnas de labvirtual.calificacion)
+GET  /salud
+GET  /metricas            (formato de texto de Prometheus)
+
+python -m labvirtual api [--host 127.0.0.1] [--puerto 8765]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+from http import HTTPStatus
+
+import numpy as np
+
+from labvirtual.calculos import (
+    calcular_concentracion_muestra,
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    calcular_error_relativo,
+    calcular_fd_muestra,
+    verificar_rango_optimo,
+)
+from labvirtual.calibracion import CurvaCalibracion
+from labvirtual.calificacion import calificar_bloque, columnas_de_registros
+from labvirtual.catalogo import obtener_catalogo
+from labvirtual.metricas import METRICAS
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+MAX_CUERPO = 8 * 2**20     # bytes por solicitud
+MAX_ELEMENTOS = 100_000    # elementos por lote
+
+
+class ErrorSolicitud(Exception):
+    """Solicitud mal formada: se responde 400 con el mensaje"""
+
+
+# ============================================================================
+# CONVERSIÓN JSON <-> NUMPY
+# ============================================================================
+
+def _arreglo(cuerpo, nombre, defecto=None):
+    valor = cuerpo.get(nombre, defecto)
+    if valor is None:
+        raise ErrorSolicitud(f"Falta el campo '{nombre}'")
+    return _numeros(valor, nombre)
+
+
+def _numeros(valor, nombre):
+    """Número o lista de números (null = NaN) -> arreglo float"""
+    try:
+        if isinstance(valor, list):
+            return np.array([np.nan if v is None else v for v in valor], dtype=float)
+        return np.array(valor, dtype=float)
+    except (TypeError, ValueError):
+        raise ErrorSolicitud(f"'{nombre}' debe ser un número o una lista de números") from None
+
+
+def _lote(cuerpo, *nombres, **defectos):
+    """Campos del cuerpo como arreglos de la misma forma (los escalares se repiten)"""
+    arreglos = [_arreglo(cuerpo, n, defectos.get(n)) for n in nombres]
+    try:
+        arreglos = np.broadcast_arrays(*arreglos)
+    except ValueError:
+        raise ErrorSolicitud(f"Las listas {', '.join(nombres)} deben tener el mismo largo") from None
+    if arreglos[0].ndim > 1 or arreglos[0].size > MAX_ELEMENTOS:
+        raise ErrorSolicitud(f"Cada lote admite una lista plana de hasta {MAX_ELEMENTOS:,} elementos")
+    return arreglos
+
+
+def _json(valor):
+    """Arreglo o escalar de NumPy -> valor JSON (NaN e infinito pasan a null)"""
+    valor = np.asarray(valor)
+    if valor.dtype.kind == "f":
+        lista = valor.tolist()
+        if valor.ndim == 0:
+            return lista if math.isfinite(lista) else None
+        return [v if math.isfinite(v) else None for v in lista]
+    return valor.tolist()
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+def patron_madre(cuerpo):
+    masa, volumen = _lote(cuerpo, "masa_sal", "volumen_aforo")
+    return {"concentracion": _json(calcular_concentracion_patron_madre(masa, volumen))}
+
+
+def patrones(cuerpo):
+    conc_madre, alicuota, volumen = _lote(cuerpo, "conc_madre", "alicuota", "volumen_aforo")
+    concentracion = calcular_concentracion_patron(conc_madre, alicuota, volumen)
+    return {"concentracion": _json(concentracion),
+            "en_rango": _json(verificar_rango_optimo(concentracion))}
+
+
+def factor_dilucion(cuerpo):
+    alicuota, volumen = _lote(cuerpo, "alicuota", "volumen_aforo")
+    return {"fd": _json(calcular_fd_muestra(alicuota, volumen))}
+
+
+def curvas(cuerpo):
+    """
+    Regresión de la Etapa 5 para un lote de curvas
+
+    Devuelve los mismos parámetros que ``mostrar_resultados`` y, si la
+    curva trae ``absorbancia_muestra`` (y opcionalmente ``fd`` y ``vino``),
+    la concentración de la muestra y su error relativo.
+    """
+    lista = cuerpo.get("curvas")
+    if not isinstance(lista, list) or not lista:
+        raise ErrorSolicitud("'curvas' debe ser una lista no vacía")
+    if len(lista) > MAX_ELEMENTOS:
+        raise ErrorSolicitud(f"Cada lote admite hasta {MAX_ELEMENTOS:,} curvas")
+
+    x, y, muestra = [], [], []
+    for i, curva in enumerate(lista):
+        if not isinstance(curva, dict):
+            raise ErrorSolicitud(f"curvas[{i}] debe ser un objeto")
+        xi, yi = _lote(curva, "concentraciones", "absorbancias")
+        if xi.ndim != 1 or xi.size < 2:
+            raise ErrorSolicitud(f"curvas[{i}] necesita al menos 2 patrones")
+        x.append(xi)
+        y.append(yi)
+        muestra.append(curva)
+
+    puntos = np.array([xi.size for xi in x])
+    ajuste = CurvaCalibracion.desde_lotes(np.repeat(np.arange(len(x)), puntos),
+                                          np.concatenate(x), np.concatenate(y), len(x))
+    absorbancia = _numeros([c.get("absorbancia_muestra") for c in muestra], "absorbancia_muestra")
+    fd = _numeros([c.get("fd", 1.0) for c in muestra], "fd")
+    catalogo = obtener_catalogo()
+    conc_real = np.array([catalogo[c["vino"]]["concentracion_fe"] if c.get("vino") in catalogo else np.nan
+                          for c in muestra])
+
+    conc_calculada = calcular_concentracion_muestra(absorbancia, ajuste.pendiente, ajuste.intercepto, fd)
+    resultado = {nombre: _json(getattr(ajuste, nombre)) for nombre in
+                 ("pendiente", "intercepto", "r2", "s_yx", "s_pendiente", "s_intercepto", "lod", "loq")}
+    resultado["conc_muestra_diluida"] = _json(ajuste.predecir(absorbancia))
+    resultado["conc_calculada"] = _json(conc_calculada)
+    resultado["conc_real"] = _json(conc_real)
+    resultado["error_relativo"] = _json(calcular_error_relativo(conc_calculada, conc_real))
+    return resultado
+
+
+def calificar(cuerpo):
+    """Misma calificación que ``python -m labvirtual calificar``, para un lote de entregas"""
+    entregas = cuerpo.get("entregas")
+    if not isinstance(entregas, list) or not entregas or not all(isinstance(e, dict) for e in entregas):
+        raise ErrorSolicitud("'entregas' debe ser una lista no vacía de objetos")
+    if len(entregas) > MAX_ELEMENTOS:
+        raise ErrorSolicitud(f"Cada lote admite hasta {MAX_ELEMENTOS:,} entregas")
+    resultado = calificar_bloque(columnas_de_registros(entregas))
+    del resultado["fila"]
+    return {nombre: _json(valores) for nombre, valores in resultado.items()}
+
+
+RUTAS = {
+    "/v1/patron-madre": patron_madre,
+    "/v1/patrones": patrones,
+    "/v1/factor-dilucion": factor_dilucion,
+    "/v1/curvas": curvas,
+    "/v1/calificar": calificar,
+}
+
+
+# ============================================================================
+# SERVIDOR HTTP
+# ============================================================================
+
+def _respuesta(estado, cuerpo, tipo="application/json", mantener=True):
+    if not isinstance(cuerpo, bytes):
+        cuerpo = json.dumps(cuerpo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    estado = HTTPStatus(estado)
+    encabezado = (f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+                  f"Content-Type: {tipo}\r\n"
+                  f"Content-Length: {len(cuerpo)}\r\n"
+                  f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+    return encabezado.encode("latin-1") + cuerpo
+
+
+def despachar(metodo, ruta, cuerpo):
+    """(método, ruta, bytes del cuerpo) -> (estado, respuesta, tipo de contenido)"""
+    ruta = ruta.split("?", 1)[0]
+    if ruta == "/salud":
+        return HTTPStatus.OK, {"estado": "ok"}, "application/json"
+    if ruta == "/metricas":
+        return HTTPStatus.OK, METRICAS.exportar_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+
+    funcion = RUTAS.get(ruta)
+    if funcion is None:
+        return HTTPStatus.NOT_FOUND, {"error": f"Ruta desconocida: {ruta}"}, "application/json"
+    if metodo != "POST":
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST"}, "application/json"
+    try:
+        datos = json.loads(cuerpo)
+        if not isinstance(datos, dict):
+            raise ErrorSolicitud("El cuerpo debe ser un objeto JSON")
+        # Divisiones entre cero y similares se devuelven como null, sin avisos
+        with METRICAS.medir(f"api {ruta}", tipo="api"), np.errstate(all="ignore"):
+            return HTTPStatus.OK, funcion(datos), "application/json"
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return HTTPStatus.BAD_REQUEST, {"error": "JSON inválido"}, "application/json"
+    except ErrorSolicitud as error:
+        return HTTPStatus.BAD_REQUEST, {"error": str(error)}, "application/json"
+
+
+async def atender(lector, escritor):
+    """Una conexión: atiende solicitudes hasta que el cliente la cierre"""
+    try:
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            try:
+                metodo, ruta, version = linea.decode("latin-1").split()
+            except ValueError:
+                escritor.write(_respuesta(HTTPStatus.BAD_REQUEST, {"error": "Solicitud inválida"}, mantener=False))
+                break
+
+            encabezados = {}
+            while (linea := await lector.readline()) not in (b"\r\n", b"\n", b""):
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                encabezados[nombre.strip().lower()] = valor.strip()
+            conexion = encabezados.get("connection", "").lower()
+            mantener = conexion == "keep-alive" if version == "HTTP/1.0" else conexion != "close"
+
+            if "transfer-encoding" in encabezados:
+                escritor.write(_respuesta(HTTPStatus.LENGTH_REQUIRED, {"error": "Envíe Content-Length"},
+                                          mantener=False))
+                break
+            largo = int(encabezados.get("content-length", 0) or 0)
+            if largo > MAX_CUERPO:
+                escritor.write(_respuesta(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                          {"error": f"El cuerpo supera {MAX_CUERPO // 2**20} MiB"},
+                                          mantener=False))
+                break
+            cuerpo = await lector.readexactly(largo) if largo else b""
+
+            try:
+                estado, respuesta, tipo = despachar(metodo, ruta, cuerpo)
+            except Exception as error:  # un error de cálculo no debe tumbar el servidor
+                estado, respuesta, tipo = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                           {"error": f"{type(error).__name__}: {error}"}, "application/json")
+            escritor.write(_respuesta(estado, respuesta, tipo, mantener))
+            await escritor.drain()
+            if not mantener:
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        escritor.close()
+
+
+async def servir(host=HOST, puerto=PUERTO, listo=None):
+    """Atiende la API hasta que se cancele; ``listo`` (asyncio.Event) avisa al escuchar"""
+    servidor = await asyncio.start_server(atender, host, puerto)
+    obtener_catalogo()  # primera consulta sin la carga del catálogo
+    if listo is not None:
+        listo.set()
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m labvirtual api",
+                                     description="API HTTP/JSON del motor de cálculo")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    args = parser.parse_args(argv)
+
+    print(f"API escuchando en http://{args.host}:{args.puerto}", flush=True)
+    try:
+        asyncio.run(servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
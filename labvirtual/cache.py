@@ -0,0 +1,207 @@
+"""
+Caché acotada compartida entre sesiones.
+
+Streamlit vuelve a ejecutar ``Lab_virtual.py`` en cada interacción, pero
+los módulos de este paquete se importan una sola vez por proceso. Las
+instancias de ``CacheLRU`` definidas aquí son, por lo tanto, compartidas
+por todas las sesiones de estudiantes. Las claves se calculan a partir del
+contenido de los datos medidos, de modo que dos estudiantes con los mismos
+(C, A) reutilizan el mismo ajuste y la misma figura.
+
+La caché de figuras guarda objetos ``go.Figure`` ya construidos: ahorra
+armar las trazas y el layout, no la serialización. ``st.plotly_chart``
+valida y serializa la figura en cada ejecución de todos modos, y entregarle
+el JSON guardado (como diccionario) es más lento que entregarle la figura,
+porque la reconstruye completa con ``go.Figure(**figura)`` para validarla
+(unos 10 ms contra 1 ms para la curva de calibración).
+
+Los valores guardados se comparten: quien los obtiene no debe modificarlos.
+"""
+
+import dataclasses
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from labvirtual.calibracion import CurvaCalibracion
+from labvirtual.metricas import instrumentar
+
+
+def clave_arreglos(*arreglos, extra=None):
+    """Clave de contenido (blake2b) para un conjunto de arreglos"""
+    h = hashlib.blake2b(digest_size=16)
+    for arreglo in arreglos:
+        arreglo = np.ascontiguousarray(arreglo, dtype=float)
+        h.update(str(arreglo.shape).encode())
+        h.update(arreglo.tobytes())
+    if extra is not None:
+        h.update(repr(extra).encode())
+    return h.hexdigest()
+
+
+# Figuras de Plotly: costo fijo del layout (con su plantilla) y de cada
+# traza, más los arreglos de datos; del orden de su forma serializada
+TAMANO_BASE_FIGURA = 8 * 1024
+TAMANO_BASE_TRAZA = 512
+TAMANO_ELEMENTO = 32   # un objeto de Python por elemento en las tuplas de Plotly
+CAMPOS_DATOS = ("x", "y", "z", "text", "hovertext", "customdata")
+
+
+def _tamano_datos(valor):
+    if valor is None or isinstance(valor, (str, bytes, int, float)):
+        return 0
+    if isinstance(valor, np.ndarray):
+        return valor.size * TAMANO_ELEMENTO if valor.dtype == object else valor.nbytes
+    return len(valor) * TAMANO_ELEMENTO
+
+
+def _tamano_figura(figura):
+    total = TAMANO_BASE_FIGURA
+    for traza in figura.data:
+        total += TAMANO_BASE_TRAZA
+        total += sum(_tamano_datos(getattr(traza, campo, None)) for campo in CAMPOS_DATOS)
+        marcador = getattr(traza, "marker", None)
+        if marcador is not None:
+            total += _tamano_datos(marcador.color) + _tamano_datos(marcador.size)
+    return total
+
+
+def estimar_tamano(valor):
+    """Tamaño aproximado en bytes de un valor guardado en la caché"""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (bytes, str)):
+        return len(valor)
+    if hasattr(valor, "data") and hasattr(valor, "layout"):
+        # Figuras de Plotly: se estima desde las trazas, sin serializarlas
+        return _tamano_figura(valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Caché LRU segura entre hilos con límite de entradas, memoria y TTL
+
+    ``max_bytes`` acota la suma de ``estimar_tamano`` de los valores;
+    ``ttl`` (segundos) descarta entradas viejas al consultarlas.
+    """
+
+    def __init__(self, max_entradas=1024, max_bytes=64 * 2**20, ttl=3600.0,
+                 reloj=time.monotonic):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._reloj = reloj
+        self._datos = OrderedDict()  # clave -> (valor, tamaño, expiración)
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expirados = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        with self._lock:
+            return self._vigente(clave) is not None
+
+    def _vigente(self, clave):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        if entrada[2] < self._reloj():
+            self._eliminar(clave)
+            self.expirados += 1
+            return None
+        return entrada
+
+    def _eliminar(self, clave):
+        _, tamano, _ = self._datos.pop(clave)
+        self.bytes_usados -= tamano
+
+    def obtener(self, clave, defecto=None):
+        """Devuelve el valor guardado y lo marca como usado recientemente"""
+        with self._lock:
+            entrada = self._vigente(clave)
+            if entrada is None:
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor, tamano=None):
+        """Guarda un valor, desalojando los menos usados si hace falta"""
+        if tamano is None:
+            tamano = estimar_tamano(valor)
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._datos:
+                self._eliminar(clave)
+            self._datos[clave] = (valor, tamano, self._reloj() + self.ttl)
+            self.bytes_usados += tamano
+            while (len(self._datos) > self.max_entradas
+                   or self.bytes_usados > self.max_bytes):
+                self._eliminar(next(iter(self._datos)))
+                self.desalojos += 1
+
+    def obtener_o_calcular(self, clave, funcion, tamano=None):
+        """Devuelve el valor guardado o lo calcula con ``funcion()`` y lo guarda"""
+        centinela = object()
+        valor = self.obtener(clave, centinela)
+        if valor is centinela:
+            # Se calcula fuera del candado para no bloquear otras sesiones
+            valor = funcion()
+            self.guardar(clave, valor, tamano)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.bytes_usados = 0
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "bytes": self.bytes_usados,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "desalojos": self.desalojos,
+                "expirados": self.expirados,
+            }
+
+
+# ============================================================================
+# CACHÉS COMPARTIDAS DEL PROCESO
+# ============================================================================
+
+CACHE_AJUSTES = CacheLRU(max_entradas=4096, max_bytes=4 * 2**20, ttl=3600.0)
+# Figuras construidas, no serializadas (ver el docstring del módulo)
+CACHE_FIGURAS = CacheLRU(max_entradas=512, max_bytes=64 * 2**20, ttl=3600.0)
+
+
+@instrumentar
+def ajuste_cacheado(x, y):
+    """
+    ``CurvaCalibracion`` de los datos (C, A), compartida entre sesiones
+
+    Devuelve una copia (seis números): quien la modifique con ``agregar`` o
+    ``quitar`` no altera la curva de otras sesiones.
+    """
+    curva = CACHE_AJUSTES.obtener_o_calcular(
+        clave_arreglos(x, y),
+        lambda: CurvaCalibracion.desde_datos(x, y),
+        tamano=sys.getsizeof(CurvaCalibracion()) + 6 * 8,
+    )
+    return dataclasses.replace(curva)
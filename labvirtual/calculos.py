@@ -0,0 +1,132 @@
+"""
+Funciones de cálculo de la práctica (sin dependencia de Streamlit).
+
+Todas las funciones aceptan escalares o arreglos de NumPy. Con escalares
+devuelven un ``float``/``bool`` de Python, igual que la versión original
+de ``Lab_virtual.py``; con arreglos devuelven un ``np.ndarray`` calculado
+en una sola operación vectorizada.
+"""
+
+import numpy as np
+
+from labvirtual.metricas import instrumentar
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+MM_SAL_MOHR = 392.14  # g/mol, (NH4)2Fe(SO4)2·6H2O
+MM_FE = 55.845        # g/mol
+K_ABSORCION = 0.082   # L/(mg·cm), Fe a 248.3 nm
+RANGO_OPTIMO = (1.0, 5.0)  # mg/L
+
+
+def _salida(resultado):
+    """Devuelve un escalar de Python si el resultado es 0-d."""
+    resultado = np.asarray(resultado)
+    if resultado.ndim == 0:
+        return resultado.item()
+    return resultado
+
+
+# ============================================================================
+# FUNCIONES DE CÁLCULO
+# ============================================================================
+
+@instrumentar
+def calcular_concentracion_patron_madre(masa_sal, volumen_aforo):
+    """
+    Calcula la concentración de Fe en la solución patrón madre
+    Sal de Mohr: (NH4)2Fe(SO4)2·6H2O
+    MM = 392.14 g/mol
+    MM Fe = 55.845 g/mol
+    """
+    if masa_sal is None or volumen_aforo is None:
+        return None
+
+    masa_sal = np.asarray(masa_sal, dtype=float)
+    volumen_aforo = np.asarray(volumen_aforo, dtype=float)
+
+    # Moles de sal y de Fe (1:1)
+    moles_fe = masa_sal / MM_SAL_MOHR
+
+    # Masa de Fe en mg
+    masa_fe_mg = moles_fe * MM_FE * 1000
+
+    # Concentración en mg/L
+    return _salida(masa_fe_mg / (volumen_aforo / 1000))
+
+
+@instrumentar
+def calcular_concentracion_patron(conc_madre, alicuota, volumen_aforo):
+    """Calcula la concentración de un patrón por dilución"""
+    if conc_madre is None:
+        return None
+    conc_madre = np.asarray(conc_madre, dtype=float)
+    return _salida(conc_madre * np.asarray(alicuota, dtype=float)
+                   / np.asarray(volumen_aforo, dtype=float))
+
+
+@instrumentar
+def calcular_fd_muestra(alicuota, volumen_aforo):
+    """Calcula el factor de dilución de la muestra"""
+    if alicuota is None or volumen_aforo is None:
+        return None
+    return _salida(np.asarray(volumen_aforo, dtype=float)
+                   / np.asarray(alicuota, dtype=float))
+
+
+@instrumentar
+def verificar_rango_optimo(concentracion):
+    """Verifica si la concentración está en rango óptimo (1-5 mg/L)"""
+    concentracion = np.asarray(concentracion, dtype=float)
+    minimo, maximo = RANGO_OPTIMO
+    return _salida((concentracion >= minimo) & (concentracion <= maximo))
+
+
+# ============================================================================
+# REGRESIÓN Y RESULTADOS
+# ============================================================================
+
+@instrumentar
+def ajustar_recta(x, y):
+    """
+    Ajuste lineal por mínimos cuadrados A = m·C + b
+
+    Opera sobre el último eje, de modo que ``y`` de forma (n_curvas, n_puntos)
+    ajusta todas las curvas a la vez. Devuelve (pendiente, intercepto, r2).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    x_media = x.mean(axis=-1, keepdims=True)
+    y_media = y.mean(axis=-1, keepdims=True)
+    dx = x - x_media
+    dy = y - y_media
+
+    sxx = np.sum(dx * dx, axis=-1)
+    sxy = np.sum(dx * dy, axis=-1)
+    syy = np.sum(dy * dy, axis=-1)
+
+    pendiente = sxy / sxx
+    intercepto = y_media[..., 0] - pendiente * x_media[..., 0]
+
+    # R² = SSreg / SStot
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r2 = (sxy * sxy / sxx) / syy
+
+    return _salida(pendiente), _salida(intercepto), _salida(r2)
+
+
+@instrumentar
+def calcular_concentracion_muestra(absorbancia, pendiente, intercepto, fd=1.0):
+    """Interpola la absorbancia en la curva y corrige por dilución"""
+    absorbancia = np.asarray(absorbancia, dtype=float)
+    return _salida((absorbancia - intercepto) / pendiente * np.asarray(fd, dtype=float))
+
+
+@instrumentar
+def calcular_error_relativo(conc_calculada, conc_real):
+    """Error relativo porcentual respecto al valor real"""
+    conc_calculada = np.asarray(conc_calculada, dtype=float)
+    conc_real = np.asarray(conc_real, dtype=float)
+    return _salida(np.abs((conc_calculada - conc_real) / conc_real) * 100)
@@ -0,0 +1,258 @@
+"""
+Curva de calibración por estadísticos suficientes.
+
+``CurvaCalibracion`` guarda solo n, las medias de x e y y las sumas
+centradas Sxx, Sxy y Syy, de modo que agregar o quitar un patrón cuesta
+O(1) y puede alimentarse en modo streaming con bloques de datos simulados
+sin mantenerlos en memoria. Las sumas se actualizan ya centradas (Welford,
+y Chan et al. para unir bloques), sin la cancelación de Σx² - (Σx)²/n en
+series largas. Todas las cantidades de la regresión se obtienen en forma
+cerrada; sin patrones valen NaN.
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+# Factores ICH Q2 para límites de detección y cuantificación
+FACTOR_LOD = 3.3
+FACTOR_LOQ = 10.0
+
+# Sxx/Σx² por debajo del cual todos los patrones tienen la misma
+# concentración: con sumas centradas lo que queda es el redondeo de la
+# media, del orden de ε² ≈ 5e-32
+TOLERANCIA_SXX = 1e-24
+
+
+def _raiz(valor):
+    # float de Python para una curva; arreglo para curvas en lote
+    return math.sqrt(valor) if np.ndim(valor) == 0 else np.sqrt(valor)
+
+
+def _cociente(numerador, denominador, definido):
+    # NaN donde el cociente no está definido, en vez de ZeroDivisionError
+    if np.ndim(definido) == 0:
+        return numerador / denominador if definido else float("nan")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(definido, numerador / denominador, np.nan)
+
+
+@dataclass
+class CurvaCalibracion:
+    """Regresión lineal A = m·C + b acumulada incrementalmente"""
+    n: int = 0
+    x_media: float = float("nan")
+    y_media: float = float("nan")
+    ssxx: float = float("nan")
+    ssxy: float = float("nan")
+    ssyy: float = float("nan")
+
+    @classmethod
+    def desde_datos(cls, x, y):
+        """Construye la curva a partir de arreglos de concentración y absorbancia"""
+        curva = cls()
+        curva.agregar_lote(x, y)
+        return curva
+
+    @classmethod
+    def desde_lotes(cls, curva, x, y, n_curvas=None):
+        """
+        Varias curvas a la vez: el punto ``i`` pertenece a la curva ``curva[i]``
+
+        Los estadísticos quedan como arreglos (uno por curva) y todas las
+        propiedades devuelven un arreglo calculado en forma vectorizada.
+        """
+        curva = np.asarray(curva, dtype=np.int64)
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if n_curvas is None:
+            n_curvas = int(curva.max()) + 1 if curva.size else 0
+
+        def suma(valores):
+            return np.bincount(curva, weights=valores, minlength=n_curvas)
+
+        # Dos pasadas: medias por curva y luego sumas centradas en ellas
+        n = np.bincount(curva, minlength=n_curvas)
+        x_media = _cociente(suma(x), n, n > 0)
+        y_media = _cociente(suma(y), n, n > 0)
+        dx = x - x_media[curva]
+        dy = y - y_media[curva]
+
+        def centrada(valores):
+            return np.where(n > 0, suma(valores), np.nan)
+
+        return cls(n=n, x_media=x_media, y_media=y_media,
+                   ssxx=centrada(dx * dx), ssxy=centrada(dx * dy), ssyy=centrada(dy * dy))
+
+    # ------------------------------------------------------------------
+    # Actualización (medias y sumas centradas, al estilo de Welford)
+    # ------------------------------------------------------------------
+
+    def agregar(self, x, y):
+        """Agrega un patrón (concentración, absorbancia)"""
+        if self.n == 0:
+            self.n, self.x_media, self.y_media = 1, x, y
+            self.ssxx = self.ssxy = self.ssyy = 0.0
+            return
+        self.n += 1
+        dx = x - self.x_media
+        dy = y - self.y_media
+        self.x_media += dx / self.n
+        self.y_media += dy / self.n
+        self.ssxx += dx * (x - self.x_media)
+        self.ssxy += dx * (y - self.y_media)
+        self.ssyy += dy * (y - self.y_media)
+
+    def quitar(self, x, y):
+        """Quita un patrón previamente agregado"""
+        if self.n == 0:
+            raise ValueError("La curva no tiene patrones")
+        if self.n == 1:
+            self.n = 0
+            self.x_media = self.y_media = self.ssxx = self.ssxy = self.ssyy = float("nan")
+            return
+        self.n -= 1
+        dx = x - self.x_media
+        dy = y - self.y_media
+        self.x_media -= dx / self.n
+        self.y_media -= dy / self.n
+        self.ssxx -= dx * (x - self.x_media)
+        self.ssxy -= dx * (y - self.y_media)
+        self.ssyy -= dy * (y - self.y_media)
+
+    def agregar_lote(self, x, y):
+        """Agrega un bloque de datos en una sola pasada vectorizada"""
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if x.shape != y.shape:
+            raise ValueError("x e y deben tener el mismo número de puntos")
+        if x.size == 0:
+            return
+        x_media = float(x.mean())
+        y_media = float(y.mean())
+        dx = x - x_media
+        dy = y - y_media
+        self._fusionar(x.size, x_media, y_media, float(np.dot(dx, dx)), float(np.dot(dx, dy)),
+                       float(np.dot(dy, dy)))
+
+    def combinar(self, otra):
+        """Devuelve una curva nueva con los datos de ambas"""
+        curva = CurvaCalibracion(self.n, self.x_media, self.y_media, self.ssxx, self.ssxy, self.ssyy)
+        if otra.n:
+            curva._fusionar(otra.n, otra.x_media, otra.y_media, otra.ssxx, otra.ssxy, otra.ssyy)
+        return curva
+
+    def _fusionar(self, n, x_media, y_media, ssxx, ssxy, ssyy):
+        # Fórmula de Chan et al. para unir dos grupos sin volver a los datos
+        if self.n == 0:
+            self.n, self.x_media, self.y_media = n, x_media, y_media
+            self.ssxx, self.ssxy, self.ssyy = ssxx, ssxy, ssyy
+            return
+        total = self.n + n
+        dx = x_media - self.x_media
+        dy = y_media - self.y_media
+        peso = self.n * n / total
+        self.x_media += dx * n / total
+        self.y_media += dy * n / total
+        self.ssxx += ssxx + dx * dx * peso
+        self.ssxy += ssxy + dx * dy * peso
+        self.ssyy += ssyy + dy * dy * peso
+        self.n = total
+
+    # ------------------------------------------------------------------
+    # Sumas de cuadrados sin centrar
+    # ------------------------------------------------------------------
+
+    @property
+    def sxx(self):
+        """Σx² (NaN sin patrones)"""
+        return self.ssxx + self.n * self.x_media * self.x_media
+
+    @property
+    def syy(self):
+        """Σy² (NaN sin patrones)"""
+        return self.ssyy + self.n * self.y_media * self.y_media
+
+    # ------------------------------------------------------------------
+    # Parámetros de la regresión
+    # ------------------------------------------------------------------
+
+    @property
+    def con_pendiente(self):
+        """False si todos los patrones tienen la misma concentración (Sxx = 0)"""
+        return self.ssxx > TOLERANCIA_SXX * self.sxx
+
+    @property
+    def pendiente(self):
+        """NaN si la curva no tiene pendiente (ver ``con_pendiente``)"""
+        return _cociente(self.ssxy, self.ssxx, self.con_pendiente)
+
+    @property
+    def intercepto(self):
+        return self.y_media - self.pendiente * self.x_media
+
+    @property
+    def r2(self):
+        """Coeficiente de determinación R² (NaN sin pendiente o con absorbancias iguales)"""
+        ssyy = self.ssyy
+        return _cociente(self.ssxy * self.ssxy, self.ssxx * ssyy,
+                         self.con_pendiente & (ssyy > TOLERANCIA_SXX * self.syy))
+
+    @property
+    def s_yx(self):
+        """Desviación estándar de los residuos s_y/x"""
+        if np.ndim(self.n) == 0:
+            if self.n < 3:
+                return float("nan")
+            ss_residual = max(self.ssyy - self.pendiente * self.ssxy, 0.0)
+            return math.sqrt(ss_residual / (self.n - 2))
+        # Curvas en lote (ver desde_lotes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ss_residual = np.maximum(self.ssyy - self.pendiente * self.ssxy, 0.0)
+            return np.where(self.n >= 3, np.sqrt(ss_residual / (self.n - 2)), np.nan)
+
+    @property
+    def s_pendiente(self):
+        return _cociente(self.s_yx, _raiz(np.maximum(self.ssxx, 0.0)), self.con_pendiente)
+
+    @property
+    def s_intercepto(self):
+        return self.s_yx * _raiz(_cociente(self.sxx, self.n * self.ssxx, self.con_pendiente))
+
+    @property
+    def lod(self):
+        """Límite de detección en mg/L (3.3·s_y/x / m)"""
+        pendiente = self.pendiente
+        return _cociente(FACTOR_LOD * self.s_yx, pendiente, pendiente != 0)
+
+    @property
+    def loq(self):
+        """Límite de cuantificación en mg/L (10·s_y/x / m)"""
+        pendiente = self.pendiente
+        return _cociente(FACTOR_LOQ * self.s_yx, pendiente, pendiente != 0)
+
+    # ------------------------------------------------------------------
+    # Uso de la curva
+    # ------------------------------------------------------------------
+
+    def evaluar(self, x):
+        """Absorbancia predicha para una concentración"""
+        return self.pendiente * np.asarray(x, dtype=float) + self.intercepto
+
+    def predecir(self, absorbancia):
+        """Concentración interpolada a partir de una absorbancia"""
+        return (np.asarray(absorbancia, dtype=float) - self.intercepto) / self.pendiente
+
+    def incertidumbre_prediccion(self, absorbancia, n_replicas=1):
+        """
+        Desviación estándar de la concentración interpolada s_x0
+
+        s_x0 = (s_y/x / m) · √(1/k + 1/n + (y0 - ȳ)² / (m² · Sxx))
+        con k lecturas replicadas de la muestra.
+        """
+        m = self.pendiente
+        y0 = np.asarray(absorbancia, dtype=float)
+        return _cociente(self.s_yx, abs(m), m != 0) * np.sqrt(
+            1 / n_replicas + _cociente(1, self.n, self.n > 0) + (y0 - self.y_media)**2 / (m * m * self.ssxx)
+        )
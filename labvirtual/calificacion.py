@@ -0,0 +1,402 @@
+"""
+Calificación por lotes de las entregas de toda la clase, sin Streamlit.
+
+Cada entrega es una fila de un CSV o de un JSONL con los datos que el
+estudiante anotó en la práctica:
+
+    estudiante, vino, masa_sal_mohr, volumen_aforo_patron,
+    alicuotas_patron, aforos_patron, absorbancias_patron,
+    alicuota_vino, volumen_aforo_muestra, absorbancia_muestra,
+    conc_reportada (opcional, el resultado que entregó el estudiante)
+
+Las columnas ``*_patron`` son listas: en CSV se separan con ";"
+(``"1;2;3;4;5"``) y en JSONL son arreglos. ``aforos_patron`` puede ser un
+solo valor si todos los patrones usan el mismo balón.
+
+La calificación repite el cálculo de la aplicación (patrón madre,
+patrones, ajuste de la curva, concentración de la muestra y error
+relativo contra el catálogo de vinos) con las funciones vectorizadas de
+``labvirtual.calculos``: un bloque completo de entregas se resuelve con
+unas pocas operaciones de NumPy, agrupando las curvas por número de
+patrones.
+
+El archivo se lee por bloques de ``TAMANO_BLOQUE`` filas; los bloques se
+reparten en un pool de procesos y los resultados se escriben en orden en
+un solo archivo Parquet (un grupo de filas por bloque), sin tener el
+archivo completo en memoria. Escribir Parquet requiere pyarrow.
+
+python -m labvirtual calificar entregas.csv -o calificaciones.parquet
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from labvirtual.calculos import (
+    ajustar_recta,
+    calcular_concentracion_muestra,
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    calcular_error_relativo,
+    calcular_fd_muestra,
+    verificar_rango_optimo,
+)
+from labvirtual.catalogo import obtener_catalogo
+from labvirtual.metricas import instrumentar
+
+TAMANO_BLOQUE = 20_000
+SEPARADOR_LISTA = ";"
+
+COLUMNAS_ESCALARES = ("masa_sal_mohr", "volumen_aforo_patron", "alicuota_vino",
+                      "volumen_aforo_muestra", "absorbancia_muestra", "conc_reportada")
+
+# Columnas del resultado, en orden, con su tipo de Arrow
+COLUMNAS_CALIFICACION = (
+    ("fila", "int64"),
+    ("estudiante", "string"),
+    ("vino", "string"),
+    ("conc_patron_madre", "float64"),
+    ("n_patrones", "int16"),
+    ("patrones_fuera_rango", "int16"),
+    ("pendiente", "float64"),
+    ("intercepto", "float64"),
+    ("r2", "float64"),
+    ("fd", "float64"),
+    ("conc_muestra_diluida", "float64"),
+    ("muestra_en_rango", "bool"),
+    ("conc_calculada", "float64"),
+    ("conc_real", "float64"),
+    ("error_relativo", "float64"),
+    ("conc_reportada", "float64"),
+    ("diferencia_reportada", "float64"),
+    ("valida", "bool"),
+    ("motivo", "string"),
+)
+
+# Columna agregada al leer el archivo: el motivo si la fila no se pudo leer
+# (campos de más o de menos en CSV, línea que no es un objeto JSON)
+COLUMNA_LECTURA = "_error_lectura"
+
+# Motivos de una entrega no válida, en orden de prioridad
+MOTIVO_FILA = "fila malformada"
+MOTIVO_JSON = "línea JSON inválida"
+MOTIVO_VINO = "vino desconocido"
+MOTIVO_PATRONES = "patrones incompletos"
+MOTIVO_NUMEROS = "valores no numéricos"
+MOTIVO_CURVA = "curva sin pendiente"
+
+
+# ============================================================================
+# CONVERSIÓN DE COLUMNAS
+# ============================================================================
+
+def _a_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _numeros(valores, n):
+    """Lista de textos o números -> arreglo float (vacío o inválido = NaN)"""
+    if valores is None:
+        return np.full(n, np.nan)
+    valores = [np.nan if v is None or v == "" else v for v in valores]
+    try:
+        return np.array(valores, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([_a_float(v) for v in valores], dtype=float)
+
+
+def _listas(valores, n):
+    """Columna de listas -> (valores aplanados, cantidad por fila)"""
+    conteos = np.zeros(n, dtype=np.int64)
+    if valores is None:
+        return np.empty(0), conteos
+    planos = []
+    for i, valor in enumerate(valores):
+        if valor is None or valor == "":
+            continue
+        if isinstance(valor, str):
+            valor = valor.split(SEPARADOR_LISTA)
+        elif not isinstance(valor, list):
+            valor = [valor]
+        planos.extend(valor)
+        conteos[i] = len(valor)
+    return _numeros(planos, len(planos)), conteos
+
+
+def _inicios(conteos):
+    return np.cumsum(conteos) - conteos
+
+
+# ============================================================================
+# CALIFICACIÓN DE UN BLOQUE
+# ============================================================================
+
+@instrumentar
+def calificar_bloque(columnas, primera_fila=0):
+    """
+    Califica un bloque de entregas
+
+    ``columnas`` es un diccionario nombre -> lista de valores (textos del
+    CSV o valores del JSON). Devuelve un diccionario con las columnas de
+    ``COLUMNAS_CALIFICACION`` como arreglos de NumPy.
+    """
+    n = len(columnas["vino"])
+    vinos = ["" if v is None else str(v) for v in columnas["vino"]]
+    estudiantes = ["" if v is None else str(v) for v in columnas.get("estudiante", [None] * n)]
+    escalares = {nombre: _numeros(columnas.get(nombre), n) for nombre in COLUMNAS_ESCALARES}
+    alicuotas, n_alicuotas = _listas(columnas.get("alicuotas_patron"), n)
+    aforos, n_aforos = _listas(columnas.get("aforos_patron"), n)
+    absorbancias, n_absorbancias = _listas(columnas.get("absorbancias_patron"), n)
+    error_lectura = np.array(["" if v is None else v for v in columnas.get(COLUMNA_LECTURA, [None] * n)],
+                             dtype=object)
+
+    with np.errstate(all="ignore"):
+        conc_madre = calcular_concentracion_patron_madre(escalares["masa_sal_mohr"],
+                                                         escalares["volumen_aforo_patron"])
+
+        # Un patrón por elemento de los arreglos planos; un aforo único vale para todos
+        completas = ((n_alicuotas >= 2) & (n_absorbancias == n_alicuotas)
+                     & ((n_aforos == 1) | (n_aforos == n_alicuotas)))
+        fila_patron = np.repeat(np.arange(n), n_alicuotas)
+        posicion = np.arange(fila_patron.size) - np.repeat(_inicios(n_alicuotas), n_alicuotas)
+        posicion_aforo = np.minimum(np.where(n_aforos[fila_patron] == 1, 0, posicion),
+                                    np.maximum(n_aforos[fila_patron] - 1, 0))
+        # Sin aforos la fila ya es incompleta; su índice apuntaría a la fila siguiente
+        con_aforo = n_aforos[fila_patron] > 0
+        aforo_patron = np.full(fila_patron.size, np.nan)
+        aforo_patron[con_aforo] = aforos[(_inicios(n_aforos)[fila_patron] + posicion_aforo)[con_aforo]]
+        concentraciones = calcular_concentracion_patron(conc_madre[fila_patron], alicuotas, aforo_patron)
+        fuera_rango = np.bincount(fila_patron, weights=~np.asarray(verificar_rango_optimo(concentraciones)),
+                                  minlength=n)
+
+        # Curvas agrupadas por número de patrones: un solo ajuste por grupo
+        pendiente = np.full(n, np.nan)
+        intercepto = np.full(n, np.nan)
+        r2 = np.full(n, np.nan)
+        for k in np.unique(n_alicuotas[completas]):
+            filas = np.flatnonzero(completas & (n_alicuotas == k))
+            indices = _inicios(n_alicuotas)[filas, None] + np.arange(k)
+            desde_absorbancias = _inicios(n_absorbancias)[filas, None] + np.arange(k)
+            pendiente[filas], intercepto[filas], r2[filas] = ajustar_recta(
+                concentraciones[indices], absorbancias[desde_absorbancias])
+
+        fd = np.asarray(calcular_fd_muestra(escalares["alicuota_vino"], escalares["volumen_aforo_muestra"]))
+        conc_diluida = np.asarray(calcular_concentracion_muestra(escalares["absorbancia_muestra"],
+                                                                 pendiente, intercepto))
+        conc_calculada = conc_diluida * fd
+
+        catalogo = obtener_catalogo()
+        reales = {v: catalogo[v]["concentracion_fe"] if v in catalogo else np.nan for v in set(vinos)}
+        conc_real = np.array([reales[v] for v in vinos], dtype=float)
+        error = np.asarray(calcular_error_relativo(conc_calculada, conc_real))
+        diferencia = np.abs(escalares["conc_reportada"] - conc_calculada) / np.abs(conc_calculada) * 100
+
+        # Entradas que no se pudieron leer como números (incluye los patrones)
+        fila_absorbancia = np.repeat(np.arange(n), n_absorbancias)
+        no_numericos = (np.bincount(fila_patron, weights=~np.isfinite(concentraciones), minlength=n)
+                        + np.bincount(fila_absorbancia, weights=~np.isfinite(absorbancias), minlength=n)
+                        + ~np.isfinite(fd) + ~np.isfinite(escalares["absorbancia_muestra"])) > 0
+
+    motivo = np.select(
+        [np.isnan(conc_real), ~completas, no_numericos, ~np.isfinite(conc_calculada)],
+        [MOTIVO_VINO, MOTIVO_PATRONES, MOTIVO_NUMEROS, MOTIVO_CURVA],
+        "",
+    ).astype(object)
+    # Un error de lectura tiene prioridad sobre los demás motivos
+    motivo = np.where(error_lectura != "", error_lectura, motivo)
+
+    return {
+        "fila": np.arange(primera_fila, primera_fila + n, dtype=np.int64),
+        "estudiante": np.array(estudiantes, dtype=object),
+        "vino": np.array(vinos, dtype=object),
+        "conc_patron_madre": np.asarray(conc_madre, dtype=float),
+        "n_patrones": n_alicuotas.astype(np.int16),
+        "patrones_fuera_rango": fuera_rango.astype(np.int16),
+        "pendiente": pendiente,
+        "intercepto": intercepto,
+        "r2": r2,
+        "fd": fd,
+        "conc_muestra_diluida": conc_diluida,
+        "muestra_en_rango": np.asarray(verificar_rango_optimo(conc_diluida)),
+        "conc_calculada": conc_calculada,
+        "conc_real": conc_real,
+        "error_relativo": error,
+        "conc_reportada": escalares["conc_reportada"],
+        "diferencia_reportada": diferencia,
+        "valida": motivo == "",
+        "motivo": motivo,
+    }
+
+
+# ============================================================================
+# LECTURA POR BLOQUES
+# ============================================================================
+
+def _columnas(encabezado, filas):
+    # Una fila con campos de más o de menos se completa (o recorta) al ancho
+    # del encabezado y se marca; el resto del bloque no se ve afectado
+    ancho = len(encabezado)
+    errores = ["" if len(fila) == ancho else MOTIVO_FILA for fila in filas]
+    filas = [fila if len(fila) == ancho else (fila + [""] * ancho)[:ancho] for fila in filas]
+    columnas = {nombre: list(valores) for nombre, valores in zip(encabezado, zip(*filas))}
+    columnas[COLUMNA_LECTURA] = errores
+    return columnas
+
+
+def bloques_csv(ruta, tamano=TAMANO_BLOQUE):
+    """Bloques de ``tamano`` entregas de un CSV como diccionarios de columnas"""
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        lector = csv.reader(archivo)
+        encabezado = [c.strip() for c in next(lector)]
+        filas = []
+        for fila in lector:
+            if fila:
+                filas.append(fila)
+            if len(filas) == tamano:
+                yield _columnas(encabezado, filas)
+                filas = []
+        if filas:
+            yield _columnas(encabezado, filas)
+
+
+def columnas_de_registros(registros):
+    """Lista de diccionarios (una entrega cada uno) -> diccionario de columnas"""
+    nombres = dict.fromkeys(c for r in registros for c in r)
+    nombres.setdefault("vino")
+    return {nombre: [r.get(nombre) for r in registros] for nombre in nombres}
+
+
+def _registro_json(linea):
+    # Una línea ilegible queda como una entrega no válida, sin detener el archivo
+    try:
+        registro = json.loads(linea)
+    except json.JSONDecodeError:
+        registro = None
+    if not isinstance(registro, dict):
+        return {COLUMNA_LECTURA: MOTIVO_JSON}
+    return registro
+
+
+def bloques_jsonl(ruta, tamano=TAMANO_BLOQUE):
+    """Bloques de ``tamano`` entregas de un JSONL (un objeto por línea)"""
+    with open(ruta, encoding="utf-8") as archivo:
+        registros = []
+        for linea in archivo:
+            if linea.strip():
+                registros.append(_registro_json(linea))
+            if len(registros) == tamano:
+                yield columnas_de_registros(registros)
+                registros = []
+        if registros:
+            yield columnas_de_registros(registros)
+
+
+def leer_bloques(ruta, tamano=TAMANO_BLOQUE):
+    """Bloques del archivo de entregas según su extensión (.csv o .jsonl)"""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() in (".jsonl", ".ndjson"):
+        return bloques_jsonl(ruta, tamano)
+    return bloques_csv(ruta, tamano)
+
+
+# ============================================================================
+# ARCHIVO COMPLETO
+# ============================================================================
+
+def _calificar(argumentos):
+    columnas, primera_fila = argumentos
+    return calificar_bloque(columnas, primera_fila)
+
+
+def calificar_en_orden(bloques, procesos=None):
+    """
+    Califica los bloques en un pool de procesos y los devuelve en orden
+
+    Solo se mantienen en vuelo dos bloques por proceso, de modo que la
+    memoria no depende del tamaño del archivo. Con ``procesos=1`` todo se
+    hace en el proceso actual.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    trabajos = _numerar(bloques)
+    if procesos == 1:
+        yield from map(_calificar, trabajos)
+        return
+    from concurrent.futures import ProcessPoolExecutor  # solo al usar el pool
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = deque()
+        for trabajo in trabajos:
+            en_vuelo.append(pool.submit(_calificar, trabajo))
+            if len(en_vuelo) >= 2 * procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+def _numerar(bloques):
+    primera_fila = 0
+    for columnas in bloques:
+        yield columnas, primera_fila
+        primera_fila += len(columnas["vino"])
+
+
+def esquema_calificacion():
+    import pyarrow as pa
+
+    return pa.schema([(nombre, pa.type_for_alias(tipo)) for nombre, tipo in COLUMNAS_CALIFICACION])
+
+
+def tabla_bloque(resultado):
+    """Bloque calificado -> tabla de Arrow (NaN pasa a nulo)"""
+    import pyarrow as pa
+
+    esquema = esquema_calificacion()
+    return pa.table([pa.array(resultado[campo.name], type=campo.type, from_pandas=True)
+                     for campo in esquema], schema=esquema)
+
+
+@instrumentar(tipo="lote")
+def calificar_archivo(origen, destino, procesos=None, tamano=TAMANO_BLOQUE):
+    """
+    Califica un CSV/JSONL de entregas y escribe un Parquet con el resultado
+
+    Devuelve (entregas, válidas).
+    """
+    import pyarrow.parquet as pq
+
+    entregas = validas = 0
+    with pq.ParquetWriter(destino, esquema_calificacion(), compression="zstd") as escritor:
+        for resultado in calificar_en_orden(leer_bloques(origen, tamano), procesos):
+            escritor.write_table(tabla_bloque(resultado))
+            entregas += resultado["fila"].size
+            validas += int(resultado["valida"].sum())
+    return entregas, validas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m labvirtual calificar",
+        description="Califica las entregas de la clase (CSV o JSONL) y escribe un Parquet")
+    parser.add_argument("entregas", type=Path)
+    parser.add_argument("-o", "--salida", type=Path,
+                        help="Archivo Parquet de salida (por defecto, junto a las entregas)")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE)
+    args = parser.parse_args(argv)
+
+    salida = args.salida or args.entregas.with_name(f"{args.entregas.stem}_calificado.parquet")
+    inicio = time.perf_counter()
+    entregas, validas = calificar_archivo(args.entregas, salida, args.procesos, args.tamano_bloque)
+    duracion = time.perf_counter() - inicio
+    print(f"{entregas:,} entregas calificadas ({validas:,} válidas) en {duracion:.2f} s "
+          f"({entregas / max(duracion, 1e-9):,.0f} por segundo) -> {salida}")
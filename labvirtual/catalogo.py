@@ -0,0 +1,344 @@
+"""
+Catálogo de vinos en formato columnar con acceso por memoria mapeada.
+
+El catálogo es un directorio con un archivo ``.npy`` por columna y un
+``esquema.json``. Las columnas numéricas (Fe y otros metales) se abren con
+``np.load(..., mmap_mode="r")``; las de texto se guardan como un bloque
+UTF-8 más un arreglo de desplazamientos, también mapeados. Nada se lee del
+disco hasta que se consulta, y el sistema operativo comparte las páginas
+entre procesos.
+
+``obtener_catalogo()`` carga el catálogo una sola vez por proceso desde
+``LABVIRTUAL_CATALOGO``; sin esa variable usa ``VINOS_DATABASE``. El
+catálogo se comporta como un diccionario de solo lectura nombre -> datos,
+igual que ``VINOS_DATABASE``.
+
+Conversión desde CSV o Parquet (Parquet requiere pyarrow):
+python -m labvirtual.catalogo vinos.csv datos/catalogo
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import threading
+import unicodedata
+from collections import Counter
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+from labvirtual.cache import CacheLRU
+from labvirtual.vinos import VINOS_DATABASE
+
+COLUMNAS_TEXTO = ("nombre", "imagen", "color", "descripcion", "ruta_imagen")
+COLUMNAS_OBLIGATORIAS = ("nombre", "concentracion_fe")
+TEXTO = "texto"
+
+
+def _es_numerica(valores):
+    """True si todos los valores no vacíos se pueden leer como números"""
+    for valor in valores:
+        if valor is None or valor == "":
+            continue
+        try:
+            float(valor)
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def _duplicados(nombres):
+    """Nombres que aparecen más de una vez, en orden de aparición"""
+    return [nombre for nombre, veces in Counter(nombres).items() if veces > 1]
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para búsquedas"""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+# ============================================================================
+# COLUMNAS DE TEXTO
+# ============================================================================
+
+class ColumnaTexto:
+    """Cadenas UTF-8 concatenadas con sus desplazamientos (n + 1)"""
+
+    def __init__(self, datos, desplazamientos, bloque=None, inicio=0):
+        self.datos = datos
+        self.desplazamientos = desplazamientos
+        # Los mismos bytes que ``datos`` como objeto con ``find`` (bytes o
+        # mmap) a partir de ``inicio``, para buscar sin copiarlos
+        self._bloque = bloque
+        self._inicio = inicio
+
+    @classmethod
+    def desde_lista(cls, textos):
+        codificados = [t.encode("utf-8") for t in textos]
+        desplazamientos = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in codificados], out=desplazamientos[1:])
+        bloque = b"".join(codificados)
+        return cls(np.frombuffer(bloque, dtype=np.uint8), desplazamientos, bloque)
+
+    def __len__(self):
+        return self.desplazamientos.size - 1
+
+    def __getitem__(self, i):
+        inicio, fin = self.desplazamientos[i], self.desplazamientos[i + 1]
+        return str(memoryview(self.datos)[inicio:fin], "utf-8")
+
+    def todos(self):
+        """Lista con todos los textos (una sola pasada por el bloque, sin copiarlo)"""
+        bloque = memoryview(self.datos)
+        d = self.desplazamientos.tolist()
+        return [str(bloque[d[i]:d[i + 1]], "utf-8") for i in range(len(d) - 1)]
+
+    def buscar(self, fragmento):
+        """Filas cuyo texto contiene ``fragmento`` (búsqueda en el bloque completo)"""
+        aguja = fragmento.encode("utf-8")
+        bloque, inicio = self._bloque, self._inicio
+        if bloque is None:
+            bloque, inicio = self.datos.tobytes(), 0
+        fin = inicio + self.datos.size
+        posiciones = []
+        posicion = bloque.find(aguja, inicio, fin)
+        while posicion != -1:
+            posiciones.append(posicion - inicio)
+            posicion = bloque.find(aguja, posicion + 1, fin)
+        posiciones = np.array(posiciones, dtype=np.int64)
+        filas = np.searchsorted(self.desplazamientos, posiciones, side="right") - 1
+        # Descartar coincidencias que cruzan al texto de la fila siguiente
+        dentro = posiciones + len(aguja) <= self.desplazamientos[filas + 1]
+        return np.unique(filas[dentro])
+
+    def guardar(self, directorio, nombre):
+        np.save(directorio / f"{nombre}.datos.npy", self.datos)
+        np.save(directorio / f"{nombre}.desplazamientos.npy", self.desplazamientos)
+
+    @classmethod
+    def abrir(cls, directorio, nombre):
+        # El bloque se mapea una sola vez: ``datos`` es una vista del mmap y
+        # ``buscar`` usa mmap.find sobre las mismas páginas
+        with open(directorio / f"{nombre}.datos.npy", "rb") as archivo:
+            version = np.lib.format.read_magic(archivo)
+            if version == (1, 0):
+                forma, _, _ = np.lib.format.read_array_header_1_0(archivo)
+            else:
+                forma, _, _ = np.lib.format.read_array_header_2_0(archivo)
+            inicio = archivo.tell()
+            bloque = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        datos = np.frombuffer(bloque, dtype=np.uint8, count=forma[0], offset=inicio)
+        return cls(datos, np.load(directorio / f"{nombre}.desplazamientos.npy", mmap_mode="r"), bloque, inicio)
+
+
+# ============================================================================
+# CATÁLOGO
+# ============================================================================
+
+class CatalogoVinos(Mapping):
+    """
+    Catálogo columnar de solo lectura: nombre -> diccionario de datos
+
+    Las columnas se guardan en ``self.columnas`` (ndarray o ``ColumnaTexto``).
+    La columna ``busqueda`` (nombre y descripción normalizados) se usa para
+    ``buscar``.
+    """
+
+    def __init__(self, columnas):
+        faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el catálogo: {', '.join(faltantes)}")
+        if isinstance(columnas["concentracion_fe"], ColumnaTexto):
+            raise ValueError("La columna concentracion_fe del catálogo debe ser numérica")
+        self.columnas = columnas
+        self._indice_nombres = None
+        self._lock = threading.Lock()
+        # Cada rerun de la Etapa 3 repite la misma búsqueda
+        self._busquedas = CacheLRU(max_entradas=256, max_bytes=16 * 2**20)
+
+    # ------------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------------
+
+    @classmethod
+    def desde_registros(cls, registros):
+        """
+        Catálogo en memoria a partir de una lista de diccionarios
+
+        Las columnas de ``COLUMNAS_TEXTO`` y cualquier otra con valores no
+        numéricos (región, productor...) se guardan como ``ColumnaTexto``.
+        """
+        repetidos = _duplicados(r["nombre"] for r in registros if r.get("nombre") is not None)
+        if repetidos:
+            raise ValueError(f"Nombres de vino repetidos en el catálogo: {', '.join(map(str, repetidos))}")
+        nombres_columnas = list(dict.fromkeys(c for r in registros for c in r))
+        columnas = {}
+        for columna in nombres_columnas:
+            valores = [r.get(columna) for r in registros]
+            if columna in COLUMNAS_TEXTO or not _es_numerica(valores):
+                columnas[columna] = ColumnaTexto.desde_lista(["" if v is None else str(v) for v in valores])
+            else:
+                columnas[columna] = np.array(
+                    [np.nan if v in (None, "") else float(v) for v in valores], dtype=np.float64
+                )
+        columnas["busqueda"] = ColumnaTexto.desde_lista([
+            normalizar(f"{r.get('nombre', '')} {r.get('descripcion') or ''}") for r in registros
+        ])
+        return cls(columnas)
+
+    @classmethod
+    def desde_dict(cls, vinos):
+        """Catálogo a partir de un diccionario como ``VINOS_DATABASE``"""
+        return cls.desde_registros([{"nombre": nombre, **datos} for nombre, datos in vinos.items()])
+
+    @classmethod
+    def desde_csv(cls, ruta):
+        with open(ruta, newline="", encoding="utf-8") as archivo:
+            return cls.desde_registros(list(csv.DictReader(archivo)))
+
+    @classmethod
+    def desde_parquet(cls, ruta):
+        import pyarrow.parquet as pq  # dependencia opcional, solo para convertir
+
+        return cls.desde_registros(pq.read_table(ruta).to_pylist())
+
+    def guardar(self, directorio):
+        """Escribe el catálogo en formato columnar (un .npy por columna)"""
+        repetidos = _duplicados(self.columnas["nombre"].todos())
+        if repetidos:
+            raise ValueError(f"Nombres de vino repetidos en el catálogo: {', '.join(repetidos)}")
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        esquema = {"filas": len(self), "columnas": {}}
+        for nombre, columna in self.columnas.items():
+            if isinstance(columna, ColumnaTexto):
+                columna.guardar(directorio, nombre)
+                esquema["columnas"][nombre] = TEXTO
+            else:
+                np.save(directorio / f"{nombre}.npy", np.asarray(columna))
+                esquema["columnas"][nombre] = str(columna.dtype)
+        (directorio / "esquema.json").write_text(json.dumps(esquema, indent=2), encoding="utf-8")
+
+    @classmethod
+    def abrir(cls, directorio):
+        """Abre un catálogo guardado sin leer sus datos (memoria mapeada)"""
+        directorio = Path(directorio)
+        esquema = json.loads((directorio / "esquema.json").read_text(encoding="utf-8"))
+        columnas = {}
+        for nombre, tipo in esquema["columnas"].items():
+            if tipo == TEXTO:
+                columnas[nombre] = ColumnaTexto.abrir(directorio, nombre)
+            else:
+                columnas[nombre] = np.load(directorio / f"{nombre}.npy", mmap_mode="r")
+        return cls(columnas)
+
+    # ------------------------------------------------------------------------
+    # Acceso
+    # ------------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.columnas["nombre"])
+
+    def _nombres(self):
+        # Diccionario nombre -> fila, construido en la primera consulta por nombre
+        if self._indice_nombres is None:
+            with self._lock:
+                if self._indice_nombres is None:
+                    nombres = self.columnas["nombre"].todos()
+                    self._indice_nombres = {nombre: i for i, nombre in enumerate(nombres)}
+        return self._indice_nombres
+
+    def __iter__(self):
+        return iter(self._nombres())
+
+    def __contains__(self, nombre):
+        return nombre in self._nombres()
+
+    def __getitem__(self, nombre):
+        return self.fila(self._nombres()[nombre])
+
+    def nombre(self, i):
+        return self.columnas["nombre"][i]
+
+    def indices(self, nombres):
+        """Filas de ``nombres`` (int32), en el mismo orden"""
+        indice = self._nombres()
+        return np.fromiter((indice[n] for n in nombres), dtype=np.int32, count=len(nombres))
+
+    def nombres(self, filas):
+        """Nombres de las filas ``filas``, en el mismo orden"""
+        return [self.nombre(int(i)) for i in filas]
+
+    def fila(self, i):
+        """Datos de la fila ``i`` con las claves de ``VINOS_DATABASE``"""
+        datos = {}
+        for columna, valores in self.columnas.items():
+            if columna in ("nombre", "busqueda"):
+                continue
+            valor = valores[i]
+            datos[columna] = valor if isinstance(valor, str) else float(valor)
+        datos.setdefault("imagen", "🍷")
+        datos.setdefault("color", "#8B0000")
+        datos.setdefault("descripcion", "")
+        return datos
+
+    def buscar(self, texto):
+        """Índices de las filas cuyo nombre o descripción contienen todas las palabras de ``texto``"""
+        palabras = normalizar(texto).split()
+        if not palabras:
+            return np.arange(len(self))
+
+        def calcular():
+            filas = self.columnas["busqueda"].buscar(palabras[0])
+            for palabra in palabras[1:]:
+                filas = np.intersect1d(filas, self.columnas["busqueda"].buscar(palabra), assume_unique=True)
+            return filas
+
+        return self._busquedas.obtener_o_calcular(" ".join(palabras), calcular)
+
+    @staticmethod
+    def paginar(indices, pagina, tamano):
+        """Índices de la página ``pagina`` (desde 1) y número total de páginas"""
+        paginas = max(1, -(-len(indices) // tamano))
+        pagina = min(max(pagina, 1), paginas)
+        return indices[(pagina - 1) * tamano:pagina * tamano], paginas
+
+
+# ============================================================================
+# CATÁLOGO COMPARTIDO DEL PROCESO
+# ============================================================================
+
+_catalogo = None
+_catalogo_lock = threading.Lock()
+
+
+def obtener_catalogo():
+    """Catálogo del proceso: ``LABVIRTUAL_CATALOGO`` o ``VINOS_DATABASE``"""
+    global _catalogo
+    with _catalogo_lock:
+        if _catalogo is None:
+            ruta = os.environ.get("LABVIRTUAL_CATALOGO")
+            _catalogo = CatalogoVinos.abrir(ruta) if ruta else CatalogoVinos.desde_dict(VINOS_DATABASE)
+        return _catalogo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte un catálogo CSV o Parquet al formato columnar")
+    parser.add_argument("origen", type=Path)
+    parser.add_argument("destino", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.origen.suffix.lower() == ".parquet":
+        catalogo = CatalogoVinos.desde_parquet(args.origen)
+    else:
+        catalogo = CatalogoVinos.desde_csv(args.origen)
+    catalogo.guardar(args.destino)
+    print(f"{len(catalogo)} vinos guardados en {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
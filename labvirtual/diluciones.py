@@ -0,0 +1,214 @@
+"""
+Planificador de diluciones para los patrones de la curva de calibración.
+
+Dada la concentración del patrón madre, evalúa de una sola vez toda la
+rejilla de alícuotas (0.1–50 mL en pasos de 0.1 mL) por balones de aforo
+(10/25/50/100 mL) y arma conjuntos de 3, 5 o 7 patrones dentro del rango
+óptimo, repartidos de manera uniforme y con el menor número de pasos de
+pipeteo.
+
+Un paso de pipeteo es una transferencia con una pipeta volumétrica de
+``TOLERANCIAS_PIPETA``: 3 mL son dos pasos (2 + 1) y 25 mL uno solo.
+
+Para la Etapa 3, ``INDICE_DILUCIONES`` guarda por vino las combinaciones
+(alícuota, aforo) que dejan la muestra en el rango óptimo.
+"""
+
+import functools
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from labvirtual.calculos import (
+    RANGO_OPTIMO,
+    calcular_concentracion_patron,
+    calcular_fd_muestra,
+    verificar_rango_optimo,
+)
+from labvirtual.incertidumbre import TOLERANCIAS_PIPETA
+from labvirtual.metricas import instrumentar
+
+AFOROS_PATRON = (10, 25, 50, 100)  # mL, balones de la Etapa 2
+PASO_ALICUOTA = 0.1                 # mL
+ALICUOTA_MAXIMA = 50.0              # mL
+
+# Peso de cada criterio en el costo de un plan (por patrón)
+PESO_PASOS = 1.0
+PESO_IRREGULARIDAD = 4.0
+PESO_COBERTURA = 4.0
+
+# Separación de los extremos del plan respecto a los límites del rango (mg/L)
+MARGENES = np.round(np.arange(0.05, 0.55, 0.05), 2)
+
+
+@dataclass(slots=True)
+class PlanDilucion:
+    """Un conjunto de patrones sugerido, ordenado por concentración"""
+    alicuotas: np.ndarray
+    aforos: np.ndarray
+    concentraciones: np.ndarray
+    pasos: int
+    irregularidad: float  # desviación relativa de las separaciones entre patrones
+    cobertura: float      # fracción del rango 1–5 mg/L que abarca el plan
+    costo: float
+
+
+@functools.cache
+def alicuotas_disponibles():
+    """Alícuotas de la rejilla (mL) y pasos de pipeteo mínimos de cada una"""
+    n = int(round(ALICUOTA_MAXIMA / PASO_ALICUOTA))
+    pipetas = [int(round(v / PASO_ALICUOTA)) for v in TOLERANCIAS_PIPETA]
+    # Problema del cambio de monedas en unidades de 0.1 mL
+    pasos = np.full(n + 1, np.inf)
+    pasos[0] = 0
+    for volumen in range(1, n + 1):
+        pasos[volumen] = min(pasos[volumen - p] for p in pipetas if p <= volumen) + 1
+    alicuotas = np.round(np.arange(1, n + 1) * PASO_ALICUOTA, 1)
+    return alicuotas, pasos[1:]
+
+
+def rejilla_diluciones(conc_madre, aforos=AFOROS_PATRON):
+    """
+    Concentraciones de toda la rejilla en una sola operación
+
+    Devuelve (alicuotas, aforos, concentraciones, pasos) aplanados, solo con
+    las combinaciones que quedan en el rango óptimo.
+    """
+    alicuotas, pasos = alicuotas_disponibles()
+    aforos = np.asarray(aforos)
+    concentraciones = calcular_concentracion_patron(conc_madre, alicuotas[None, :], aforos[:, None])
+    validas = verificar_rango_optimo(concentraciones)
+    indice_aforo, indice_alicuota = np.nonzero(validas)
+    return (alicuotas[indice_alicuota], aforos[indice_aforo],
+            concentraciones[validas], pasos[indice_alicuota])
+
+
+@instrumentar
+def planes_dilucion(conc_madre, n_patrones, n_planes=3):
+    """
+    Mejores conjuntos de ``n_patrones`` patrones para un patrón madre
+
+    Para cada par de márgenes (inferior, superior) se reparten objetivos
+    uniformes en el rango y se elige, para cada objetivo, la combinación de
+    la rejilla que minimiza la distancia más los pasos de pipeteo. Todo se
+    evalúa como un tensor (planes × patrones × combinaciones).
+    Devuelve hasta ``n_planes`` ``PlanDilucion`` de menor costo.
+    """
+    alicuotas, aforos, concentraciones, pasos = rejilla_diluciones(conc_madre)
+    if concentraciones.size < n_patrones:
+        return []
+
+    minimo, maximo = RANGO_OPTIMO
+    inferior, superior = np.meshgrid(MARGENES, MARGENES, indexing="ij")
+    fraccion = np.linspace(0.0, 1.0, n_patrones)
+    objetivos = ((minimo + inferior.ravel())[:, None]
+                 + ((maximo - superior.ravel()) - (minimo + inferior.ravel()))[:, None] * fraccion)
+    separacion = (objetivos[:, -1] - objetivos[:, 0]) / (n_patrones - 1)
+
+    # Distancia al objetivo en unidades de la separación, más los pasos
+    costo_punto = (np.abs(concentraciones[None, None, :] - objetivos[:, :, None])
+                   / separacion[:, None, None]
+                   * PESO_IRREGULARIDAD + PESO_PASOS * pasos[None, None, :])
+    elegidos = costo_punto.argmin(axis=2)  # planes × patrones
+
+    c = concentraciones[elegidos]
+    diferencias = np.diff(c, axis=1)
+    irregularidad = diferencias.std(axis=1) / np.maximum(diferencias.mean(axis=1), 1e-12)
+    cobertura = (c[:, -1] - c[:, 0]) / (maximo - minimo)
+    pasos_plan = pasos[elegidos].sum(axis=1)
+    costo = (PESO_PASOS * pasos_plan
+             + n_patrones * (PESO_IRREGULARIDAD * irregularidad + PESO_COBERTURA * (1 - cobertura)))
+    # Un plan con dos patrones iguales no sirve para la curva
+    costo[(diferencias <= 0).any(axis=1)] = np.inf
+
+    planes = []
+    vistos = set()
+    for i in np.argsort(costo, kind="stable"):
+        if not np.isfinite(costo[i]) or len(planes) == n_planes:
+            break
+        clave = tuple(elegidos[i])
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        planes.append(PlanDilucion(
+            alicuotas=alicuotas[elegidos[i]],
+            aforos=aforos[elegidos[i]],
+            concentraciones=c[i],
+            pasos=int(pasos_plan[i]),
+            irregularidad=float(irregularidad[i]),
+            cobertura=float(cobertura[i]),
+            costo=float(costo[i]),
+        ))
+    return planes
+
+
+# ============================================================================
+# DILUCIONES DE LA MUESTRA DE VINO
+# ============================================================================
+
+AFOROS_MUESTRA = (10, 25, 50, 100, 250)  # mL, balones de la Etapa 3
+
+
+@dataclass(slots=True)
+class DilucionesVino:
+    """Combinaciones (alícuota, aforo) que dejan un vino en el rango óptimo"""
+    concentracion_fe: float
+    mascara: np.ndarray  # aforos × alícuotas, True si la dilución queda en rango
+    rangos: dict         # aforo -> (alícuota mínima, alícuota máxima) o None
+
+    @property
+    def n_factibles(self):
+        return int(self.mascara.sum())
+
+
+def diluciones_vino(concentracion_fe):
+    """Evalúa toda la rejilla de la Etapa 3 para una concentración de Fe"""
+    alicuotas, _ = alicuotas_disponibles()
+    aforos = np.asarray(AFOROS_MUESTRA)
+    diluidas = concentracion_fe / calcular_fd_muestra(alicuotas[None, :], aforos[:, None])
+    mascara = verificar_rango_optimo(diluidas)
+    rangos = {}
+    for aforo, fila in zip(AFOROS_MUESTRA, mascara):
+        # La concentración crece con la alícuota: las factibles son contiguas
+        indices = np.flatnonzero(fila)
+        rangos[aforo] = (float(alicuotas[indices[0]]), float(alicuotas[indices[-1]])) if indices.size else None
+    return DilucionesVino(float(concentracion_fe), mascara, rangos)
+
+
+class IndiceDiluciones:
+    """
+    Índice de diluciones factibles por vino, compartido por el proceso
+
+    Cada vino se evalúa la primera vez que se consulta (o si cambió su
+    concentración), de modo que un catálogo grande no se recorre completo;
+    las consultas siguientes son una búsqueda en un diccionario.
+    """
+
+    def __init__(self):
+        self._vinos = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._vinos)
+
+    def agregar(self, nombre, concentracion_fe):
+        entrada = diluciones_vino(concentracion_fe)
+        with self._lock:
+            self._vinos[nombre] = entrada
+        return entrada
+
+    def obtener(self, nombre, concentracion_fe=None):
+        """
+        Diluciones factibles de un vino
+
+        Si se da ``concentracion_fe`` y el vino no está en el índice (o
+        cambió), se evalúa en ese momento y queda guardado.
+        """
+        entrada = self._vinos.get(nombre)
+        if concentracion_fe is not None and (entrada is None or entrada.concentracion_fe != concentracion_fe):
+            entrada = self.agregar(nombre, concentracion_fe)
+        return entrada
+
+
+INDICE_DILUCIONES = IndiceDiluciones()
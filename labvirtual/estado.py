@@ -0,0 +1,271 @@
+"""
+Representación compacta del estado de un estudiante.
+
+Reemplaza los nueve valores sueltos de ``st.session_state`` (la lista de
+diccionarios ``patrones_preparados`` y los diccionarios anidados de
+``mediciones_aa``) por una dataclass con ``__slots__`` y un arreglo
+estructurado de NumPy con una fila por patrón. Cada patrón ocupa 28 bytes
+en lugar de varios cientos en un diccionario de Python. Las réplicas de la
+Etapa 4 se guardan igual, en un arreglo con una fila por lectura.
+"""
+
+import hashlib
+import sys
+import uuid
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+from labvirtual.calculos import calcular_fd_muestra, verificar_rango_optimo
+from labvirtual.instrumento import TIPOS
+
+# Una fila por patrón; la absorbancia es NaN hasta medirla en la Etapa 4
+DTYPE_PATRON = np.dtype([
+    ("patron", np.uint8),
+    ("alicuota", np.float64),
+    ("volumen", np.uint16),
+    ("concentracion", np.float64),
+    ("en_rango", np.bool_),
+    ("absorbancia", np.float64),
+])
+
+
+# Secuencias de la Etapa 4; el índice es el código de ``corrida`` en DTYPE_LECTURA
+CORRIDAS = ("patrones", "muestra", "lote")
+
+# Una fila por réplica leída en la Etapa 4 (blanco, patrones, muestra, control).
+# ``corrida`` y ``tipo`` son códigos (índices de CORRIDAS e instrumento.TIPOS);
+# las etiquetas solo se usan al mostrar o exportar.
+DTYPE_LECTURA = np.dtype([
+    ("corrida", np.uint8),
+    ("posicion", np.uint8),
+    ("tipo", np.uint8),
+    ("concentracion", np.float64),
+    ("replica", np.uint8),
+    ("absorbancia", np.float64),
+])
+
+
+# Una fila por vino del modo por lotes; cada uno con su propia dilución
+DTYPE_LOTE = np.dtype([
+    ("vino", np.int32),                # fila en el catálogo (obtener_catalogo)
+    ("alicuota", np.float64),
+    ("volumen", np.uint16),
+    ("fd", np.float64),
+    ("concentracion_diluida", np.float64),
+    ("absorbancia", np.float64),
+])
+
+
+def _vacio(dtype):
+    # Arreglo vacío de solo lectura, compartido por todas las sesiones: un
+    # estado recién creado no reserva memoria propia para sus tablas
+    arreglo = np.empty(0, dtype=dtype)
+    arreglo.setflags(write=False)
+    return arreglo
+
+
+PATRONES_VACIO = _vacio(DTYPE_PATRON)
+LECTURAS_VACIO = _vacio(DTYPE_LECTURA)
+LOTE_VACIO = _vacio(DTYPE_LOTE)
+_VACIOS = (PATRONES_VACIO, LECTURAS_VACIO, LOTE_VACIO)
+
+
+def crear_patrones(alicuotas, volumenes, concentraciones):
+    """Arreglo estructurado de patrones sin medir"""
+    concentraciones = np.asarray(concentraciones, dtype=float)
+    patrones = np.empty(concentraciones.size, dtype=DTYPE_PATRON)
+    patrones["patron"] = np.arange(1, concentraciones.size + 1)
+    patrones["alicuota"] = alicuotas
+    patrones["volumen"] = volumenes
+    patrones["concentracion"] = concentraciones
+    patrones["en_rango"] = verificar_rango_optimo(concentraciones)
+    patrones["absorbancia"] = np.nan
+    return patrones
+
+
+@dataclass(slots=True)
+class MedicionMuestra:
+    """Lectura de la muestra de vino en la Etapa 4"""
+    vino: str
+    absorbancia: float
+    concentracion_diluida: float
+
+
+@dataclass(slots=True)
+class EstadoLaboratorio:
+    """Estado completo de la práctica de un estudiante"""
+    # Etapa 1
+    masa_sal_mohr: float | None = None
+    volumen_aforo_patron: int | None = None
+    conc_patron_madre: float | None = None
+    # Etapa 2 y 4
+    patrones: np.ndarray = field(default_factory=lambda: PATRONES_VACIO)
+    # Etapa 3
+    vino_seleccionado: str | None = None
+    alicuota_vino: float | None = None
+    volumen_aforo_muestra: int | None = None
+    conc_muestra_diluida: float | None = None
+    # Etapa 4
+    muestra: MedicionMuestra | None = None
+    lecturas: np.ndarray = field(default_factory=lambda: LECTURAS_VACIO)
+    # Etapas 4 y 5, modo por lotes
+    lote: np.ndarray = field(default_factory=lambda: LOTE_VACIO)
+    # Persistencia (ver labvirtual.almacen)
+    sesion: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    ejecucion_guardada: str | None = None
+    # Reproducción (ver labvirtual.reproduccion): semilla y entradas en orden
+    entropia: int | None = None
+    semilla_con_carne: bool = False
+    eventos: list = field(default_factory=list)
+
+    @property
+    def patrones_medidos(self):
+        """True si todos los patrones tienen absorbancia"""
+        return self.patrones.size > 0 and not np.isnan(self.patrones["absorbancia"]).any()
+
+    def fijar(self, **valores):
+        """Asigna entradas de las etapas y registra las que cambiaron"""
+        cambios = {campo: valor for campo, valor in valores.items() if getattr(self, campo) != valor}
+        if cambios:
+            for campo, valor in cambios.items():
+                setattr(self, campo, valor)
+            self.eventos.append(("fijar", cambios))
+
+    def _derivar_entropia(self, estudiante):
+        clave = f"{estudiante or ''}\0{self.sesion}".encode()
+        return int.from_bytes(hashlib.blake2b(clave, digest_size=16).digest(), "big")
+
+    def fijar_semilla(self, estudiante=None):
+        """
+        Fija la semilla de la sesión a partir del carné
+
+        La entropía mezcla el carné con el identificador de la sesión: dos
+        prácticas del mismo estudiante tienen ruido distinto, pero cada una
+        se puede repetir exactamente. Si hubo sorteos antes de conocer el
+        carné, la semilla se deriva de nuevo la primera vez que llega uno y
+        el cambio queda como evento ``("semilla", {"estudiante": ...})``;
+        los eventos anteriores conservan su ruido.
+        """
+        if self.entropia is None:
+            self.entropia = self._derivar_entropia(estudiante)
+            self.semilla_con_carne = bool(estudiante)
+        elif estudiante and not self.semilla_con_carne:
+            self.entropia = self._derivar_entropia(estudiante)
+            self.semilla_con_carne = True
+            self.eventos.append(("semilla", {"estudiante": estudiante}))
+        return self.entropia
+
+    @property
+    def entropia_inicial(self):
+        """Entropía con la que empezó la sesión, antes de un evento ``semilla``"""
+        if any(nombre == "semilla" for nombre, _ in self.eventos):
+            return self._derivar_entropia(None)
+        return self.fijar_semilla()
+
+    def generador(self, flujo=0):
+        """
+        ``Generator`` propio de la sesión para el próximo evento
+
+        Cada evento (y cada ``flujo`` dentro de él) recibe un hijo distinto
+        de ``SeedSequence(entropia)``, sin estado global compartido entre
+        sesiones.
+        """
+        semilla = np.random.SeedSequence(self.fijar_semilla(), spawn_key=(len(self.eventos), flujo))
+        return np.random.default_rng(semilla)
+
+    def fijar_patrones(self, alicuotas, volumenes, concentraciones):
+        """
+        Registra los patrones de la Etapa 2
+
+        Si coinciden con los ya registrados se conservan sus absorbancias;
+        si cambian, las mediciones anteriores dejan de ser válidas.
+        """
+        nuevos = crear_patrones(alicuotas, volumenes, concentraciones)
+        actuales = self.patrones
+        if (actuales.size == nuevos.size
+                and np.array_equal(actuales["alicuota"], nuevos["alicuota"])
+                and np.array_equal(actuales["volumen"], nuevos["volumen"])
+                and np.array_equal(actuales["concentracion"], nuevos["concentracion"])):
+            return
+        self.patrones = nuevos
+        self.lecturas = self.lecturas[self.lecturas["corrida"] != CORRIDAS.index("patrones")]
+        self.eventos.append(("patrones", {
+            "alicuotas": nuevos["alicuota"].tolist(),
+            "volumenes": nuevos["volumen"].tolist(),
+            "concentraciones": nuevos["concentracion"].tolist(),
+        }))
+
+    def registrar_absorbancias(self, absorbancias):
+        """Guarda las lecturas de la Etapa 4 (una por patrón)"""
+        self.patrones["absorbancia"] = absorbancias
+
+    @property
+    def lote_medido(self):
+        """True si hay un lote con todas sus absorbancias"""
+        return self.lote.size > 0 and not np.isnan(self.lote["absorbancia"]).any()
+
+    def fijar_lote(self, filas, alicuotas, volumenes, concentraciones_fe):
+        """
+        Registra los vinos del lote con sus diluciones (absorbancias sin medir)
+
+        ``filas`` son los índices de los vinos en el catálogo y
+        ``concentraciones_fe`` son las concentraciones reales de cada vino,
+        con las que el simulador calcula la concentración diluida.
+        """
+        lote = np.empty(len(filas), dtype=DTYPE_LOTE)
+        lote["vino"] = filas
+        lote["alicuota"] = alicuotas
+        lote["volumen"] = volumenes
+        lote["fd"] = calcular_fd_muestra(lote["alicuota"], lote["volumen"])
+        lote["concentracion_diluida"] = np.asarray(concentraciones_fe, dtype=float) / lote["fd"]
+        lote["absorbancia"] = np.nan
+        self.lote = lote
+        self.lecturas = self.lecturas[self.lecturas["corrida"] != CORRIDAS.index("lote")]
+
+    def registrar_absorbancias_lote(self, absorbancias):
+        """Guarda las lecturas del lote (una por vino)"""
+        self.lote["absorbancia"] = absorbancias
+
+    def registrar_lecturas(self, corrida, tipos, concentraciones, lecturas):
+        """
+        Guarda todas las réplicas de una secuencia de la Etapa 4
+
+        ``lecturas`` tiene forma (posiciones, réplicas); reemplaza las
+        lecturas anteriores de la misma ``corrida``.
+        """
+        lecturas = np.asarray(lecturas, dtype=float)
+        n_pos, n_rep = lecturas.shape
+        codigo = CORRIDAS.index(corrida)
+        nuevas = np.empty(n_pos * n_rep, dtype=DTYPE_LECTURA)
+        nuevas["corrida"] = codigo
+        nuevas["posicion"] = np.repeat(np.arange(n_pos), n_rep)
+        nuevas["tipo"] = np.repeat([TIPOS.index(t) for t in tipos], n_rep)
+        nuevas["concentracion"] = np.repeat(concentraciones, n_rep)
+        nuevas["replica"] = np.tile(np.arange(1, n_rep + 1), n_pos)
+        nuevas["absorbancia"] = lecturas.ravel()
+        self.lecturas = np.concatenate([self.lecturas[self.lecturas["corrida"] != codigo], nuevas])
+
+    def replicas(self, corrida):
+        """
+        Réplicas promediadas en cada absorbancia de ``corrida``
+
+        1 si la corrida no tiene lecturas guardadas (absorbancia única).
+        """
+        replicas = self.lecturas["replica"][self.lecturas["corrida"] == CORRIDAS.index(corrida)]
+        return int(replicas.max()) if replicas.size else 1
+
+    def tamano_bytes(self):
+        """Memoria ocupada por el estado, incluyendo el arreglo y las cadenas"""
+        # sys.getsizeof de un ndarray dueño de sus datos ya incluye nbytes
+        total = sys.getsizeof(self) + sys.getsizeof(self.eventos)
+        for arreglo in (self.patrones, self.lecturas, self.lote):
+            if not any(arreglo is vacio for vacio in _VACIOS):  # los vacíos son compartidos
+                total += sys.getsizeof(arreglo)
+        for campo in fields(self):
+            valor = getattr(self, campo.name)
+            if isinstance(valor, (float, int, str)) and not isinstance(valor, bool):
+                total += sys.getsizeof(valor)
+        if self.muestra is not None:
+            total += sys.getsizeof(self.muestra) + sys.getsizeof(self.muestra.vino)
+        return total
@@ -0,0 +1,162 @@
+"""
+Exportación de la sesión completa en formato columnar.
+
+Cada sesión es un registro con los datos de la Etapa 1, la muestra, el
+ajuste de la curva y tres listas anidadas: ``patrones`` (una fila por
+patrón), ``lote`` (una fila por vino del modo por lotes) y ``lecturas``
+(una fila por réplica de la Etapa 4). Todos los valores conservan su
+tipo (números como números, NaN como nulo).
+
+Se escribe como Parquet (un archivo con una fila por sesión y un esquema
+fijo, de modo que miles de exportaciones se leen juntas con
+``pyarrow.parquet.read_table``) o como JSON con la misma estructura.
+pyarrow se importa solo al escribir Parquet.
+"""
+
+import functools
+import io
+import json
+import math
+import time
+
+import numpy as np
+
+from labvirtual.catalogo import obtener_catalogo
+from labvirtual.estado import CORRIDAS, DTYPE_LECTURA, DTYPE_LOTE, DTYPE_PATRON
+from labvirtual.instrumento import TIPOS
+
+VERSION_EXPORTACION = 2
+
+# Columnas escalares del registro, en orden, con su tipo de Arrow
+COLUMNAS_SESION = (
+    ("version", "int16"),
+    ("sesion", "string"),
+    ("estudiante", "string"),
+    ("marca_tiempo", "float64"),
+    ("masa_sal_mohr", "float64"),
+    ("volumen_aforo_patron", "int32"),
+    ("conc_patron_madre", "float64"),
+    ("vino", "string"),
+    ("alicuota_vino", "float64"),
+    ("volumen_aforo_muestra", "int32"),
+    ("conc_muestra_diluida", "float64"),
+    ("absorbancia_muestra", "float64"),
+    ("pendiente", "float64"),
+    ("intercepto", "float64"),
+    ("r2", "float64"),
+    ("s_yx", "float64"),
+    ("s_pendiente", "float64"),
+    ("s_intercepto", "float64"),
+    ("lod", "float64"),
+    ("loq", "float64"),
+    ("conc_calculada", "float64"),
+    ("conc_real", "float64"),
+    ("error_relativo", "float64"),
+)
+
+
+def _valor(v):
+    """Escalar de NumPy a tipo nativo; NaN pasa a None"""
+    if v is None:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    return v
+
+
+# Campos guardados como códigos enteros: se exportan con su etiqueta
+ETIQUETAS_LECTURA = {"corrida": CORRIDAS.__getitem__, "tipo": TIPOS.__getitem__}
+ETIQUETAS_LOTE = {"vino": lambda fila: obtener_catalogo().nombre(fila)}
+
+
+def _filas(arreglo, etiquetas=None):
+    """Arreglo estructurado -> lista de diccionarios con tipos nativos"""
+    nombres = arreglo.dtype.names
+    filas = [{n: _valor(v) for n, v in zip(nombres, fila)} for fila in arreglo.tolist()]
+    for campo, etiqueta in (etiquetas or {}).items():
+        for fila in filas:
+            fila[campo] = etiqueta(fila[campo])
+    return filas
+
+
+def registro_sesion(lab, curva=None, conc_calculada=None, conc_real=None,
+                    error_relativo=None, estudiante=None):
+    """
+    Registro de la sesión a partir de ``EstadoLaboratorio``
+
+    ``curva`` y los resultados son opcionales: una sesión sin terminar se
+    exporta con esos campos en None.
+    """
+    muestra = lab.muestra
+    registro = {
+        "version": VERSION_EXPORTACION,
+        "sesion": lab.sesion,
+        "estudiante": estudiante,
+        "marca_tiempo": time.time(),
+        "masa_sal_mohr": lab.masa_sal_mohr,
+        "volumen_aforo_patron": lab.volumen_aforo_patron,
+        "conc_patron_madre": lab.conc_patron_madre,
+        "vino": muestra.vino if muestra is not None else lab.vino_seleccionado,
+        "alicuota_vino": lab.alicuota_vino,
+        "volumen_aforo_muestra": lab.volumen_aforo_muestra,
+        "conc_muestra_diluida": (muestra.concentracion_diluida if muestra is not None
+                                 else lab.conc_muestra_diluida),
+        "absorbancia_muestra": muestra.absorbancia if muestra is not None else None,
+        "conc_calculada": conc_calculada,
+        "conc_real": conc_real,
+        "error_relativo": error_relativo,
+    }
+    for nombre in ("pendiente", "intercepto", "r2", "s_yx", "s_pendiente", "s_intercepto", "lod", "loq"):
+        registro[nombre] = getattr(curva, nombre) if curva is not None else None
+    registro = {nombre: _valor(registro[nombre]) for nombre, _ in COLUMNAS_SESION}
+    registro["patrones"] = _filas(lab.patrones)
+    registro["lote"] = _filas(lab.lote, ETIQUETAS_LOTE)
+    registro["lecturas"] = _filas(lab.lecturas, ETIQUETAS_LECTURA)
+    return registro
+
+
+# ============================================================================
+# FORMATOS
+# ============================================================================
+
+def a_json(registro):
+    return json.dumps(registro, ensure_ascii=False, indent=2)
+
+
+def _tipo_arrow(pa, dtype):
+    if dtype.kind == "U":
+        return pa.string()
+    return pa.from_numpy_dtype(dtype)
+
+
+@functools.cache
+def esquema_arrow():
+    """Esquema fijo de la exportación (igual para todas las sesiones)"""
+    import pyarrow as pa
+
+    def lista(dtype, etiquetas=()):
+        return pa.list_(pa.struct([(n, pa.string() if n in etiquetas else _tipo_arrow(pa, dtype[n]))
+                                   for n in dtype.names]))
+
+    campos = [(nombre, pa.type_for_alias(tipo)) for nombre, tipo in COLUMNAS_SESION]
+    campos += [("patrones", lista(DTYPE_PATRON)), ("lote", lista(DTYPE_LOTE, ETIQUETAS_LOTE)),
+               ("lecturas", lista(DTYPE_LECTURA, ETIQUETAS_LECTURA))]
+    return pa.schema(campos, metadata={"version_exportacion": str(VERSION_EXPORTACION)})
+
+
+def tabla_arrow(registros):
+    """Tabla de Arrow con una fila por sesión"""
+    import pyarrow as pa
+
+    return pa.Table.from_pylist(list(registros), schema=esquema_arrow())
+
+
+def a_parquet(registros):
+    """Bytes de un archivo Parquet con una fila por sesión"""
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    pq.write_table(tabla_arrow(registros), buffer, compression="zstd")
+    return buffer.getvalue()
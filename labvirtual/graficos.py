@@ -0,0 +1,203 @@
+"""
+Construcción de figuras de Plotly para las páginas de la práctica.
+
+Este módulo no se re-exporta desde ``labvirtual`` para que importar el
+núcleo de cálculo no cargue Plotly.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from labvirtual.analitica import (
+    ANCHO_ERROR,
+    ANCHO_MASA,
+    ETIQUETAS_R2,
+    N_CLASES_MASA,
+    cuantiles_histograma,
+)
+from labvirtual.cache import CACHE_FIGURAS, clave_arreglos
+from labvirtual.calculos import RANGO_OPTIMO
+from labvirtual.metricas import instrumentar
+
+PUNTOS_RECTA = 100
+
+
+@instrumentar
+def figura_resultados(x, y, curva, muestra=None):
+    """
+    Curva de calibración con la recta de nuestro propio ajuste
+
+    La usan tanto la Etapa 4 (sin muestra) como la Etapa 5, de modo que
+    ambas páginas comparten el ajuste y la figura cacheados.
+    muestra: tupla opcional (concentración diluida, absorbancia)
+    """
+    fig = go.Figure()
+
+    # Puntos experimentales
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=y,
+        mode='markers',
+        name='Patrones',
+        marker=dict(size=10, color='red')
+    ))
+
+    # Línea de regresión
+    x_line = np.linspace(np.min(x), np.max(x), PUNTOS_RECTA)
+
+    fig.add_trace(go.Scatter(
+        x=x_line,
+        y=curva.evaluar(x_line),
+        mode='lines',
+        name='Regresión lineal',
+        line=dict(color='blue', dash='dash')
+    ))
+
+    # Muestra (si existe)
+    if muestra is not None:
+        conc_muestra, abs_muestra = muestra
+        fig.add_trace(go.Scatter(
+            x=[conc_muestra],
+            y=[abs_muestra],
+            mode='markers',
+            name='Muestra',
+            marker=dict(size=15, color='green', symbol='star')
+        ))
+
+    fig.update_layout(
+        title='Curva de Calibración para Fe por AA',
+        xaxis_title='Concentración (mg/L)',
+        yaxis_title='Absorbancia',
+        hovermode='closest'
+    )
+    return fig
+
+
+# ============================================================================
+# FIGURAS CACHEADAS
+# ============================================================================
+
+@instrumentar
+def figura_resultados_cacheada(x, y, curva, muestra=None):
+    """``figura_resultados`` compartida entre sesiones con los mismos datos"""
+    return CACHE_FIGURAS.obtener_o_calcular(
+        clave_arreglos(x, y, extra=muestra),
+        lambda: figura_resultados(x, y, curva, muestra),
+    )
+
+
+@instrumentar
+def figura_lote(x, y, curva, resultado):
+    """Curva de calibración con todos los vinos de un lote (``ResultadoLote``)"""
+    fig = figura_resultados(x, y, curva)
+    fig.add_trace(go.Scatter(
+        x=resultado.conc_diluida,
+        y=resultado.absorbancias,
+        mode='markers+text',
+        name='Muestras del lote',
+        text=list(resultado.vinos),
+        textposition='top center',
+        customdata=np.column_stack([resultado.fd, resultado.conc_calculada]),
+        hovertemplate=('%{text}<br>A = %{y:.4f}<br>C diluida = %{x:.3f} mg/L'
+                       '<br>FD = %{customdata[0]:.2f}<br>C vino = %{customdata[1]:.2f} mg/L'
+                       '<extra></extra>'),
+        marker=dict(size=13, color=np.where(resultado.en_rango, 'green', 'orange'), symbol='star')
+    ))
+    fig.update_layout(title='Curva de Calibración y Muestras del Lote')
+    return fig
+
+
+@instrumentar
+def figura_lote_cacheada(x, y, curva, resultado):
+    """``figura_lote`` compartida entre sesiones con los mismos datos"""
+    return CACHE_FIGURAS.obtener_o_calcular(
+        clave_arreglos(x, y, resultado.absorbancias, resultado.fd, extra=("lote", tuple(resultado.vinos))),
+        lambda: figura_lote(x, y, curva, resultado),
+    )
+
+
+# ============================================================================
+# PANEL DEL PROFESOR
+# ============================================================================
+
+def figura_error_por_vino(agregados):
+    """Cajas de error relativo por vino, a partir de los histogramas agregados"""
+    vinos = sorted(agregados.hist_error)
+    cuantiles = np.array([
+        cuantiles_histograma(agregados.hist_error[v], ANCHO_ERROR, [0.05, 0.25, 0.5, 0.75, 0.95])
+        for v in vinos
+    ]).reshape(-1, 5)
+    fig = go.Figure(go.Box(
+        x=vinos,
+        lowerfence=cuantiles[:, 0],
+        q1=cuantiles[:, 1],
+        median=cuantiles[:, 2],
+        q3=cuantiles[:, 3],
+        upperfence=cuantiles[:, 4],
+        mean=[agregados.por_vino[v]["media_error"] for v in vinos],
+        marker_color='#DC143C',
+        name='Error relativo',
+    ))
+    fig.update_layout(
+        title='Error relativo por vino (bigotes: percentiles 5 y 95)',
+        yaxis_title='Error relativo (%)',
+    )
+    return fig
+
+
+def figura_histograma_r2(agregados):
+    fig = go.Figure(go.Bar(x=ETIQUETAS_R2, y=agregados.hist_r2, marker_color='#8B0000'))
+    fig.update_layout(title='R² de las curvas de calibración', xaxis_title='R²',
+                      yaxis_title='Prácticas')
+    return fig
+
+
+def figura_diluciones(agregados):
+    """Porcentaje de muestras diluidas fuera del rango óptimo, por vino"""
+    vinos = sorted(agregados.por_vino)
+    n = np.array([agregados.por_vino[v]["n"] for v in vinos])
+    fig = go.Figure()
+    for clave, nombre, color in (("dilucion_baja", "< 1 mg/L (excesiva)", '#1f77b4'),
+                                 ("dilucion_alta", "> 5 mg/L (insuficiente)", '#DC143C')):
+        conteos = np.array([agregados.por_vino[v][clave] for v in vinos])
+        fig.add_trace(go.Bar(x=vinos, y=100 * conteos / n, name=nombre, marker_color=color))
+    fig.update_layout(barmode='stack', title='Diluciones fuera del rango óptimo',
+                      yaxis_title='% de prácticas')
+    return fig
+
+
+def figura_etapa1(agregados):
+    """Mapa de calor de masa pesada vs. balón elegido en la Etapa 1"""
+    volumenes = sorted(agregados.etapa1)
+    centros = (np.arange(N_CLASES_MASA) + 0.5) * ANCHO_MASA
+    fig = go.Figure(go.Heatmap(
+        x=centros,
+        y=[f"{v} mL" for v in volumenes],
+        z=np.array([agregados.etapa1[v] for v in volumenes]).reshape(len(volumenes), N_CLASES_MASA),
+        colorscale='Reds',
+        colorbar=dict(title='Prácticas'),
+    ))
+    fig.update_layout(title='Etapa 1: masa de sal de Mohr y balón de aforo',
+                      xaxis_title='Masa (g)', yaxis_title='Balón')
+    return fig
+
+
+def figura_dispersion(puntos):
+    """
+    Error relativo vs. concentración diluida con WebGL
+
+    puntos: diccionario de columnas, ya submuestreado por el almacén
+    """
+    vinos = np.asarray(puntos["vino"])
+    x = np.asarray(puntos["conc_muestra_diluida"], dtype=float)
+    y = np.asarray(puntos["error_relativo"], dtype=float)
+    fig = go.Figure()
+    for vino in np.unique(vinos):
+        seleccion = vinos == vino
+        fig.add_trace(go.Scattergl(x=x[seleccion], y=y[seleccion], mode='markers', name=str(vino),
+                                   marker=dict(size=4, opacity=0.5)))
+    fig.add_vrect(x0=RANGO_OPTIMO[0], x1=RANGO_OPTIMO[1], fillcolor='green', opacity=0.08,
+                  line_width=0)
+    fig.update_layout(title='Error relativo según la concentración de la dilución',
+                      xaxis_title='Concentración diluida (mg/L)', yaxis_title='Error relativo (%)')
+    return fig
@@ -0,0 +1,184 @@
+"""
+Propagación de incertidumbre por Monte Carlo sobre toda la cadena analítica.
+
+Cada simulación repite la práctica completa con valores "reales" sorteados
+alrededor de los nominales: masa de Sal de Mohr (incertidumbre de la
+balanza), volúmenes de balones y pipetas (tolerancias Clase A, distribución
+rectangular) y ruido del instrumento. El estudiante calcula siempre con los
+valores nominales, igual que en ``mostrar_resultados``, por lo que la
+dispersión del resultado final refleja la del procedimiento.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from labvirtual.calculos import (
+    ajustar_recta,
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    calcular_fd_muestra,
+    verificar_rango_optimo,
+)
+from labvirtual.metricas import instrumentar
+from labvirtual.simulacion import obtener_rng, simular_absorbancias
+
+# ============================================================================
+# TOLERANCIAS CLASE A (mL)
+# ============================================================================
+
+# Balones aforados (ASTM E288)
+TOLERANCIAS_BALON = {
+    10: 0.02,
+    25: 0.03,
+    50: 0.05,
+    100: 0.08,
+    250: 0.12,
+    500: 0.20,
+    1000: 0.30,
+}
+
+# Pipetas volumétricas (ASTM E969); por debajo de 0.5 mL, micropipeta
+TOLERANCIAS_PIPETA = {
+    0.1: 0.0008,
+    0.5: 0.006,
+    1: 0.006,
+    2: 0.006,
+    5: 0.01,
+    10: 0.02,
+    25: 0.03,
+    50: 0.05,
+}
+
+U_BALANZA = 0.0001  # g, desviación estándar de la balanza analítica
+
+TAMANO_BLOQUE = 131072  # simulaciones por bloque, acota la memoria
+
+
+def _interpolar_tolerancia(tabla, volumen):
+    nominales = np.array(sorted(tabla), dtype=float)
+    tolerancias = np.array([tabla[v] for v in sorted(tabla)], dtype=float)
+    return np.interp(np.asarray(volumen, dtype=float), nominales, tolerancias)
+
+
+def tolerancia_balon(volumen):
+    """Tolerancia Clase A de un balón aforado (interpolada entre tamaños)"""
+    return _interpolar_tolerancia(TOLERANCIAS_BALON, volumen)
+
+
+def tolerancia_pipeta(volumen):
+    """Tolerancia Clase A de una pipeta (interpolada entre tamaños)"""
+    return _interpolar_tolerancia(TOLERANCIAS_PIPETA, volumen)
+
+
+# ============================================================================
+# RESULTADO
+# ============================================================================
+
+@dataclass
+class ResultadoMonteCarlo:
+    """Distribución simulada de la concentración en el vino original"""
+    muestras: np.ndarray
+    valor_nominal: float
+    cobertura: float
+
+    @property
+    def media(self):
+        return float(np.mean(self.muestras))
+
+    @property
+    def desviacion(self):
+        return float(np.std(self.muestras, ddof=1))
+
+    @property
+    def intervalo(self):
+        """Intervalo de cobertura por percentiles (simétrico en probabilidad)"""
+        alfa = (1 - self.cobertura) / 2
+        inferior, superior = np.quantile(self.muestras, [alfa, 1 - alfa])
+        return float(inferior), float(superior)
+
+
+# ============================================================================
+# SIMULACIÓN
+# ============================================================================
+
+def _rectangular(rng, nominal, tolerancia, tamano):
+    return nominal + tolerancia * rng.uniform(-1.0, 1.0, size=tamano)
+
+
+@instrumentar
+def propagar_incertidumbre(
+    masa_sal,
+    volumen_madre,
+    alicuotas_patrones,
+    volumenes_patrones,
+    concentracion_vino,
+    alicuota_vino,
+    volumen_aforo_muestra,
+    n_simulaciones=100_000,
+    u_balanza=U_BALANZA,
+    cobertura=0.95,
+    rng=None,
+):
+    """
+    Propaga la incertidumbre de la cadena patrón madre → curva → muestra
+
+    Los argumentos nominales son los que registra el estudiante en las
+    Etapas 1 a 3; ``concentracion_vino`` es el valor real del vino.
+    Devuelve un ``ResultadoMonteCarlo`` con ``n_simulaciones`` valores de
+    ``conc_vino_original``.
+    """
+    rng = obtener_rng(rng)
+
+    alicuotas_patrones = np.asarray(alicuotas_patrones, dtype=float)
+    volumenes_patrones = np.asarray(volumenes_patrones, dtype=float)
+    n_patrones = alicuotas_patrones.size
+
+    # Valores nominales, tal como los calcula el estudiante
+    conc_madre_nominal = calcular_concentracion_patron_madre(masa_sal, volumen_madre)
+    conc_patrones_nominal = calcular_concentracion_patron(
+        conc_madre_nominal, alicuotas_patrones, volumenes_patrones
+    )
+    fd_nominal = calcular_fd_muestra(alicuota_vino, volumen_aforo_muestra)
+    patrones_lineales = bool(np.all(verificar_rango_optimo(conc_patrones_nominal)))
+    muestra_lineal = verificar_rango_optimo(concentracion_vino / fd_nominal)
+
+    tol_madre = tolerancia_balon(volumen_madre)
+    tol_alicuotas = tolerancia_pipeta(alicuotas_patrones)
+    tol_aforos = tolerancia_balon(volumenes_patrones)
+    tol_alicuota_vino = tolerancia_pipeta(alicuota_vino)
+    tol_aforo_vino = tolerancia_balon(volumen_aforo_muestra)
+
+    resultados = np.empty(n_simulaciones)
+
+    for inicio in range(0, n_simulaciones, TAMANO_BLOQUE):
+        n = min(TAMANO_BLOQUE, n_simulaciones - inicio)
+
+        # Etapa 1: patrón madre real
+        masa = masa_sal + u_balanza * rng.standard_normal(n)
+        vol_madre = _rectangular(rng, volumen_madre, tol_madre, n)
+        conc_madre = calcular_concentracion_patron_madre(masa, vol_madre)
+
+        # Etapa 2: concentraciones reales de los patrones
+        alicuotas = _rectangular(rng, alicuotas_patrones, tol_alicuotas, (n, n_patrones))
+        aforos = _rectangular(rng, volumenes_patrones, tol_aforos, (n, n_patrones))
+        conc_patrones = calcular_concentracion_patron(conc_madre[:, np.newaxis], alicuotas, aforos)
+
+        # Etapa 3: dilución real de la muestra
+        alicuota = _rectangular(rng, alicuota_vino, tol_alicuota_vino, n)
+        aforo = _rectangular(rng, volumen_aforo_muestra, tol_aforo_vino, n)
+        conc_diluida = concentracion_vino / calcular_fd_muestra(alicuota, aforo)
+
+        # Etapa 4: lecturas del instrumento
+        abs_patrones = simular_absorbancias(conc_patrones, 1, patrones_lineales, rng)[..., 0]
+        abs_muestra = simular_absorbancias(conc_diluida, 1, muestra_lineal, rng)[..., 0]
+
+        # Etapa 5: el estudiante ajusta contra las concentraciones nominales
+        pendiente, intercepto, _ = ajustar_recta(conc_patrones_nominal, abs_patrones)
+        resultados[inicio:inicio + n] = (abs_muestra - intercepto) / pendiente * fd_nominal
+
+    return ResultadoMonteCarlo(
+        muestras=resultados,
+        valor_nominal=float(concentracion_vino),
+        cobertura=cobertura,
+    )
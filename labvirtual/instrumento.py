@@ -0,0 +1,302 @@
+"""
+Modelo del espectrómetro de absorción atómica con resolución temporal.
+
+Cada aspiración produce una traza: subida exponencial mientras la solución
+llega a la llama, una meseta donde se integran las réplicas y el lavado
+al aspirar agua. Sobre todas las posiciones de una secuencia se suma una
+línea base que deriva (pendiente lineal más un paseo aleatorio). El
+instrumento se autocera con el blanco al inicio de la secuencia, de modo
+que la deriva acumulada aparece como error en las últimas posiciones; el
+patrón de control al final permite detectarla.
+
+Toda la secuencia (blanco, patrones, muestra, control) se simula con
+arreglos de forma (sesiones × posiciones × puntos), de modo que cientos
+de sesiones cuestan una sola llamada vectorizada.
+
+``SenalEnVivo`` reproduce una corrida ya simulada en bloques, como si los
+puntos llegaran del detector, y resume la señal en una envolvente de
+tamaño fijo para graficarla.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from labvirtual.calculos import K_ABSORCION
+from labvirtual.metricas import instrumentar
+from labvirtual.simulacion import (
+    CENTRO_NO_LINEAL,
+    COEF_NO_LINEAL,
+    SIGMA_LINEAL,
+    SIGMA_NO_LINEAL,
+    obtener_rng,
+)
+
+BLANCO = "Blanco"
+PATRON = "Patrón"
+MUESTRA = "Muestra"
+CONTROL = "Control"
+TIPOS = (BLANCO, PATRON, MUESTRA, CONTROL)  # el índice es el código guardado en cada lectura
+
+LIMITE_RSD = 1e-3  # UA; por debajo la RSD no tiene sentido (blanco)
+N_REPLICAS = 3     # lecturas por aspiración; la absorbancia informada es su promedio
+
+
+@dataclass(frozen=True)
+class ModeloEspectrometro:
+    """Parámetros del instrumento (tiempos en s, absorbancias en UA)"""
+    k_absorcion: float = K_ABSORCION
+    frecuencia: float = 10.0          # Hz, puntos por segundo de la traza
+    tiempo_subida: float = 2.0        # s antes de la primera lectura
+    tau_subida: float = 0.4           # s, constante de la subida
+    tiempo_lectura: float = 1.0       # s integrados por réplica
+    tiempo_lavado: float = 3.0        # s de lavado con agua
+    tau_lavado: float = 0.6           # s, constante del lavado
+    deriva: float = 1e-3              # UA por minuto
+    paseo_linea_base: float = 1e-4    # UA por posición (paseo aleatorio)
+    rsd_llama: float = 0.004          # ruido proporcional (parpadeo de la llama)
+    sigma_lineal: float = SIGMA_LINEAL
+    sigma_no_lineal: float = SIGMA_NO_LINEAL
+
+    def puntos(self, segundos):
+        return int(round(segundos * self.frecuencia))
+
+
+MODELO_DEFECTO = ModeloEspectrometro()
+
+
+@dataclass
+class CorridaAA:
+    """Resultado de simular una secuencia completa"""
+    tipos: list                 # tipo de cada posición (BLANCO, PATRON, ...)
+    concentraciones: np.ndarray  # (..., posiciones) en mg/L
+    tiempos: np.ndarray         # (puntos,) segundos desde el inicio de la aspiración
+    trazas: np.ndarray          # (..., posiciones, puntos), ya autoceradas
+    lecturas: np.ndarray        # (..., posiciones, réplicas)
+    ventanas: list = field(default_factory=list)  # (inicio, fin) de cada réplica en la traza
+
+    @property
+    def duracion_posicion(self):
+        """Segundos que ocupa cada aspiración en la secuencia"""
+        return self.tiempos.size * (self.tiempos[1] - self.tiempos[0])
+
+    @property
+    def media(self):
+        return self.lecturas.mean(axis=-1)
+
+    @property
+    def desviacion(self):
+        n = self.lecturas.shape[-1]
+        return self.lecturas.std(axis=-1, ddof=1) if n > 1 else np.zeros(self.lecturas.shape[:-1])
+
+    @property
+    def rsd(self):
+        """Desviación estándar relativa de las réplicas (%); NaN cerca de cero"""
+        media = self.media
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(np.abs(media) > LIMITE_RSD, 100 * self.desviacion / np.abs(media), np.nan)
+
+    def seleccionar(self, tipo):
+        """Índices de las posiciones de un tipo"""
+        return np.array([i for i, t in enumerate(self.tipos) if t == tipo], dtype=int)
+
+
+def secuencia(concentraciones_patrones, conc_muestra=None, control=True, conc_control=None):
+    """
+    Orden de aspiración: blanco, patrones, muestra y patrón de control
+
+    Devuelve (tipos, concentraciones). El control por defecto es el patrón
+    central de la curva.
+    """
+    patrones = np.asarray(concentraciones_patrones, dtype=float)
+    tipos = [BLANCO] + [PATRON] * patrones.shape[-1]
+    partes = [np.zeros(patrones.shape[:-1] + (1,)), patrones]
+    if conc_muestra is not None:
+        tipos.append(MUESTRA)
+        partes.append(np.broadcast_to(np.asarray(conc_muestra, dtype=float)[..., None],
+                                      patrones.shape[:-1] + (1,)))
+    if control and patrones.shape[-1] > 0:
+        if conc_control is None:
+            conc_control = np.sort(patrones, axis=-1)[..., patrones.shape[-1] // 2]
+        tipos.append(CONTROL)
+        partes.append(np.broadcast_to(np.asarray(conc_control, dtype=float)[..., None],
+                                      patrones.shape[:-1] + (1,)))
+    return tipos, np.concatenate(partes, axis=-1)
+
+
+@instrumentar
+def simular_corrida(tipos, concentraciones, curva_lineal=True, n_replicas=N_REPLICAS,
+                    modelo=MODELO_DEFECTO, rng=None):
+    """
+    Simula las trazas y lecturas de una secuencia de aspiraciones
+
+    tipos: lista con el tipo de cada posición (ver ``secuencia``)
+    concentraciones: (..., posiciones); las dimensiones iniciales son
+        sesiones independientes simuladas a la vez
+    curva_lineal: bool o arreglo (..., posiciones); si es False se aplica
+        la desviación no lineal de ``labvirtual.simulacion``
+    """
+    rng = obtener_rng(rng)
+    conc = np.asarray(concentraciones, dtype=float)
+    lineal = np.broadcast_to(np.asarray(curva_lineal, dtype=bool), conc.shape)
+    forma = conc.shape
+    n_pos = forma[-1]
+
+    # Eje temporal de una aspiración
+    n_subida = modelo.puntos(modelo.tiempo_subida)
+    n_lectura = modelo.puntos(modelo.tiempo_lectura)
+    n_meseta = n_lectura * n_replicas
+    n_lavado = modelo.puntos(modelo.tiempo_lavado)
+    n_total = n_subida + n_meseta + n_lavado
+    tiempos = np.arange(n_total) / modelo.frecuencia
+
+    t_aspiracion = tiempos[n_subida + n_meseta]
+    envolvente = np.where(
+        tiempos < t_aspiracion,
+        1.0 - np.exp(-tiempos / modelo.tau_subida),
+        (1.0 - np.exp(-t_aspiracion / modelo.tau_subida))
+        * np.exp(-(tiempos - t_aspiracion) / modelo.tau_lavado),
+    )
+
+    # Señal estacionaria de cada posición
+    estacionaria = modelo.k_absorcion * conc + np.where(
+        lineal, 0.0, COEF_NO_LINEAL * (conc - CENTRO_NO_LINEAL) ** 2)
+    estacionaria = np.where(conc > 0, estacionaria, 0.0)
+    sigma = np.where(lineal, modelo.sigma_lineal, modelo.sigma_no_lineal)
+
+    # Línea base: deriva lineal en el tiempo de la secuencia + paseo aleatorio por posición
+    duracion = n_total / modelo.frecuencia
+    t_global = np.arange(n_pos)[:, None] * duracion + tiempos[None, :]
+    paseo = np.cumsum(rng.standard_normal(forma) * modelo.paseo_linea_base, axis=-1)
+    linea_base = modelo.deriva / 60.0 * t_global + paseo[..., None]
+
+    # Ruido por punto, escalado para que una réplica tenga la sigma del modelo
+    ruido = rng.standard_normal(forma + (n_total,)) * (sigma * np.sqrt(n_lectura))[..., None]
+    parpadeo = rng.standard_normal(forma + (n_total,)) * (modelo.rsd_llama * estacionaria)[..., None]
+    trazas = (estacionaria[..., None] + parpadeo) * envolvente + linea_base + ruido
+
+    # Autocero con la meseta del blanco (primera posición)
+    inicio_meseta = n_subida
+    cero = trazas[..., :1, inicio_meseta:inicio_meseta + n_meseta].mean(axis=-1, keepdims=True)
+    trazas = trazas - cero
+
+    ventanas = [(inicio_meseta + r * n_lectura, inicio_meseta + (r + 1) * n_lectura)
+                for r in range(n_replicas)]
+    meseta = trazas[..., inicio_meseta:inicio_meseta + n_meseta]
+    lecturas = meseta.reshape(forma + (n_replicas, n_lectura)).mean(axis=-1)
+
+    return CorridaAA(tipos=list(tipos), concentraciones=conc, tiempos=tiempos,
+                     trazas=trazas, lecturas=lecturas, ventanas=ventanas)
+
+
+# ============================================================================
+# SEÑAL EN VIVO
+# ============================================================================
+
+PUNTOS_POR_BLOQUE = 20   # puntos del detector que llegan en cada actualización
+MAX_CLASES_SENAL = 400   # clases de la envolvente que se grafica
+
+
+def bloques_senal(corrida, puntos_por_bloque=PUNTOS_POR_BLOQUE):
+    """
+    Recorre las trazas de una corrida (una sola sesión) como llegarían del detector
+
+    Produce (posicion, tiempos, valores) en bloques de ``puntos_por_bloque``;
+    los tiempos son segundos desde el inicio de la secuencia.
+    """
+    duracion = corrida.duracion_posicion
+    for posicion, traza in enumerate(corrida.trazas):
+        for inicio in range(0, traza.size, puntos_por_bloque):
+            fin = inicio + puntos_por_bloque
+            yield posicion, posicion * duracion + corrida.tiempos[inicio:fin], traza[inicio:fin]
+
+
+class EnvolventeSenal:
+    """
+    Envolvente mínimo/máximo de una señal de largo desconocido
+
+    Guarda a lo sumo ``max_clases`` clases; cuando se llenan, une las
+    clases de dos en dos y duplica su ancho. Agregar un bloque y leer la
+    serie cuestan lo mismo sin importar cuánto haya crecido la señal.
+    """
+
+    def __init__(self, max_clases=MAX_CLASES_SENAL):
+        if max_clases < 2 or max_clases % 2:
+            raise ValueError("max_clases debe ser un número par >= 2")
+        self.max_clases = max_clases
+        self.ancho = 1  # puntos por clase
+        self.n = 0
+        self.tiempos = np.empty(max_clases)
+        self.minimos = np.empty(max_clases)
+        self.maximos = np.empty(max_clases)
+        self._t_pendiente = np.empty(0)
+        self._v_pendiente = np.empty(0)
+
+    def _compactar(self):
+        mitad = self.n // 2
+        self.tiempos[:mitad] = self.tiempos[:self.n:2]
+        self.minimos[:mitad] = self.minimos[:self.n].reshape(mitad, 2).min(axis=1)
+        self.maximos[:mitad] = self.maximos[:self.n].reshape(mitad, 2).max(axis=1)
+        self.n = mitad
+        self.ancho *= 2
+
+    def agregar(self, tiempos, valores):
+        tiempos = np.concatenate([self._t_pendiente, tiempos])
+        valores = np.concatenate([self._v_pendiente, valores])
+        while valores.size >= self.ancho:
+            if self.n == self.max_clases:
+                self._compactar()
+                continue
+            k = min(valores.size // self.ancho, self.max_clases - self.n)
+            bloque = valores[:k * self.ancho].reshape(k, self.ancho)
+            self.tiempos[self.n:self.n + k] = tiempos[:k * self.ancho:self.ancho]
+            self.minimos[self.n:self.n + k] = bloque.min(axis=1)
+            self.maximos[self.n:self.n + k] = bloque.max(axis=1)
+            self.n += k
+            tiempos = tiempos[k * self.ancho:]
+            valores = valores[k * self.ancho:]
+        self._t_pendiente, self._v_pendiente = tiempos, valores
+
+    def serie(self):
+        """(tiempos, valores) para graficar: mínimo y máximo de cada clase intercalados"""
+        tiempos, minimos, maximos = self.tiempos[:self.n], self.minimos[:self.n], self.maximos[:self.n]
+        if self._v_pendiente.size:
+            tiempos = np.append(tiempos, self._t_pendiente[0])
+            minimos = np.append(minimos, self._v_pendiente.min())
+            maximos = np.append(maximos, self._v_pendiente.max())
+        if self.ancho == 1 and not self._v_pendiente.size:
+            return tiempos.copy(), minimos.copy()
+        return np.repeat(tiempos, 2), np.column_stack([minimos, maximos]).ravel()
+
+
+class SenalEnVivo:
+    """Reproduce una corrida bloque a bloque y mantiene su envolvente"""
+
+    def __init__(self, corrida, etiquetas, puntos_por_bloque=PUNTOS_POR_BLOQUE,
+                 max_clases=MAX_CLASES_SENAL):
+        self.corrida = corrida
+        self.etiquetas = list(etiquetas)
+        self.envolvente = EnvolventeSenal(max_clases)
+        self.posicion = 0
+        self.terminada = False
+        self._bloques = bloques_senal(corrida, puntos_por_bloque)
+        self._total = corrida.trazas.size
+        self._leidos = 0
+
+    @property
+    def progreso(self):
+        return self._leidos / self._total
+
+    @property
+    def etiqueta(self):
+        return self.etiquetas[self.posicion]
+
+    def avanzar(self):
+        """Lee el siguiente bloque; devuelve False si la corrida ya terminó"""
+        if self.terminada:
+            return False
+        self.posicion, tiempos, valores = next(self._bloques)
+        self.envolvente.agregar(tiempos, valores)
+        self._leidos += valores.size
+        self.terminada = self._leidos >= self._total
+        return True
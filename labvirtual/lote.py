@@ -0,0 +1,64 @@
+"""
+Medición de varias muestras contra una sola curva de calibración.
+
+En el modo por lotes cada vino tiene su propia dilución y todos se leen en
+una misma secuencia del espectrómetro. La interpolación inversa
+``(A - b) / m · FD``, su incertidumbre y el error relativo se calculan
+para todo el lote en una sola operación vectorizada.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from labvirtual.calculos import (
+    calcular_concentracion_muestra,
+    calcular_error_relativo,
+    verificar_rango_optimo,
+)
+from labvirtual.catalogo import obtener_catalogo
+from labvirtual.instrumento import N_REPLICAS
+from labvirtual.metricas import instrumentar
+
+MAX_MUESTRAS_LOTE = 12
+
+
+@dataclass(slots=True)
+class ResultadoLote:
+    """Resultados del lote, un elemento por vino"""
+    vinos: list[str]
+    fd: np.ndarray
+    absorbancias: np.ndarray
+    conc_diluida: np.ndarray     # interpolada en la curva (mg/L)
+    conc_calculada: np.ndarray   # en el vino original (mg/L)
+    incertidumbre: np.ndarray    # s_x0 · FD (mg/L)
+    conc_real: np.ndarray
+    error_relativo: np.ndarray
+    en_rango: np.ndarray         # lectura dentro del rango de la curva
+
+
+@instrumentar
+def evaluar_lote(curva, lote, conc_real, n_replicas=N_REPLICAS):
+    """
+    Concentraciones de todos los vinos de ``lote`` (arreglo ``DTYPE_LOTE``)
+
+    conc_real: concentración real de Fe de cada vino, en el orden del lote
+    n_replicas: réplicas promediadas en cada absorbancia
+        (``EstadoLaboratorio.replicas("lote")``)
+    """
+    absorbancias = lote["absorbancia"]
+    fd = lote["fd"]
+    conc_diluida = np.atleast_1d(calcular_concentracion_muestra(absorbancias, curva.pendiente, curva.intercepto))
+    conc_calculada = conc_diluida * fd
+    conc_real = np.asarray(conc_real, dtype=float)
+    return ResultadoLote(
+        vinos=obtener_catalogo().nombres(lote["vino"]),
+        fd=fd,
+        absorbancias=absorbancias,
+        conc_diluida=conc_diluida,
+        conc_calculada=conc_calculada,
+        incertidumbre=curva.incertidumbre_prediccion(absorbancias, n_replicas) * fd,
+        conc_real=conc_real,
+        error_relativo=np.atleast_1d(calcular_error_relativo(conc_calculada, conc_real)),
+        en_rango=np.atleast_1d(verificar_rango_optimo(conc_diluida)),
+    )
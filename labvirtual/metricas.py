@@ -0,0 +1,245 @@
+"""
+Instrumentación de tiempos y memoria por etapa y por cálculo.
+
+``instrumentar`` envuelve una función y registra en ``METRICAS``, por
+llamada, el tiempo de pared, el tiempo de CPU del hilo y (si el rastreo de
+memoria está activo) el pico de memoria asignada con tracemalloc. El
+registro es del proceso, así que acumula las llamadas de todas las sesiones.
+
+Los tiempos son inclusivos: una etapa incluye los cálculos que llama. El
+pico de memoria usa el contador global de tracemalloc y es aproximado
+cuando varias sesiones ejecutan a la vez.
+
+El rastreo de memoria hace más lenta toda la aplicación; se activa con la
+variable de entorno ``LABVIRTUAL_TRACEMALLOC=1`` o con
+``METRICAS.rastrear_memoria(True)``.
+"""
+
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+MUESTRAS_RECIENTES = 512  # por nombre, para los percentiles
+CUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Serie:
+    """Acumulados de un nombre instrumentado"""
+
+    __slots__ = ("tipo", "llamadas", "pared", "cpu", "pared_max", "memoria_pico", "recientes")
+
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.llamadas = 0
+        self.pared = 0.0
+        self.cpu = 0.0
+        self.pared_max = 0.0
+        self.memoria_pico = 0
+        self.recientes = deque(maxlen=MUESTRAS_RECIENTES)
+
+    def resumen(self):
+        cuantiles = np.quantile(self.recientes, CUANTILES) if self.recientes else [0.0] * len(CUANTILES)
+        return {
+            "tipo": self.tipo,
+            "llamadas": self.llamadas,
+            "pared_total_s": self.pared,
+            "cpu_total_s": self.cpu,
+            "pared_media_s": self.pared / self.llamadas if self.llamadas else 0.0,
+            "pared_max_s": self.pared_max,
+            **{f"pared_p{int(q * 100)}_s": float(v) for q, v in zip(CUANTILES, cuantiles)},
+            "memoria_pico_bytes": self.memoria_pico,
+        }
+
+
+class RegistroMetricas:
+    """Registro seguro entre hilos de las llamadas instrumentadas"""
+
+    def __init__(self, memoria=False):
+        self._series = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ultima_escritura = 0.0
+        self.rastrear_memoria(memoria)
+
+    # ------------------------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------------------------
+
+    @property
+    def memoria_activa(self):
+        return tracemalloc.is_tracing()
+
+    def rastrear_memoria(self, activar):
+        """Inicia o detiene tracemalloc para todo el proceso"""
+        if activar and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not activar and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _pila(self):
+        pila = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def medir(self, nombre, tipo="calculo"):
+        """Administrador de contexto que registra una llamada"""
+        return _Medicion(self, nombre, tipo)
+
+    def registrar(self, nombre, tipo, pared, cpu, memoria_pico=0):
+        with self._lock:
+            serie = self._series.get(nombre)
+            if serie is None:
+                serie = self._series[nombre] = _Serie(tipo)
+            serie.llamadas += 1
+            serie.pared += pared
+            serie.cpu += cpu
+            serie.pared_max = max(serie.pared_max, pared)
+            serie.memoria_pico = max(serie.memoria_pico, memoria_pico)
+            serie.recientes.append(pared)
+
+    def limpiar(self):
+        with self._lock:
+            self._series.clear()
+
+    # ------------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------------
+
+    def resumen(self, tipo=None):
+        """Diccionario nombre -> acumulados, ordenado por tiempo total"""
+        with self._lock:
+            series = [(n, s.resumen()) for n, s in self._series.items()
+                      if tipo is None or s.tipo == tipo]
+        return dict(sorted(series, key=lambda ns: -ns[1]["pared_total_s"]))
+
+    def exportar_json(self):
+        return json.dumps({
+            "generado": time.time(),
+            "memoria_activa": self.memoria_activa,
+            "metricas": self.resumen(),
+        }, indent=2, ensure_ascii=False)
+
+    def exportar_prometheus(self):
+        """Formato de texto de Prometheus (compatible con textfile collector)"""
+        lineas = []
+
+        def metrica(nombre, tipo_prom, ayuda, valores):
+            lineas.append(f"# HELP labvirtual_{nombre} {ayuda}")
+            lineas.append(f"# TYPE labvirtual_{nombre} {tipo_prom}")
+            lineas.extend(valores)
+
+        resumen = self.resumen()
+        etiquetas = {n: f'nombre="{n}",tipo="{r["tipo"]}"' for n, r in resumen.items()}
+
+        duracion = []
+        for n, r in resumen.items():
+            for q in CUANTILES:
+                duracion.append(f'labvirtual_duracion_segundos{{{etiquetas[n]},quantile="{q}"}} '
+                                f'{r[f"pared_p{int(q * 100)}_s"]:.6f}')
+            duracion.append(f"labvirtual_duracion_segundos_sum{{{etiquetas[n]}}} {r['pared_total_s']:.6f}")
+            duracion.append(f"labvirtual_duracion_segundos_count{{{etiquetas[n]}}} {r['llamadas']}")
+        metrica("duracion_segundos", "summary", "Tiempo de pared por llamada", duracion)
+
+        metrica("cpu_segundos_total", "counter", "Tiempo de CPU acumulado",
+                [f"labvirtual_cpu_segundos_total{{{etiquetas[n]}}} {r['cpu_total_s']:.6f}"
+                 for n, r in resumen.items()])
+        metrica("memoria_pico_bytes", "gauge", "Mayor pico de memoria de una llamada (tracemalloc)",
+                [f"labvirtual_memoria_pico_bytes{{{etiquetas[n]}}} {r['memoria_pico_bytes']}"
+                 for n, r in resumen.items()])
+        return "\n".join(lineas) + "\n"
+
+    def escribir(self, ruta):
+        """
+        Escribe las métricas en ``ruta`` de forma atómica
+
+        Formato JSON si la extensión es ``.json``; si no, texto de Prometheus.
+        """
+        ruta = os.fspath(ruta)
+        contenido = self.exportar_json() if ruta.endswith(".json") else self.exportar_prometheus()
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def escribir_periodico(self, ruta, intervalo=15.0):
+        """``escribir`` como máximo una vez cada ``intervalo`` segundos"""
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultima_escritura < intervalo:
+                return False
+            self._ultima_escritura = ahora
+        self.escribir(ruta)
+        return True
+
+
+class _Medicion:
+    """Una llamada en curso; ver ``RegistroMetricas.medir``"""
+
+    __slots__ = ("registro", "nombre", "tipo", "pared", "cpu", "memoria_inicio", "pico_hijos")
+
+    def __init__(self, registro, nombre, tipo):
+        self.registro = registro
+        self.nombre = nombre
+        self.tipo = tipo
+
+    def __enter__(self):
+        self.memoria_inicio = None
+        self.pico_hijos = 0
+        pila = self.registro._pila()
+        if tracemalloc.is_tracing():
+            # reset_peak es global: se guarda el pico que lleva la medición
+            # de afuera y, al salir, se le informa el pico de esta
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1].pico_hijos = max(pila[-1].pico_hijos, pico)
+            self.memoria_inicio = actual
+            tracemalloc.reset_peak()
+        pila.append(self)
+        self.cpu = time.thread_time()
+        self.pared = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        pared = time.perf_counter() - self.pared
+        cpu = time.thread_time() - self.cpu
+        pila = self.registro._pila()
+        pila.pop()
+        memoria = 0
+        if self.memoria_inicio is not None and tracemalloc.is_tracing():
+            pico = max(tracemalloc.get_traced_memory()[1], self.pico_hijos)
+            memoria = max(pico - self.memoria_inicio, 0)
+            if pila:
+                pila[-1].pico_hijos = max(pila[-1].pico_hijos, pico)
+        self.registro.registrar(self.nombre, self.tipo, pared, cpu, memoria)
+        return False
+
+
+METRICAS = RegistroMetricas(memoria=os.environ.get("LABVIRTUAL_TRACEMALLOC") == "1")
+
+
+def instrumentar(funcion=None, *, nombre=None, tipo="calculo", registro=None):
+    """
+    Decorador que mide cada llamada de ``funcion``
+
+    Se usa como ``@instrumentar`` o ``@instrumentar(tipo="etapa")``.
+    """
+    if funcion is None:
+        return functools.partial(instrumentar, nombre=nombre, tipo=tipo, registro=registro)
+
+    nombre = nombre or funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with (registro or METRICAS).medir(nombre, tipo):
+            return funcion(*args, **kwargs)
+
+    return envoltura
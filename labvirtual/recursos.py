@@ -0,0 +1,188 @@
+"""
+Recursos estáticos de la aplicación.
+
+Los archivos se leen una sola vez por proceso y se comparten entre todas
+las sesiones; las páginas solo reciben el texto ya cargado.
+
+Las imágenes de ``datos/`` se convierten al arrancar (o con
+``python -m labvirtual.recursos``) en variantes WebP de ancho fijo dentro de ``static/img``. Streamlit las sirve como archivos estáticos
+(``server.enableStaticServing``), con ETag y Last-Modified, de modo que
+las páginas solo envían la URL y nada se vuelve a codificar en cada rerun
+ni se descarga de internet.
+"""
+
+import argparse
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+RAIZ = Path(__file__).resolve().parent.parent
+RUTA_SIMULADOR_PESADO = RAIZ / "simulador_pesado.html"
+
+
+@functools.cache
+def html_simulador_pesado():
+    """HTML del simulador de pesado de la Etapa 1"""
+    return RUTA_SIMULADOR_PESADO.read_text(encoding="utf-8")
+
+
+# ============================================================================
+# IMÁGENES
+# ============================================================================
+
+RUTA_DATOS = RAIZ / "datos"
+RUTA_IMAGENES = RAIZ / "static" / "img"   # servida por Streamlit en /app/static/img
+URL_IMAGENES = "app/static/img"
+ANCHOS = (160, 320, 640)                  # px de las variantes generadas
+CALIDAD_WEBP = 80
+EXTENSIONES = {".jpg", ".jpeg", ".png", ".webp"}
+
+ARCHIVO_LOGO = "logo_curso.png"   # en datos/, versionado con el repositorio
+
+
+class CatalogoImagenes:
+    """
+    Variantes WebP de las imágenes de ``datos/``, generadas una sola vez
+
+    Cada imagen se reduce a los anchos de ``ANCHOS`` (sin ampliar) y se
+    guarda como ``nombre-ancho-hash.webp``; el hash del contenido cambia el
+    nombre si cambia la imagen, así el navegador puede guardarla en caché.
+    ``manifiesto.json`` recuerda la firma (tamaño y fecha) de cada original
+    para no volver a procesarlo en el siguiente arranque.
+    """
+
+    def __init__(self, origen=RUTA_DATOS, destino=RUTA_IMAGENES, anchos=ANCHOS):
+        self.origen = Path(origen)
+        self.destino = Path(destino)
+        self.anchos = tuple(anchos)
+        self.manifiesto = {}
+        self.generadas = 0
+
+    @property
+    def ruta_manifiesto(self):
+        return self.destino / "manifiesto.json"
+
+    def preparar(self, forzar=False):
+        """Genera las variantes que falten; devuelve cuántas imágenes procesó"""
+        if self.ruta_manifiesto.exists() and not forzar:
+            self.manifiesto = json.loads(self.ruta_manifiesto.read_text(encoding="utf-8"))
+        vigentes = {}
+        for ruta in sorted(self.origen.iterdir()) if self.origen.is_dir() else []:
+            if ruta.suffix.lower() not in EXTENSIONES:
+                continue
+            estado = ruta.stat()
+            firma = [estado.st_size, estado.st_mtime_ns]
+            entrada = self.manifiesto.get(ruta.name)
+            if (entrada is None or entrada["firma"] != firma or entrada["anchos"] != list(self.anchos)
+                    or not all((self.destino / a).exists() for a in entrada["archivos"].values())):
+                entrada = self._generar(ruta, firma)
+                self.generadas += 1
+            vigentes[ruta.name] = entrada
+        self._limpiar(vigentes)
+        self.manifiesto = vigentes
+        self.destino.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_manifiesto.with_suffix(".tmp")
+        temporal.write_text(json.dumps(vigentes, indent=2), encoding="utf-8")
+        os.replace(temporal, self.ruta_manifiesto)
+        return self.generadas
+
+    def _generar(self, ruta, firma):
+        from PIL import Image  # solo se importa si hay algo que generar
+
+        datos = ruta.read_bytes()
+        huella = hashlib.blake2b(datos, digest_size=4).hexdigest()
+        self.destino.mkdir(parents=True, exist_ok=True)
+        archivos = {}
+        with Image.open(io.BytesIO(datos)) as original:
+            tamano = list(original.size)
+            # Los JPEG se decodifican directamente a una escala reducida
+            original.draft("RGB", (max(self.anchos), max(self.anchos)))
+            modo = "RGBA" if "A" in original.getbands() or original.mode == "P" else "RGB"
+            imagen = original.convert(modo)
+        # De mayor a menor: cada variante se reduce desde la anterior
+        for ancho in sorted(self.anchos, reverse=True):
+            ancho_real = min(ancho, imagen.width)
+            alto = max(1, round(imagen.height * ancho_real / imagen.width))
+            imagen = imagen.resize((ancho_real, alto), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            nombre = f"{ruta.stem}-{ancho}-{huella}.webp"
+            imagen.save(self.destino / nombre, "WEBP", quality=CALIDAD_WEBP, method=4)
+            archivos[str(ancho)] = nombre
+        return {"firma": firma, "anchos": list(self.anchos), "tamano": tamano, "archivos": archivos}
+
+    def _limpiar(self, vigentes):
+        # Borra variantes de versiones anteriores de las imágenes
+        if not self.destino.is_dir():
+            return
+        usados = {a for entrada in vigentes.values() for a in entrada["archivos"].values()}
+        for ruta in self.destino.glob("*.webp"):
+            if ruta.name not in usados:
+                ruta.unlink()
+
+    def archivo(self, nombre, ancho):
+        """Nombre de la variante más pequeña con al menos ``ancho`` px, o None"""
+        entrada = self.manifiesto.get(nombre)
+        if not entrada:
+            return None
+        disponibles = sorted(int(a) for a in entrada["archivos"])
+        elegido = next((a for a in disponibles if a >= ancho), disponibles[-1])
+        return entrada["archivos"][str(elegido)]
+
+    def url(self, nombre, ancho):
+        """URL estática (``app/static/img/...``) de la variante, o None"""
+        archivo = self.archivo(nombre, ancho)
+        return f"{URL_IMAGENES}/{archivo}" if archivo else None
+
+    def original(self, nombre):
+        """Ruta de la imagen original en ``datos/``, o None si no existe"""
+        ruta = self.origen / nombre
+        return ruta if nombre and ruta.is_file() else None
+
+
+_imagenes = None
+_imagenes_lock = threading.Lock()
+
+
+def obtener_imagenes():
+    """
+    Catálogo de imágenes del proceso; la primera llamada genera las variantes
+
+    Si no se pueden generar (``static/img`` de solo lectura, Pillow ausente)
+    el error se registra una sola vez y el catálogo queda sin variantes: las
+    páginas usan entonces los originales de ``datos/``.
+    """
+    global _imagenes
+    with _imagenes_lock:
+        if _imagenes is None:
+            catalogo = CatalogoImagenes()
+            try:
+                catalogo.preparar()
+            except Exception:
+                logger.exception("No se pudieron generar las imágenes en %s; se usan los originales",
+                                 catalogo.destino)
+                catalogo.manifiesto = {}
+            _imagenes = catalogo
+        return _imagenes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera las variantes WebP de las imágenes de datos/")
+    parser.add_argument("--forzar", action="store_true", help="Regenera todas las variantes")
+    args = parser.parse_args(argv)
+
+    catalogo = CatalogoImagenes()
+    generadas = catalogo.preparar(forzar=args.forzar)
+    total = sum((catalogo.destino / a).stat().st_size
+                for entrada in catalogo.manifiesto.values() for a in entrada["archivos"].values())
+    print(f"{len(catalogo.manifiesto)} imágenes ({generadas} procesadas), "
+          f"{total / 1024:.0f} KiB en {catalogo.destino}")
+
+
+if __name__ == "__main__":
+    main()
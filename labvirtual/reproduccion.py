@@ -0,0 +1,174 @@
+"""
+Grabación y reproducción determinista de una práctica.
+
+``EstadoLaboratorio`` guarda en ``eventos`` cada entrada del estudiante
+(masa, balón, patrones, vino, dilución), cada medición y el carné que
+cambia la semilla (si llegó después de algún sorteo), en orden. Las
+mediciones sacan su ruido de ``lab.generador()``, un hijo de la
+``SeedSequence`` de la sesión indexado por la posición del evento. Con la
+entropía y la lista de eventos, ``reproducir`` reconstruye el estado
+exacto sin Streamlit, en milisegundos.
+
+Las funciones ``medir_*`` son las mismas que usa la Etapa 4, así que la
+práctica en vivo y su reproducción recorren el mismo código.
+
+Uso desde la línea de comandos:
+python -m labvirtual.reproduccion grabacion.json --repeticiones 100
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from labvirtual.calculos import verificar_rango_optimo
+from labvirtual.catalogo import obtener_catalogo
+from labvirtual.estado import EstadoLaboratorio, MedicionMuestra
+from labvirtual.instrumento import BLANCO, CONTROL, MUESTRA, secuencia, simular_corrida
+
+VERSION_GRABACION = 1
+
+# Flujos aleatorios de un mismo evento
+FLUJO_MEDICION = 0
+FLUJO_INCERTIDUMBRE = 1
+
+
+# ============================================================================
+# MEDICIONES (ETAPA 4)
+# ============================================================================
+
+def medir_patrones(lab):
+    """Blanco y patrones en una secuencia; registra absorbancias y réplicas"""
+    todos_en_rango = bool(lab.patrones['en_rango'].all())
+    tipos, conc = secuencia(lab.patrones['concentracion'], control=False)
+    corrida = simular_corrida(tipos, conc, curva_lineal=todos_en_rango,
+                              rng=lab.generador(FLUJO_MEDICION))
+    lab.eventos.append(("medir_patrones", {}))
+    lab.registrar_absorbancias(corrida.media[1:])
+    lab.registrar_lecturas("patrones", corrida.tipos, corrida.concentraciones, corrida.lecturas)
+    return corrida
+
+
+def _control(lab):
+    # Patrón central, leído en las mismas condiciones que los patrones
+    return float(np.median(lab.patrones['concentracion'])), bool(lab.patrones['en_rango'].all())
+
+
+def medir_muestra(lab):
+    """Blanco, muestra de la Etapa 3 y patrón de control"""
+    conc_diluida = lab.conc_muestra_diluida
+    conc_control, control_lineal = _control(lab)
+    corrida = simular_corrida(
+        [BLANCO, MUESTRA, CONTROL],
+        [0.0, conc_diluida, conc_control],
+        curva_lineal=[True, verificar_rango_optimo(conc_diluida), control_lineal],
+        rng=lab.generador(FLUJO_MEDICION),
+    )
+    lab.eventos.append(("medir_muestra", {}))
+    lab.muestra = MedicionMuestra(
+        vino=lab.vino_seleccionado,
+        absorbancia=float(corrida.media[1]),
+        concentracion_diluida=conc_diluida,
+    )
+    lab.registrar_lecturas("muestra", corrida.tipos, corrida.concentraciones, corrida.lecturas)
+    return corrida
+
+
+def medir_lote(lab, vinos, alicuotas, volumenes, concentraciones_fe):
+    """Todos los vinos del lote en una secuencia (blanco, muestras, control)"""
+    lab.fijar_lote(obtener_catalogo().indices(vinos), alicuotas, volumenes, concentraciones_fe)
+    conc_diluidas = lab.lote['concentracion_diluida']
+    conc_control, control_lineal = _control(lab)
+    corrida = simular_corrida(
+        [BLANCO] + [MUESTRA] * len(vinos) + [CONTROL],
+        np.r_[0.0, conc_diluidas, conc_control],
+        curva_lineal=np.r_[True, verificar_rango_optimo(conc_diluidas), control_lineal],
+        rng=lab.generador(FLUJO_MEDICION),
+    )
+    lab.eventos.append(("medir_lote", {
+        "vinos": list(vinos),
+        "alicuotas": [float(a) for a in alicuotas],
+        "volumenes": [int(v) for v in volumenes],
+        "concentraciones_fe": [float(c) for c in concentraciones_fe],
+    }))
+    lab.registrar_absorbancias_lote(corrida.media[1:-1])
+    lab.registrar_lecturas("lote", corrida.tipos, corrida.concentraciones, corrida.lecturas)
+    return corrida
+
+
+# ============================================================================
+# GRABACIÓN Y REPRODUCCIÓN
+# ============================================================================
+
+def grabacion(lab):
+    """Diccionario JSON con todo lo necesario para reproducir la sesión"""
+    return {
+        "version": VERSION_GRABACION,
+        "sesion": lab.sesion,
+        "entropia": format(lab.entropia_inicial, "x"),
+        "eventos": [[nombre, datos] for nombre, datos in lab.eventos],
+    }
+
+
+def grabacion_json(lab):
+    return json.dumps(grabacion(lab), ensure_ascii=False, separators=(",", ":"))
+
+
+def reproducir(datos):
+    """
+    Reconstruye ``EstadoLaboratorio`` a partir de una grabación
+
+    datos: diccionario de ``grabacion`` o su texto JSON
+    """
+    if isinstance(datos, (str, bytes)):
+        datos = json.loads(datos)
+    if datos.get("version") != VERSION_GRABACION:
+        raise ValueError(f"Versión de grabación no soportada: {datos.get('version')}")
+
+    lab = EstadoLaboratorio(sesion=datos["sesion"], entropia=int(datos["entropia"], 16))
+    for nombre, argumentos in datos["eventos"]:
+        if nombre == "fijar":
+            lab.fijar(**argumentos)
+        elif nombre == "patrones":
+            lab.fijar_patrones(argumentos["alicuotas"], argumentos["volumenes"], argumentos["concentraciones"])
+        elif nombre == "semilla":
+            lab.fijar_semilla(argumentos["estudiante"])
+        elif nombre == "medir_patrones":
+            medir_patrones(lab)
+        elif nombre == "medir_muestra":
+            medir_muestra(lab)
+        elif nombre == "medir_lote":
+            medir_lote(lab, **argumentos)
+        else:
+            raise ValueError(f"Evento desconocido en la grabación: {nombre}")
+    return lab
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproduce una práctica grabada")
+    parser.add_argument("grabacion", type=Path)
+    parser.add_argument("--repeticiones", type=int, default=1,
+                        help="Reproducciones para medir el tiempo (default 1)")
+    args = parser.parse_args(argv)
+
+    datos = json.loads(args.grabacion.read_text(encoding="utf-8"))
+    tiempos = []
+    for _ in range(args.repeticiones):
+        inicio = time.perf_counter()
+        lab = reproducir(datos)
+        tiempos.append(time.perf_counter() - inicio)
+
+    print(f"Sesión {lab.sesion}: {len(lab.eventos)} eventos")
+    if lab.patrones_medidos:
+        print("Absorbancias de los patrones:", np.array2string(lab.patrones['absorbancia'], precision=4))
+    if lab.muestra is not None:
+        print(f"Muestra ({lab.muestra.vino}): A = {lab.muestra.absorbancia:.4f}")
+    if lab.lote_medido:
+        print("Lote:", ", ".join(f"{v} A = {a:.4f}" for v, a in zip(obtener_catalogo().nombres(lab.lote['vino']), lab.lote['absorbancia'])))
+    print(f"Reproducción: {1000 * np.median(tiempos):.2f} ms (mediana de {len(tiempos)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Simulación vectorizada de absorbancias en el espectrómetro AA.
+
+Todas las lecturas salen de un ``numpy.random.Generator`` explícito, de
+modo que una clase completa o un estudio de Monte Carlo cuesta una sola
+llamada vectorizada en vez de una llamada de Python por patrón.
+"""
+
+import numpy as np
+
+from labvirtual.calculos import K_ABSORCION, _salida
+from labvirtual.metricas import instrumentar
+
+# ============================================================================
+# PARÁMETROS DEL MODELO
+# ============================================================================
+
+SIGMA_LINEAL = 0.002      # ruido del instrumento con patrones en rango
+SIGMA_NO_LINEAL = 0.02    # ruido con patrones fuera de rango
+COEF_NO_LINEAL = 0.01     # curvatura de la desviación (C - 3)²
+CENTRO_NO_LINEAL = 3.0    # mg/L
+
+_rng_defecto = np.random.default_rng()
+
+
+def obtener_rng(rng=None):
+    """Normaliza ``rng`` (None, semilla o Generator) a un ``Generator``"""
+    if rng is None:
+        return _rng_defecto
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+
+# ============================================================================
+# MOTOR DE SIMULACIÓN
+# ============================================================================
+
+@instrumentar
+def simular_absorbancias(concentraciones, n_replicas=1, curva_lineal=True, rng=None):
+    """
+    Simula las lecturas de absorbancia de un conjunto de soluciones
+
+    concentraciones: arreglo de forma (n_patrones,) en mg/L
+    curva_lineal: bool o arreglo de bools por patrón. Si es False se
+        aplica la desviación no lineal 0.01·(C - 3)² con mayor ruido.
+    rng: ``Generator``, semilla o None
+
+    Devuelve una matriz (n_patrones × n_replicas) generada con una sola
+    llamada al generador.
+    """
+    rng = obtener_rng(rng)
+    concentraciones = np.asarray(concentraciones, dtype=float)
+    lineal = np.asarray(curva_lineal, dtype=bool)[..., np.newaxis]
+    conc = concentraciones[..., np.newaxis]
+
+    abs_teorica = K_ABSORCION * conc
+    sigma = np.where(lineal, SIGMA_LINEAL, SIGMA_NO_LINEAL)
+    desviacion = np.where(lineal, 0.0, COEF_NO_LINEAL * (conc - CENTRO_NO_LINEAL)**2)
+
+    ruido = rng.standard_normal(concentraciones.shape + (n_replicas,))
+    return abs_teorica + desviacion + sigma * ruido
+
+
+@instrumentar
+def generar_absorbancia(concentracion, curva_lineal=True, rng=None):
+    """
+    Genera absorbancia basada en Ley de Beer
+    Si curva_lineal=False, añade desviaciones
+    """
+    return _salida(simular_absorbancias(concentracion, 1, curva_lineal, rng)[..., 0])
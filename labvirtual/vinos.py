@@ -0,0 +1,36 @@
+"""
+Datos de los vinos (con concentraciones reales de Fe)
+"""
+
+VINOS_DATABASE = {
+    "Vino Tinto Reserva": {
+        "imagen": "🍷",
+        "color": "#8B0000",
+        "concentracion_fe": 8.5,  # mg/L real en el vino
+        "descripcion": "Vino tinto con cuerpo, crianza en barrica",
+        "fd_sugerido": 2
+    },
+    "Vino Blanco Seco": {
+        "imagen": "🥂",
+        "color": "#FFD700",
+        "concentracion_fe": 2.8,  # mg/L
+        "descripcion": "Vino blanco ligero, afrutado",
+        "ruta_imagen": "White_Wine.jpg",  # en datos/
+        "fd_sugerido": 1
+    },
+    "Vino Rosado": {
+        "imagen": "🌸",
+        "color": "#FF69B4",
+        "concentracion_fe": 4.2,  # mg/L
+        "descripcion": "Vino rosado fresco y aromático",
+        "ruta_imagen": "Rose_Wine.webp",
+        "fd_sugerido": 1
+    },
+    "Vino Tinto Joven": {
+        "imagen": "🍇",
+        "color": "#DC143C",
+        "concentracion_fe": 12.3,  # mg/L
+        "descripcion": "Vino tinto joven, intenso",
+        "fd_sugerido": 3
+    }
+}
@@ -0,0 +1,77 @@
+"""Almacén SQLite de prácticas completadas (labvirtual.almacen)"""
+
+import math
+
+import numpy as np
+import pytest
+
+from labvirtual.almacen import AlmacenEjecuciones, EjecucionLab
+from labvirtual.estado import crear_patrones
+
+
+def _ejecucion(estudiante, r2=0.999, error_relativo=2.0, vino="Vino Rosado"):
+    patrones = crear_patrones([1, 2, 3], [100, 100, 100], [1.0, 2.0, 3.0])
+    patrones["absorbancia"] = [0.08, 0.16, np.nan]
+    return EjecucionLab(
+        vino=vino, absorbancia_muestra=0.3, pendiente=0.08, intercepto=0.002, r2=r2,
+        conc_calculada=4.1, conc_real=4.2, error_relativo=error_relativo, patrones=patrones,
+        estudiante=estudiante, alicuota_vino=10.0, volumen_aforo_muestra=10,
+        conc_muestra_diluida=4.1, marca_tiempo=1.7e9,
+    )
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenEjecuciones(tmp_path / "ejecuciones.sqlite3", intervalo=0.05)
+    yield almacen
+    almacen.cerrar()
+
+
+def test_guarda_y_consulta(almacen):
+    almacen.registrar(_ejecucion("B1"))
+    almacen.registrar(_ejecucion("B2", vino="Vino Tinto"))
+    almacen.esperar()
+    assert (almacen.escritas, almacen.fallidas) == (2, 0)
+    assert almacen.contar() == 2
+    [fila] = almacen.consultar(estudiante="B1")
+    assert fila["vino"] == "Vino Rosado" and fila["n_patrones"] == 3
+    patrones = almacen.patrones(fila["id"])
+    np.testing.assert_array_equal(patrones["concentracion"], [1.0, 2.0, 3.0])
+    assert math.isnan(patrones["absorbancia"][2])
+    assert {f["estudiante"] for f in almacen.consultar(vino="Vino Tinto")} == {"B2"}
+
+
+def test_un_nan_descarta_solo_su_ejecucion(almacen):
+    # r2 = NaN viola NOT NULL; las demás ejecuciones del lote se guardan
+    for ejecucion in (_ejecucion("A"), _ejecucion("B", r2=float("nan")), _ejecucion("C")):
+        almacen.registrar(ejecucion)
+    almacen.esperar()
+    assert (almacen.escritas, almacen.fallidas) == (2, 1)
+    assert sorted(f["estudiante"] for f in almacen.consultar()) == ["A", "C"]
+    agregados = almacen.agregados()
+    assert agregados.por_vino["Vino Rosado"]["n"] == 2
+
+
+def test_agregados_de_la_clase(almacen):
+    for i, error in enumerate([1.0, 3.0, 5.0]):
+        almacen.registrar(_ejecucion(f"E{i}", error_relativo=error))
+    almacen.esperar()
+    vino = almacen.agregados().por_vino["Vino Rosado"]
+    assert vino["n"] == 3
+    assert vino["media_error"] == pytest.approx(3.0)
+    assert vino["desv_error"] == pytest.approx(2.0)
+
+
+def test_persistencia_y_cierre(tmp_path):
+    ruta = tmp_path / "ejecuciones.sqlite3"
+    almacen = AlmacenEjecuciones(ruta, intervalo=0.05)
+    almacen.registrar(_ejecucion("B1"))
+    almacen.cerrar()
+    with pytest.raises(RuntimeError):
+        almacen.registrar(_ejecucion("B2"))
+    reabierto = AlmacenEjecuciones(ruta)
+    try:
+        assert reabierto.contar() == 1
+        assert reabierto.agregados().por_vino["Vino Rosado"]["n"] == 1
+    finally:
+        reabierto.cerrar()
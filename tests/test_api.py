@@ -0,0 +1,88 @@
+"""API HTTP/JSON del motor de cálculo (labvirtual.api)"""
+
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from labvirtual.api import atender, despachar
+from labvirtual.calculos import calcular_concentracion_patron_madre, calcular_fd_muestra
+
+
+def _post(ruta, datos):
+    estado, respuesta, _ = despachar("POST", ruta, json.dumps(datos).encode("utf-8"))
+    return estado, respuesta
+
+
+def test_calculos_por_lote_con_escalares_repetidos():
+    estado, respuesta = _post("/v1/patron-madre", {"masa_sal": [0.0702, 0.0351], "volumen_aforo": 100})
+    assert estado == HTTPStatus.OK
+    assert respuesta["concentracion"] == pytest.approx(
+        [calcular_concentracion_patron_madre(0.0702, 100), calcular_concentracion_patron_madre(0.0351, 100)])
+    estado, respuesta = _post("/v1/factor-dilucion", {"alicuota": [10, 0], "volumen_aforo": 25})
+    assert respuesta["fd"][0] == pytest.approx(calcular_fd_muestra(10, 25))
+    # División entre cero: null, no error
+    assert respuesta["fd"][1] is None
+
+
+def test_curvas():
+    estado, respuesta = _post("/v1/curvas", {"curvas": [
+        {"concentraciones": [1, 2, 3, 4, 5], "absorbancias": [0.08, 0.16, 0.24, 0.32, 0.40],
+         "absorbancia_muestra": 0.2, "fd": 2.5, "vino": "Vino Rosado"},
+        {"concentraciones": [3, 3], "absorbancias": [0.2, 0.2]},
+    ]})
+    assert estado == HTTPStatus.OK
+    assert respuesta["pendiente"][0] == pytest.approx(0.08)
+    assert respuesta["conc_calculada"][0] == pytest.approx(6.25)
+    assert respuesta["pendiente"][1] is None and respuesta["conc_calculada"][1] is None
+
+
+def test_calificar_mismo_resultado_que_el_cli():
+    entrega = {"estudiante": "B1", "vino": "Vino Rosado", "masa_sal_mohr": 0.0702, "volumen_aforo_patron": 100,
+               "alicuotas_patron": [1, 2, 3, 4, 5], "aforos_patron": 100,
+               "absorbancias_patron": [0.082, 0.166, 0.245, 0.33, 0.41],
+               "alicuota_vino": 10, "volumen_aforo_muestra": 10, "absorbancia_muestra": 0.344}
+    estado, respuesta = _post("/v1/calificar", {"entregas": [entrega, {"vino": "Otro"}]})
+    assert estado == HTTPStatus.OK
+    assert respuesta["valida"] == [True, False]
+    assert "fila" not in respuesta
+
+
+@pytest.mark.parametrize(("metodo", "ruta", "cuerpo", "estado"), [
+    ("POST", "/v1/no-existe", b"{}", HTTPStatus.NOT_FOUND),
+    ("GET", "/v1/curvas", b"", HTTPStatus.METHOD_NOT_ALLOWED),
+    ("POST", "/v1/curvas", b"{no es json", HTTPStatus.BAD_REQUEST),
+    ("POST", "/v1/curvas", b"[1, 2]", HTTPStatus.BAD_REQUEST),
+    ("POST", "/v1/curvas", b'{"curvas": []}', HTTPStatus.BAD_REQUEST),
+    ("POST", "/v1/calificar", b'{"entregas": [1]}', HTTPStatus.BAD_REQUEST),
+    ("GET", "/salud", b"", HTTPStatus.OK),
+])
+def test_errores_de_solicitud(metodo, ruta, cuerpo, estado):
+    assert despachar(metodo, ruta, cuerpo)[0] == estado
+
+
+def test_conexion_persistente():
+    async def probar():
+        servidor = await asyncio.start_server(atender, "127.0.0.1", 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+            respuestas = []
+            for cuerpo in (b'{"alicuota": 10, "volumen_aforo": 25}', b'{"alicuota": 5, "volumen_aforo": 50}'):
+                escritor.write(b"POST /v1/factor-dilucion HTTP/1.1\r\nHost: x\r\n"
+                               b"Content-Length: %d\r\n\r\n%s" % (len(cuerpo), cuerpo))
+                await escritor.drain()
+                assert (await lector.readline()).startswith(b"HTTP/1.1 200")
+                encabezados = {}
+                while (linea := await lector.readline()) != b"\r\n":
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.lower()] = valor.strip()
+                assert encabezados["connection"] == "keep-alive"
+                respuestas.append(json.loads(await lector.readexactly(int(encabezados["content-length"]))))
+            escritor.close()
+            await escritor.wait_closed()
+        return respuestas
+
+    respuestas = asyncio.run(probar())
+    assert [r["fd"] for r in respuestas] == pytest.approx([2.5, 10.0])
@@ -0,0 +1,100 @@
+"""Curva de calibración incremental (labvirtual.calibracion)"""
+
+import math
+
+import numpy as np
+import pytest
+
+from labvirtual.calculos import ajustar_recta
+from labvirtual.calibracion import CurvaCalibracion
+
+
+@pytest.fixture
+def datos():
+    rng = np.random.default_rng(1)
+    x = np.tile([1.0, 2.0, 3.0, 4.0, 5.0], 4)
+    y = 0.08 * x + 0.002 + rng.normal(0, 0.003, x.size)
+    return x, y
+
+
+def test_coincide_con_el_ajuste_directo(datos):
+    x, y = datos
+    curva = CurvaCalibracion.desde_datos(x, y)
+    pendiente, intercepto, r2 = ajustar_recta(x, y)
+    assert curva.pendiente == pytest.approx(pendiente, rel=1e-12)
+    assert curva.intercepto == pytest.approx(intercepto, rel=1e-10)
+    assert curva.r2 == pytest.approx(r2, rel=1e-12)
+    residuos = y - (pendiente * x + intercepto)
+    assert curva.s_yx == pytest.approx(math.sqrt(residuos @ residuos / (x.size - 2)))
+
+
+def test_agregar_quitar_y_combinar(datos):
+    x, y = datos
+    referencia = CurvaCalibracion.desde_datos(x, y)
+    uno_a_uno = CurvaCalibracion()
+    for xi, yi in zip(x, y):
+        uno_a_uno.agregar(xi, yi)
+    partes = CurvaCalibracion.desde_datos(x[:7], y[:7]).combinar(CurvaCalibracion.desde_datos(x[7:], y[7:]))
+    for curva in (uno_a_uno, partes):
+        assert curva.n == referencia.n
+        assert curva.pendiente == pytest.approx(referencia.pendiente, rel=1e-12)
+        assert curva.intercepto == pytest.approx(referencia.intercepto, rel=1e-10)
+
+    uno_a_uno.quitar(x[-1], y[-1])
+    sin_ultimo = CurvaCalibracion.desde_datos(x[:-1], y[:-1])
+    assert uno_a_uno.pendiente == pytest.approx(sin_ultimo.pendiente, rel=1e-12)
+    assert uno_a_uno.ssxx == pytest.approx(sin_ultimo.ssxx, rel=1e-12)
+
+
+def test_curva_vacia_vale_nan():
+    curva = CurvaCalibracion()
+    for valor in (curva.x_media, curva.y_media, curva.ssxx, curva.pendiente, curva.intercepto,
+                  curva.r2, curva.s_yx, curva.s_intercepto, curva.lod,
+                  curva.incertidumbre_prediccion(0.3)):
+        assert math.isnan(valor)
+    with pytest.raises(ValueError):
+        curva.quitar(1.0, 0.1)
+
+
+def test_quitar_el_unico_patron_deja_la_curva_vacia():
+    curva = CurvaCalibracion()
+    curva.agregar(2.0, 0.16)
+    curva.quitar(2.0, 0.16)
+    assert curva.n == 0
+    assert math.isnan(curva.x_media)
+    assert CurvaCalibracion().combinar(curva).n == 0
+
+
+def test_sin_pendiente_con_concentraciones_iguales():
+    curva = CurvaCalibracion.desde_datos([3.0, 3.0, 3.0], [0.1, 0.2, 0.3])
+    assert not curva.con_pendiente
+    assert math.isnan(curva.pendiente)
+    assert math.isnan(curva.lod)
+
+
+def test_sumas_centradas_sin_cancelacion(datos):
+    # Concentraciones desplazadas: Σx² - (Σx)²/n perdería todos los dígitos
+    x, y = datos
+    desplazada = CurvaCalibracion()
+    for xi, yi in zip(x + 1e8, y):
+        desplazada.agregar(xi, yi)
+    assert desplazada.pendiente == pytest.approx(CurvaCalibracion.desde_datos(x, y).pendiente, rel=1e-6)
+
+
+def test_desde_lotes_vectorizado(datos):
+    x, y = datos
+    curvas = np.repeat([0, 2], [10, 10])
+    lotes = CurvaCalibracion.desde_lotes(curvas, x, y, n_curvas=3)
+    for i, inicio in ((0, 0), (2, 10)):
+        sola = CurvaCalibracion.desde_datos(x[inicio:inicio + 10], y[inicio:inicio + 10])
+        assert lotes.pendiente[i] == pytest.approx(sola.pendiente, rel=1e-12)
+        assert lotes.s_intercepto[i] == pytest.approx(sola.s_intercepto, rel=1e-10)
+    # La curva 1 no tiene puntos
+    assert np.isnan(lotes.pendiente[1]) and np.isnan(lotes.x_media[1])
+
+
+def test_incertidumbre_baja_con_mas_replicas(datos):
+    curva = CurvaCalibracion.desde_datos(*datos)
+    una = curva.incertidumbre_prediccion(0.25, 1)
+    tres = curva.incertidumbre_prediccion(0.25, 3)
+    assert 0 < tres < una
@@ -0,0 +1,95 @@
+"""Calificación por lotes de las entregas (labvirtual.calificacion)"""
+
+import json
+
+import numpy as np
+import pytest
+
+from labvirtual.calculos import calcular_concentracion_patron_madre
+from labvirtual.calibracion import CurvaCalibracion
+from labvirtual.calificacion import (
+    MOTIVO_FILA,
+    MOTIVO_JSON,
+    MOTIVO_PATRONES,
+    MOTIVO_VINO,
+    calificar_bloque,
+    calificar_en_orden,
+    columnas_de_registros,
+    leer_bloques,
+)
+from labvirtual.vinos import VINOS_DATABASE
+
+ENTREGA = {
+    "estudiante": "B1", "vino": "Vino Rosado", "masa_sal_mohr": 0.0702, "volumen_aforo_patron": 100,
+    "alicuotas_patron": [1, 2, 3, 4, 5], "aforos_patron": 100,
+    "absorbancias_patron": [0.082, 0.166, 0.245, 0.33, 0.41],
+    "alicuota_vino": 10, "volumen_aforo_muestra": 10, "absorbancia_muestra": 0.344, "conc_reportada": 4.2,
+}
+
+ENCABEZADO = ("estudiante,vino,masa_sal_mohr,volumen_aforo_patron,alicuotas_patron,aforos_patron,"
+              "absorbancias_patron,alicuota_vino,volumen_aforo_muestra,absorbancia_muestra,conc_reportada\n")
+FILA_CSV = "B1,Vino Rosado,0.0702,100,1;2;3;4;5,100,0.082;0.166;0.245;0.33;0.41,10,10,0.344,4.2\n"
+
+
+def test_misma_concentracion_que_la_aplicacion():
+    resultado = calificar_bloque(columnas_de_registros([ENTREGA]))
+    conc_madre = calcular_concentracion_patron_madre(0.0702, 100)
+    curva = CurvaCalibracion.desde_datos(conc_madre * np.array([1, 2, 3, 4, 5]) / 100,
+                                         ENTREGA["absorbancias_patron"])
+    conc = curva.predecir(0.344)
+    assert resultado["valida"].tolist() == [True]
+    assert resultado["pendiente"][0] == pytest.approx(curva.pendiente)
+    assert resultado["conc_calculada"][0] == pytest.approx(conc)
+    real = VINOS_DATABASE["Vino Rosado"]["concentracion_fe"]
+    assert resultado["error_relativo"][0] == pytest.approx(abs(conc - real) / real * 100)
+
+
+def test_motivos_de_entregas_no_validas():
+    entregas = [
+        {**ENTREGA, "vino": "Vino Inexistente"},
+        {**ENTREGA, "absorbancias_patron": [0.082, 0.166]},
+        ENTREGA,
+    ]
+    resultado = calificar_bloque(columnas_de_registros(entregas))
+    assert resultado["valida"].tolist() == [False, False, True]
+    assert resultado["motivo"].tolist() == [MOTIVO_VINO, MOTIVO_PATRONES, ""]
+
+
+def test_csv_con_fila_malformada(tmp_path):
+    ruta = tmp_path / "entregas.csv"
+    ruta.write_text(ENCABEZADO + FILA_CSV + "B2,Vino Rosado,0.07\n" + FILA_CSV, encoding="utf-8")
+    [resultado] = calificar_en_orden(leer_bloques(ruta), procesos=1)
+    assert resultado["valida"].tolist() == [True, False, True]
+    assert resultado["motivo"][1] == MOTIVO_FILA
+
+
+def test_jsonl_con_lineas_invalidas(tmp_path):
+    # Una línea ilegible o que no es un objeto no detiene la calificación
+    ruta = tmp_path / "entregas.jsonl"
+    ruta.write_text("\n".join([json.dumps(ENTREGA), '{"estudiante": "B2",', "[1, 2]", "",
+                               '"texto"', json.dumps({**ENTREGA, "estudiante": "B3"})]) + "\n",
+                    encoding="utf-8")
+    [resultado] = calificar_en_orden(leer_bloques(ruta), procesos=1)
+    assert resultado["valida"].tolist() == [True, False, False, False, True]
+    assert resultado["motivo"].tolist()[1:4] == [MOTIVO_JSON] * 3
+    assert resultado["estudiante"][4] == "B3"
+
+
+def test_bloques_numerados_en_orden(tmp_path):
+    ruta = tmp_path / "entregas.csv"
+    ruta.write_text(ENCABEZADO + FILA_CSV * 5, encoding="utf-8")
+    resultados = list(calificar_en_orden(leer_bloques(ruta, tamano=2), procesos=1))
+    assert [r["fila"].tolist() for r in resultados] == [[0, 1], [2, 3], [4]]
+
+
+def test_archivo_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from labvirtual.calificacion import main
+
+    ruta = tmp_path / "entregas.jsonl"
+    ruta.write_text(json.dumps(ENTREGA) + "\nno es json\n", encoding="utf-8")
+    salida = tmp_path / "calificaciones.parquet"
+    main([str(ruta), "-o", str(salida), "--procesos", "1"])
+    tabla = pq.read_table(salida).to_pydict()
+    assert tabla["valida"] == [True, False]
+    assert tabla["motivo"] == ["", MOTIVO_JSON]
@@ -0,0 +1,36 @@
+"""Prueba de carga y su comparación con la línea base (benchmarks/carga.py)"""
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+RUTA = Path(__file__).resolve().parent.parent / "benchmarks" / "carga.py"
+
+
+@pytest.fixture(scope="module")
+def carga():
+    especificacion = importlib.util.spec_from_file_location("carga", RUTA)
+    modulo = importlib.util.module_from_spec(especificacion)
+    especificacion.loader.exec_module(modulo)
+    return modulo
+
+
+def test_comparar_detecta_regresiones(carga):
+    base = {"E1": {"p95_ms": 100.0, "memoria_sesion_bytes": 1000.0}}
+    assert carga.comparar({"E1": {"p95_ms": 149.0, "memoria_sesion_bytes": 1000.0}}, base, 0.5) == []
+    regresiones = carga.comparar({"E1": {"p95_ms": 151.0, "memoria_sesion_bytes": 2000.0},
+                                  "E2": {"p95_ms": 1e6, "memoria_sesion_bytes": 1e6}}, base, 0.5)
+    assert len(regresiones) == 2
+    assert all(r.startswith("E1:") for r in regresiones)
+
+
+def test_un_estudiante_recorre_las_etapas_dentro_de_la_memoria_base(carga, monkeypatch, tmp_path):
+    # La memoria de la sesión no depende de la máquina: se compara siempre
+    monkeypatch.setenv("LABVIRTUAL_DB", str(tmp_path / "carga.sqlite3"))
+    latencias, memoria = carga.simular_estudiante(0)
+    assert {etapa for etapa, _ in latencias} == set(carga.ETAPAS)
+    resumen = {etapa: {"p95_ms": 0.0, "memoria_sesion_bytes": float(bytes_)} for etapa, bytes_ in memoria.items()}
+    linea_base = json.loads(carga.LINEA_BASE.read_text(encoding="utf-8"))
+    assert carga.comparar(resumen, linea_base, 0.5) == []
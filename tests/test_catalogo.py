@@ -0,0 +1,79 @@
+"""Catálogo columnar con memoria mapeada (labvirtual.catalogo)"""
+
+import numpy as np
+import pytest
+
+from labvirtual.catalogo import CatalogoVinos, ColumnaTexto
+from labvirtual.vinos import VINOS_DATABASE
+
+REGISTROS = [
+    {"nombre": "Tinto del Valle", "concentracion_fe": 8.5, "descripcion": "Cosecha tardía", "region": "Cartago"},
+    {"nombre": "Rosado Añejo", "concentracion_fe": "4.2", "descripcion": "", "region": "Heredia"},
+    {"nombre": "Blanco Joven", "concentracion_fe": 2.0, "descripcion": "Seco", "region": None, "zinc": 0.7},
+]
+
+
+@pytest.fixture
+def guardado(tmp_path):
+    CatalogoVinos.desde_registros(REGISTROS).guardar(tmp_path)
+    return CatalogoVinos.abrir(tmp_path)
+
+
+def test_ida_y_vuelta_en_disco(guardado):
+    memoria = CatalogoVinos.desde_registros(REGISTROS)
+    assert list(guardado) == list(memoria) == [r["nombre"] for r in REGISTROS]
+    for nombre in memoria:
+        assert guardado[nombre] == pytest.approx(memoria[nombre], nan_ok=True)
+    assert guardado["Rosado Añejo"]["concentracion_fe"] == 4.2
+    assert guardado["Blanco Joven"]["region"] == ""
+    assert np.isnan(guardado["Tinto del Valle"]["zinc"])
+    assert isinstance(guardado.columnas["region"], ColumnaTexto)
+
+
+def test_desde_dict_igual_a_vinos_database():
+    catalogo = CatalogoVinos.desde_dict(VINOS_DATABASE)
+    assert len(catalogo) == len(VINOS_DATABASE)
+    for nombre, datos in VINOS_DATABASE.items():
+        assert catalogo[nombre]["concentracion_fe"] == datos["concentracion_fe"]
+
+
+def test_indices_y_nombres(guardado):
+    filas = guardado.indices(["Blanco Joven", "Tinto del Valle"])
+    assert filas.dtype == np.int32 and filas.tolist() == [2, 0]
+    assert guardado.nombres(filas) == ["Blanco Joven", "Tinto del Valle"]
+
+
+@pytest.mark.parametrize(("texto", "esperado"), [
+    ("", [0, 1, 2]),
+    ("anejo", [1]),           # sin tildes ni mayúsculas
+    ("tinto cosecha", [0]),   # todas las palabras
+    ("joven tinto", []),
+    ("o", [0, 1, 2]),
+])
+def test_buscar_en_memoria_y_en_disco(guardado, texto, esperado):
+    assert guardado.buscar(texto).tolist() == esperado
+    assert CatalogoVinos.desde_registros(REGISTROS).buscar(texto).tolist() == esperado
+
+
+def test_buscar_descarta_coincidencias_entre_filas():
+    columna = ColumnaTexto.desde_lista(["abc", "def", "cde"])
+    assert columna.buscar("cd").tolist() == [2]
+    assert columna.buscar("c").tolist() == [0, 2]
+    assert columna.todos() == ["abc", "def", "cde"]
+    assert columna[1] == "def"
+
+
+def test_nombres_repetidos(tmp_path):
+    with pytest.raises(ValueError, match="repetidos"):
+        CatalogoVinos.desde_registros(REGISTROS + REGISTROS[:1])
+    catalogo = CatalogoVinos.desde_registros(REGISTROS)
+    catalogo.columnas["nombre"] = ColumnaTexto.desde_lista(["a", "b", "a"])
+    with pytest.raises(ValueError, match="repetidos"):
+        catalogo.guardar(tmp_path)
+
+
+def test_columnas_obligatorias():
+    with pytest.raises(ValueError, match="concentracion_fe"):
+        CatalogoVinos.desde_registros([{"nombre": "Solo nombre"}])
+    with pytest.raises(ValueError, match="numérica"):
+        CatalogoVinos.desde_registros([{"nombre": "A", "concentracion_fe": "alto"}])
@@ -0,0 +1,51 @@
+"""Planificador de diluciones de los patrones (labvirtual.diluciones)"""
+
+import numpy as np
+import pytest
+
+from labvirtual.calculos import (
+    calcular_concentracion_patron,
+    calcular_concentracion_patron_madre,
+    verificar_rango_optimo,
+)
+from labvirtual.diluciones import AFOROS_PATRON, alicuotas_disponibles, planes_dilucion, rejilla_diluciones
+
+CONC_MADRE = calcular_concentracion_patron_madre(0.0702, 100)
+
+
+@pytest.mark.parametrize(("alicuota", "pasos"), [(25.0, 1), (3.0, 2), (0.3, 3), (50.0, 1)])
+def test_pasos_de_pipeteo(alicuota, pasos):
+    alicuotas, todos = alicuotas_disponibles()
+    assert todos[np.isclose(alicuotas, alicuota)] == [pasos]
+
+
+def test_rejilla_solo_en_rango():
+    alicuotas, aforos, concentraciones, _ = rejilla_diluciones(CONC_MADRE)
+    assert concentraciones.size > 0
+    assert verificar_rango_optimo(concentraciones).all()
+    np.testing.assert_allclose(concentraciones, calcular_concentracion_patron(CONC_MADRE, alicuotas, aforos))
+
+
+@pytest.mark.parametrize("n_patrones", [3, 5, 7])
+def test_planes_validos(n_patrones):
+    planes = planes_dilucion(CONC_MADRE, n_patrones)
+    assert 1 <= len(planes) <= 3
+    assert [p.costo for p in planes] == sorted(p.costo for p in planes)
+    for plan in planes:
+        assert plan.alicuotas.size == plan.aforos.size == plan.concentraciones.size == n_patrones
+        assert set(plan.aforos.tolist()) <= set(AFOROS_PATRON)
+        assert verificar_rango_optimo(plan.concentraciones).all()
+        assert (np.diff(plan.concentraciones) > 0).all()
+        np.testing.assert_allclose(plan.concentraciones,
+                                   calcular_concentracion_patron(CONC_MADRE, plan.alicuotas, plan.aforos))
+        assert 0 < plan.cobertura <= 1
+
+
+def test_planes_distintos():
+    planes = planes_dilucion(CONC_MADRE, 5)
+    claves = {(tuple(p.alicuotas), tuple(p.aforos)) for p in planes}
+    assert len(claves) == len(planes)
+
+
+def test_patron_madre_muy_diluido_no_tiene_planes():
+    assert planes_dilucion(0.5, 5) == []
@@ -0,0 +1,58 @@
+"""Propagación de incertidumbre por Monte Carlo (labvirtual.incertidumbre)"""
+
+import numpy as np
+import pytest
+
+from labvirtual.incertidumbre import propagar_incertidumbre, tolerancia_balon, tolerancia_pipeta
+
+PRACTICA = dict(
+    masa_sal=0.0702,
+    volumen_madre=100,
+    alicuotas_patrones=[1, 2, 3, 4, 5],
+    volumenes_patrones=[100] * 5,
+    concentracion_vino=8.5,
+    alicuota_vino=10,
+    volumen_aforo_muestra=25,
+)
+
+
+def test_tolerancias_tabuladas_e_interpoladas():
+    assert tolerancia_balon(100) == pytest.approx(0.08)
+    assert tolerancia_pipeta(5) == pytest.approx(0.01)
+    # Entre 2 mL (0.006) y 5 mL (0.01)
+    assert tolerancia_pipeta(3) == pytest.approx(0.006 + 0.004 / 3)
+    np.testing.assert_allclose(tolerancia_balon([25, 50]), [0.03, 0.05])
+
+
+def test_misma_semilla_mismas_muestras():
+    a = propagar_incertidumbre(**PRACTICA, n_simulaciones=2000, rng=7)
+    b = propagar_incertidumbre(**PRACTICA, n_simulaciones=2000, rng=7)
+    c = propagar_incertidumbre(**PRACTICA, n_simulaciones=2000, rng=8)
+    np.testing.assert_array_equal(a.muestras, b.muestras)
+    assert not np.array_equal(a.muestras, c.muestras)
+
+
+def test_resultado_y_cobertura():
+    resultado = propagar_incertidumbre(**PRACTICA, n_simulaciones=20_000, cobertura=0.9, rng=1)
+    assert resultado.muestras.shape == (20_000,)
+    assert np.isfinite(resultado.muestras).all()
+    assert resultado.valor_nominal == 8.5
+    inferior, superior = resultado.intervalo
+    assert inferior < resultado.media < superior
+    dentro = np.mean((resultado.muestras >= inferior) & (resultado.muestras <= superior))
+    assert dentro == pytest.approx(0.9, abs=0.01)
+
+
+def test_bloques_no_cambian_el_numero_de_simulaciones(monkeypatch):
+    import labvirtual.incertidumbre as incertidumbre
+
+    monkeypatch.setattr(incertidumbre, "TAMANO_BLOQUE", 300)
+    resultado = propagar_incertidumbre(**PRACTICA, n_simulaciones=1000, rng=3)
+    assert resultado.muestras.shape == (1000,)
+    assert np.isfinite(resultado.muestras).all()
+
+
+def test_mas_incertidumbre_en_la_balanza_mas_dispersion():
+    base = propagar_incertidumbre(**PRACTICA, n_simulaciones=20_000, rng=2)
+    balanza = propagar_incertidumbre(**PRACTICA, n_simulaciones=20_000, u_balanza=0.005, rng=2)
+    assert balanza.desviacion > 2 * base.desviacion
@@ -0,0 +1,44 @@
+"""Índice de diluciones factibles de la Etapa 3 (labvirtual.diluciones)"""
+
+import numpy as np
+import pytest
+
+from labvirtual.calculos import calcular_fd_muestra, verificar_rango_optimo
+from labvirtual.diluciones import AFOROS_MUESTRA, IndiceDiluciones, alicuotas_disponibles, diluciones_vino
+from labvirtual.vinos import VINOS_DATABASE
+
+CONCENTRACIONES = sorted({datos["concentracion_fe"] for datos in VINOS_DATABASE.values()} | {0.05, 1.0, 5.0, 250.0})
+
+
+@pytest.mark.parametrize("concentracion_fe", CONCENTRACIONES)
+def test_indice_coincide_con_la_verificacion_de_rango(concentracion_fe):
+    # La sugerencia del índice y el veredicto de la Etapa 3 no pueden contradecirse
+    alicuotas, _ = alicuotas_disponibles()
+    entrada = diluciones_vino(concentracion_fe)
+    for fila, aforo in enumerate(AFOROS_MUESTRA):
+        en_rango = verificar_rango_optimo(concentracion_fe / calcular_fd_muestra(alicuotas, aforo))
+        np.testing.assert_array_equal(entrada.mascara[fila], en_rango)
+        rango = entrada.rangos[aforo]
+        if rango is None:
+            assert not en_rango.any()
+        else:
+            dentro = (alicuotas >= rango[0]) & (alicuotas <= rango[1])
+            np.testing.assert_array_equal(dentro, en_rango)
+    assert entrada.n_factibles == int(entrada.mascara.sum())
+
+
+def test_vino_sin_diluciones_factibles():
+    entrada = diluciones_vino(0.05)
+    assert entrada.n_factibles == 0
+    assert all(rango is None for rango in entrada.rangos.values())
+
+
+def test_indice_reevalua_si_cambia_la_concentracion():
+    indice = IndiceDiluciones()
+    assert indice.obtener("Vino X") is None
+    primera = indice.obtener("Vino X", 8.5)
+    assert indice.obtener("Vino X") is primera
+    assert indice.obtener("Vino X", 8.5) is primera
+    segunda = indice.obtener("Vino X", 20.0)
+    assert segunda is not primera and segunda.concentracion_fe == 20.0
+    assert len(indice) == 1
@@ -0,0 +1,44 @@
+"""Medición de varios vinos contra una sola curva (labvirtual.lote)"""
+
+import numpy as np
+import pytest
+
+from labvirtual.calibracion import CurvaCalibracion
+from labvirtual.catalogo import obtener_catalogo
+from labvirtual.estado import EstadoLaboratorio
+from labvirtual.instrumento import N_REPLICAS
+from labvirtual.lote import evaluar_lote
+from labvirtual.reproduccion import medir_lote, medir_patrones
+
+VINOS = ["Vino Rosado", "Vino Tinto Reserva"]
+
+
+@pytest.fixture
+def lab():
+    lab = EstadoLaboratorio(sesion="prueba")
+    lab.fijar_semilla("B1")
+    lab.fijar_patrones([1, 2, 3, 4, 5], [100] * 5, [1.0, 2.0, 3.0, 4.0, 5.0])
+    medir_patrones(lab)
+    conc_real = [obtener_catalogo()[v]["concentracion_fe"] for v in VINOS]
+    medir_lote(lab, VINOS, [10.0, 5.0], [25, 25], conc_real)
+    return lab
+
+
+def test_lote_medido_con_sus_replicas(lab):
+    assert lab.lote_medido
+    assert lab.replicas("lote") == lab.replicas("patrones") == N_REPLICAS
+    assert lab.replicas("muestra") == 1  # sin lecturas guardadas
+
+
+def test_evaluar_lote(lab):
+    curva = CurvaCalibracion.desde_datos(lab.patrones["concentracion"], lab.patrones["absorbancia"])
+    conc_real = [obtener_catalogo()[v]["concentracion_fe"] for v in VINOS]
+    resultado = evaluar_lote(curva, lab.lote, conc_real, n_replicas=lab.replicas("lote"))
+    assert resultado.vinos == VINOS
+    np.testing.assert_allclose(resultado.conc_calculada, curva.predecir(lab.lote["absorbancia"]) * lab.lote["fd"])
+    np.testing.assert_allclose(resultado.incertidumbre,
+                               curva.incertidumbre_prediccion(lab.lote["absorbancia"], N_REPLICAS) * lab.lote["fd"])
+    # Promediar réplicas reduce la incertidumbre respecto a una sola lectura
+    una = evaluar_lote(curva, lab.lote, conc_real, n_replicas=1)
+    assert (resultado.incertidumbre < una.incertidumbre).all()
+    assert (resultado.error_relativo < 25).all()
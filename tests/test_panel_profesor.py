@@ -0,0 +1,40 @@
+"""Acceso al panel del profesor en la aplicación (Lab_virtual.py)"""
+
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parent.parent / "Lab_virtual.py")
+PANEL = "📊 Panel del Profesor"
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setenv("LABVIRTUAL_DB", str(tmp_path / "ejecuciones.sqlite3"))
+
+    def abrir(clave=None):
+        if clave is None:
+            monkeypatch.delenv("LABVIRTUAL_CLAVE_PROFESOR", raising=False)
+        else:
+            monkeypatch.setenv("LABVIRTUAL_CLAVE_PROFESOR", clave)
+        at = AppTest.from_file(APP, default_timeout=60)
+        at.query_params["profesor"] = "1"
+        return at.run()
+
+    return abrir
+
+
+def test_sin_clave_configurada_el_panel_no_aparece(app):
+    at = app()
+    assert PANEL not in at.sidebar.radio(key="navegacion").options
+
+
+def test_con_clave_pide_la_clave(app):
+    at = app("secreta")
+    at.sidebar.radio(key="navegacion").set_value(PANEL).run()
+    assert any("Ingrese la clave" in info.value for info in at.info)
+    assert not at.multiselect
+
+    at.text_input(key="clave_profesor").input("secreta").run()
+    assert at.multiselect(key="profesor_semestres") is not None
@@ -0,0 +1,67 @@
+"""Semilla por sesión y reproducción de prácticas (labvirtual.reproduccion)"""
+
+import numpy as np
+import pytest
+
+from labvirtual.estado import EstadoLaboratorio
+from labvirtual.reproduccion import grabacion_json, medir_lote, medir_muestra, medir_patrones, reproducir
+
+
+def _practica(carne_al_inicio):
+    lab = EstadoLaboratorio()
+    if carne_al_inicio:
+        lab.fijar_semilla("B12345")
+    lab.fijar(masa_sal_mohr=0.0702, volumen_aforo_patron=100, conc_patron_madre=99.97)
+    lab.fijar_patrones([1, 2, 3, 4, 5], [100] * 5, [1.0, 2.0, 3.0, 4.0, 5.0])
+    medir_patrones(lab)
+    # El carné llega después del primer sorteo
+    lab.fijar_semilla("B12345")
+    lab.fijar(vino_seleccionado="Vino Rosado", alicuota_vino=10.0, volumen_aforo_muestra=25,
+              conc_muestra_diluida=1.68)
+    medir_muestra(lab)
+    medir_lote(lab, ["Vino Rosado", "Vino Tinto Reserva"], [10.0, 5.0], [25, 25], [4.2, 8.5])
+    return lab
+
+
+@pytest.mark.parametrize("carne_al_inicio", [True, False])
+def test_reproduccion_exacta(carne_al_inicio):
+    lab = _practica(carne_al_inicio)
+    copia = reproducir(grabacion_json(lab))
+    assert copia.entropia == lab.entropia
+    assert copia.eventos == lab.eventos
+    np.testing.assert_array_equal(copia.patrones, lab.patrones)
+    np.testing.assert_array_equal(copia.lecturas, lab.lecturas)
+    np.testing.assert_array_equal(copia.lote, lab.lote)
+    assert copia.muestra == lab.muestra
+
+
+def test_carne_tardio_cambia_la_semilla_una_vez():
+    lab = EstadoLaboratorio(sesion="abc")
+    anonima = lab.fijar_semilla()
+    assert lab.fijar_semilla("B1") != anonima
+    assert lab.eventos == [("semilla", {"estudiante": "B1"})]
+    con_carne = lab.entropia
+    assert lab.fijar_semilla("B2") == con_carne
+    assert len(lab.eventos) == 1
+    assert lab.entropia_inicial == anonima
+
+
+def test_carne_antes_de_sortear_no_agrega_eventos():
+    lab = EstadoLaboratorio(sesion="abc")
+    lab.fijar_semilla("B1")
+    assert lab.eventos == []
+    assert lab.entropia_inicial == lab.entropia == EstadoLaboratorio(sesion="abc").fijar_semilla("B1")
+
+
+def test_sesiones_distintas_ruido_distinto():
+    a, b = EstadoLaboratorio(), EstadoLaboratorio()
+    for lab in (a, b):
+        lab.fijar_semilla("B1")
+        lab.fijar_patrones([1, 2, 3], [100] * 3, [1.0, 2.0, 3.0])
+        medir_patrones(lab)
+    assert not np.array_equal(a.patrones["absorbancia"], b.patrones["absorbancia"])
+
+
+def test_version_desconocida():
+    with pytest.raises(ValueError):
+        reproducir({"version": 99})